@@ -45,6 +45,11 @@ platform_timer = 0
 # Score
 score = 0
 
+# Fonts are made once here instead of on every frame
+font = pygame.font.Font(None, 36)
+big_font = pygame.font.Font(None, 74)
+restart_text = font.render("Press R to Restart", True, WHITE)  # Never changes
+
 # Game over flag
 game_over = False
 time_up = False  # New flag for timer expiration
@@ -182,24 +187,19 @@ def draw_timer():
     elapsed_time = (pygame.time.get_ticks() - start_time) // 1000  # Time elapsed in seconds
     remaining_time = max(0, game_duration - elapsed_time)  # Remaining time
 
-    font = pygame.font.Font(None, 36)
     timer_text = font.render(f"Time Left: {remaining_time}s", True, WHITE)
     screen.blit(timer_text, (WIDTH - 200, 10))
 
     return remaining_time
 
 def draw_score():
-    font = pygame.font.Font(None, 36)
     score_text = font.render(f"Score: {score}", True, WHITE)
     screen.blit(score_text, (10, 10))
 
 def draw_game_over(message):
-    font = pygame.font.Font(None, 74)
-    text = font.render(message, True, WHITE)
+    text = big_font.render(message, True, WHITE)
     screen.blit(text, (WIDTH // 2 - text.get_width() // 2, HEIGHT // 3))
 
-    font = pygame.font.Font(None, 36)
-    restart_text = font.render("Press R to Restart", True, WHITE)
     screen.blit(restart_text, (WIDTH // 2 - restart_text.get_width() // 2, HEIGHT // 2))
 
     # Display the score on the end screen
@@ -29,6 +29,12 @@ GOLD = (255, 215, 0)  # Golden color for the golden cookie
 
 # Fonts
 font = pygame.font.Font(None, 36)
+label_texts = {}  # Button labels never change, so each one is rendered only once
+
+def render_label(label):
+    if label not in label_texts:
+        label_texts[label] = font.render(label, True, BLACK)
+    return label_texts[label]
 
 # Cookie settings
 cookie_radius = 140
@@ -111,7 +117,7 @@ def draw_score():
 def draw_buttons():
     for button in buttons:
         pygame.draw.rect(screen, button["color"], (button["x"], button["y"], button["width"], button["height"]))
-        button_label = font.render(button["label"], True, BLACK)
+        button_label = render_label(button["label"])
         screen.blit(button_label, (button["x"] + 10, button["y"] + 10))
     # Draw Boost button
     if score >= boost_button["cost"]:
@@ -122,7 +128,7 @@ def draw_buttons():
         screen.blit(glow_surface, (boost_button["x"] - 10, boost_button["y"] - 10))
     else:
         pygame.draw.rect(screen, GREY, (boost_button["x"], boost_button["y"], boost_button["width"], boost_button["height"]))
-    boost_label = font.render(boost_button["label"], True, BLACK)
+    boost_label = render_label(boost_button["label"])
     screen.blit(boost_label, (boost_button["x"] + 10, boost_button["y"] + 10))
     # Draw Triple Click button
     if score >= triple_click_button["cost"]:
@@ -133,7 +139,7 @@ def draw_buttons():
         screen.blit(glow_surface, (triple_click_button["x"] - 10, triple_click_button["y"] - 10))
     else:
         pygame.draw.rect(screen, GREY, (triple_click_button["x"], triple_click_button["y"], triple_click_button["width"], triple_click_button["height"]))
-    triple_click_label = font.render(triple_click_button["label"], True, BLACK)
+    triple_click_label = render_label(triple_click_button["label"])
     screen.blit(triple_click_label, (triple_click_button["x"] + 10, triple_click_button["y"] + 10))
 
 def draw_click_effect():
@@ -3,6 +3,9 @@ import sys
 import math
 import random
 import time
+import bisect
+import heapq
+from collections import deque
 
 # Initialize Pygame
 pygame.init()
@@ -28,6 +31,54 @@ RAINBOW_COLORS = [RED, ORANGE, YELLOW, GREEN, BLUE, PURPLE]
 # Fonts
 font = pygame.font.Font(None, 36)
 
+# Shape sprites
+class ShapeSprites:
+    # Every look a falling shape can have, drawn once with its number on top
+    # and kept, so putting a shape on screen is a single blit. Shapes only
+    # come in five numbers and six colours at one size, so the whole set is
+    # small; each sprite is baked the first time a shape needs it
+    def __init__(self):
+        self.sprites = {}
+    
+    def get(self, number, color, size):
+        key = (number, color, size)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.bake(number, color, size)
+            self.sprites[key] = sprite
+        return sprite
+    
+    @staticmethod
+    def bake(number, color, size):
+        # Polygon corners at size land on the pixel past the shape's width, and
+        # one more keeps the width even, which alpha blits are much faster at
+        sprite = pygame.Surface((size + 2, size + 2), pygame.SRCALPHA)
+        if number == 4 or number == 2:
+            # Squares
+            pygame.draw.rect(sprite, color, (0, 0, size, size))
+        elif number == 3:
+            # Triangles
+            pygame.draw.polygon(sprite, color, [(size // 2, 0), (0, size), (size, size)])
+        elif number == 1:
+            # Circles
+            pygame.draw.circle(sprite, color, (size // 2, size // 2), size // 2)
+        elif number == 8:
+            # Octagons
+            pygame.draw.polygon(sprite, color, [
+                (size * 0.3, 0), (size * 0.7, 0),
+                (size, size * 0.3), (size, size * 0.7),
+                (size * 0.7, size), (size * 0.3, size),
+                (0, size * 0.7), (0, size * 0.3)
+            ])
+        # Number in the middle
+        text = font.render(str(number), True, WHITE)
+        sprite.blit(text, (size // 2 - text.get_width() // 2, size // 2 - text.get_height() // 2))
+        # Matching the display format makes every later blit cheaper
+        return sprite.convert_alpha() if pygame.display.get_surface() else sprite
+
+# Shared by every falling shape
+SHAPE_SPRITES = ShapeSprites()
+
 # Game states
 MAIN_MENU = 0
 OPTIONS_MENU = 1
@@ -182,6 +233,13 @@ def draw_projectiles():
         pygame.draw.circle(screen, BLACK, (int(projectile["x"]), int(projectile["y"])), projectile_radius)
 
 def draw_shapes():
+    # One blit per shape, all handed to pygame in a single call
+    screen.blits([(SHAPE_SPRITES.get(shape["number"], shape["color"], shape["size"]), (shape["x"], shape["y"]))
+                  for shape in shapes], doreturn=False)
+
+def draw_shapes_directly():
+    # How draw_shapes worked before the sprites: every outline and number
+    # drawn from scratch each frame. Kept for the draw benchmark
     for shape in shapes:
         if shape["number"] == 4 or shape["number"] == 2:
             # Draw squares
@@ -289,79 +347,110 @@ def update_shapes():
         if shape["y"] < -shape["size"]:
             shapes.remove(shape)
 
+# What a shape breaks into when hit: number -> (number on each piece, how many pieces)
+SHAPE_SPLITS = {8: (4, 2), 4: (2, 2), 3: (1, 3), 2: (1, 2)}
+
+def find_projectile_hits():
+    # Sweep and prune along x. Shapes are sorted by their left edge and
+    # projectiles by x, then the projectiles are walked left to right while
+    # keeping the shapes whose span covers the current x, sorted by y, so
+    # each projectile only looks at the few whose top is just above it.
+    # Returns {projectile index: [indices of shapes it is inside]}
+    by_left = sorted(range(len(shapes)), key=lambda i: shapes[i]["x"])
+    by_x = sorted(range(len(projectiles)), key=lambda i: projectiles[i]["x"])
+    tallest = max((shape["size"] for shape in shapes), default=0)
+    hits = {}
+    active = []  # (top, index) of the shapes under the sweep, in order of top
+    ends = []    # Heap of (right edge, top, index) to drop them again
+    next_shape = 0
+    for p in by_x:
+        px = projectiles[p]["x"]
+        py = projectiles[p]["y"]
+        while next_shape < len(by_left) and shapes[by_left[next_shape]]["x"] < px:
+            i = by_left[next_shape]
+            shape = shapes[i]
+            bisect.insort(active, (shape["y"], i))
+            heapq.heappush(ends, (shape["x"] + shape["size"], shape["y"], i))
+            next_shape += 1
+        # Drop shapes the sweep has gone past
+        while ends and ends[0][0] <= px:
+            _, top, i = heapq.heappop(ends)
+            del active[bisect.bisect_left(active, (top, i))]
+        # Only shapes with their top between py - tallest and py can hold py
+        first = bisect.bisect_right(active, (py - tallest, math.inf))
+        last = bisect.bisect_left(active, (py, -1))
+        for top, i in active[first:last]:
+            if py < top + shapes[i]["size"]:
+                hits.setdefault(p, []).append(i)
+    return hits
+
 def check_collisions():
-    global lives, flicker_start_time, score, second_cannon, second_cannon_start_time, hexagon, rainbow_star, is_slow_motion, slow_motion_start_time
-    for shape in shapes[:]:
-        if (shape["x"] < cannon_x < shape["x"] + shape["size"] and
-            shape["y"] < cannon_y < shape["y"] + shape["size"]):
-            # Cannon is hit by a shape
-            lives -= 1
-            flicker_start_time = time.time()
-            shapes.remove(shape)
-            if lives <= 0:
-                global current_state
-                current_state = GAME_OVER
-    for projectile in projectiles[:]:
-        for shape in shapes[:]:
-            if (shape["x"] < projectile["x"] < shape["x"] + shape["size"] and
-                shape["y"] < projectile["y"] < shape["y"] + shape["size"]):
-                # Hit the shape
-                if shape["number"] == 1:
-                    score += 1  # Increase score when a "1" shape is destroyed
-                if shape["number"] > 1:
-                    # Split the shape
-                    if shape["number"] == 8:
-                        # Split into two "4"s
-                        for _ in range(2):
-                            shapes.append({
-                                "x": shape["x"],
-                                "y": shape["y"],
-                                "size": shape["size"],
-                                "number": 4,
-                                "color": shape["color"],
-                                "dx": random.choice([-3, 3]),
-                                "dy": -shape_speed  # Bounce upward
-                            })
-                    elif shape["number"] == 4:
-                        # Split into two "2"s
-                        for _ in range(2):
-                            shapes.append({
-                                "x": shape["x"],
-                                "y": shape["y"],
-                                "size": shape["size"],
-                                "number": 2,
-                                "color": shape["color"],
-                                "dx": random.choice([-3, 3]),
-                                "dy": -shape_speed  # Bounce upward
-                            })
-                    elif shape["number"] == 3:
-                        # Split into three "1"s
-                        for _ in range(3):
-                            shapes.append({
-                                "x": shape["x"],
-                                "y": shape["y"],
-                                "size": shape["size"],
-                                "number": 1,
-                                "color": shape["color"],
-                                "dx": random.choice([-3, 3]),
-                                "dy": -shape_speed  # Bounce upward
-                            })
-                    elif shape["number"] == 2:
-                        # Split into two "1"s
-                        for _ in range(2):
-                            shapes.append({
-                                "x": shape["x"],
-                                "y": shape["y"],
-                                "size": shape["size"],
-                                "number": 1,
-                                "color": shape["color"],
-                                "dx": random.choice([-3, 3]),
-                                "dy": -shape_speed  # Bounce upward
-                            })
-                # Remove the original shape
-                shapes.remove(shape)
-                projectiles.remove(projectile)
-                break
+    global lives, flicker_start_time, score, second_cannon, second_cannon_start_time, hexagon, rainbow_star, is_slow_motion, slow_motion_start_time, current_state
+    # Shapes that reach the cannon
+    hit_cannon = {i for i, shape in enumerate(shapes)
+                  if shape["x"] < cannon_x < shape["x"] + shape["size"] and shape["y"] < cannon_y < shape["y"] + shape["size"]}
+    for _ in hit_cannon:
+        # Cannon is hit by a shape
+        lives -= 1
+        flicker_start_time = time.time()
+        if lives <= 0:
+            current_state = GAME_OVER
+    if hit_cannon:
+        shapes[:] = [shape for i, shape in enumerate(shapes) if i not in hit_cannon]
+    
+    # Each projectile hits at most one shape, the first in the list it is
+    # inside, and each shape is only hit once; projectiles take their turns
+    # in the order they were fired. Removals and new pieces are saved up and
+    # applied together at the end
+    hits = find_projectile_hits()
+    used_projectiles = set()
+    used_shapes = set()
+    pieces = []            # New shapes split off this frame, in order
+    family_pieces = {}     # Unused pieces of each shape they came from, oldest first
+    piece_family = []      # The shape each piece came from, whose box it shares
+    used_pieces = set()
+    for p in sorted(hits):
+        candidates = sorted(hits[p])
+        target = next((i for i in candidates if i not in used_shapes), None)
+        if target is not None:
+            used_shapes.add(target)
+            shape = shapes[target]
+            family = target
+        else:
+            # Pieces split off earlier this frame sit in the same box as the
+            # shape they came from, so a later projectile can hit one of them.
+            # It takes the oldest unused piece of any shape it is inside
+            waiting = [family_pieces[i] for i in candidates if family_pieces.get(i)]
+            if not waiting:
+                continue
+            family_queue = min(waiting, key=lambda queue: queue[0])
+            target = family_queue.popleft()
+            used_pieces.add(target)
+            shape = pieces[target]
+            family = piece_family[target]
+        used_projectiles.add(p)
+        if shape["number"] == 1:
+            score += 1  # Increase score when a "1" shape is destroyed
+        split = SHAPE_SPLITS.get(shape["number"])
+        if split:
+            piece_number, piece_count = split
+            for _ in range(piece_count):
+                pieces.append({
+                    "x": shape["x"],
+                    "y": shape["y"],
+                    "size": shape["size"],
+                    "number": piece_number,
+                    "color": shape["color"],
+                    "dx": random.choice([-3, 3]),
+                    "dy": -shape_speed  # Bounce upward
+                })
+                family_pieces.setdefault(family, deque()).append(len(pieces) - 1)
+                piece_family.append(family)
+    
+    # Power-ups, for projectiles that did not hit a shape
+    for p, projectile in enumerate(projectiles):
+        if p in used_projectiles:
+            continue
         if hexagon and (hexagon["x"] < projectile["x"] < hexagon["x"] + hexagon_size and
                         hexagon["y"] < projectile["y"] < hexagon["y"] + hexagon_size):
             # Hit the hexagon
@@ -371,14 +460,20 @@ def check_collisions():
                 "start_time": time.time()
             }
             hexagon = None
-            projectiles.remove(projectile)
-        if rainbow_star and (rainbow_star.x < projectile["x"] < rainbow_star.x + rainbow_star.size and
-                             rainbow_star.y < projectile["y"] < rainbow_star.y + rainbow_star.size):
+            used_projectiles.add(p)
+        elif rainbow_star and (rainbow_star.x < projectile["x"] < rainbow_star.x + rainbow_star.size and
+                               rainbow_star.y < projectile["y"] < rainbow_star.y + rainbow_star.size):
             # Hit the rainbow star
             is_slow_motion = True
             slow_motion_start_time = time.time()
             rainbow_star = None
-            projectiles.remove(projectile)
+            used_projectiles.add(p)
+    
+    if used_shapes or pieces:
+        shapes[:] = ([shape for i, shape in enumerate(shapes) if i not in used_shapes] +
+                     [piece for j, piece in enumerate(pieces) if j not in used_pieces])
+    if used_projectiles:
+        projectiles[:] = [projectile for p, projectile in enumerate(projectiles) if p not in used_projectiles]
 
 def update_projectiles():
     for projectile in projectiles[:]:
@@ -440,6 +535,80 @@ def change_color(option):
         global background_color
         background_color = options[option]
 
+def check_collisions_pairwise():
+    # How projectiles met shapes before the sweep: every projectile against
+    # every shape, removing each hit from the lists straight away. Kept for
+    # the collision benchmark
+    for projectile in projectiles[:]:
+        for shape in shapes[:]:
+            if (shape["x"] < projectile["x"] < shape["x"] + shape["size"] and
+                shape["y"] < projectile["y"] < shape["y"] + shape["size"]):
+                split = SHAPE_SPLITS.get(shape["number"])
+                if split:
+                    for _ in range(split[1]):
+                        shapes.append(dict(shape, number=split[0], dx=random.choice([-3, 3]), dy=-shape_speed))
+                shapes.remove(shape)
+                projectiles.remove(projectile)
+                break
+
+def run_collision_benchmark(frames=5):
+    # Times one collision pass with the sweep against testing every pair,
+    # on screens full of shapes and projectiles. More shapes on the same
+    # screen overlap more deeply, so the number of projectile and shape
+    # pairs that touch is printed too; the sweep's cost follows that count
+    # (run with --benchmark)
+    global lives
+    lives = 10**9  # The cannon can take any number of hits here
+    for count in (500, 2000, 8000):
+        times = []
+        touching = 0
+        for check in (check_collisions_pairwise, check_collisions):
+            elapsed = 0
+            for frame in range(frames):
+                random.seed(frame)
+                shapes.clear()
+                projectiles.clear()
+                for _ in range(count):
+                    spawn_shape()
+                    shapes[-1]["y"] = random.randint(0, HEIGHT - floor_height - 60)
+                    projectiles.append({"x": random.randint(0, WIDTH), "y": random.randint(0, HEIGHT)})
+                if check is check_collisions:
+                    touching += sum(map(len, find_projectile_hits().values()))
+                start = time.perf_counter()
+                check()
+                elapsed += time.perf_counter() - start
+            times.append(elapsed * 1000 / frames)
+        print(f"{count} shapes, {count} projectiles: every pair {times[0]:.1f} ms, sweep {times[1]:.1f} ms "
+              f"for {touching // frames} touching pairs")
+    shapes.clear()
+    projectiles.clear()
+
+def run_draw_benchmark(count=3000, frames=30):
+    # Times drawing a screen full of shapes from their sprites against
+    # drawing each one from scratch (run with --benchmark)
+    random.seed(0)
+    for _ in range(count):
+        spawn_shape()
+        shapes[-1]["y"] = random.randint(0, HEIGHT - floor_height - 60)
+    for label, draw in (("drawn directly", draw_shapes_directly), ("sprites", draw_shapes)):
+        draw()  # Bake the sprites and text before timing
+        start = time.perf_counter()
+        for _ in range(frames):
+            screen.fill(background_color)
+            draw()
+        print(f"{count} shapes, {label}: {(time.perf_counter() - start) * 1000 / frames:.2f} ms per frame")
+    print(f"{len(SHAPE_SPRITES.sprites)} sprites baked")
+    shapes.clear()
+
+def run_benchmarks():
+    run_draw_benchmark()
+    run_collision_benchmark()
+    pygame.quit()
+    sys.exit()
+
+if __name__ == "__main__" and "--benchmark" in sys.argv:
+    run_benchmarks()
+
 # Main game loop
 running = True
 clock = pygame.time.Clock()
@@ -2,8 +2,14 @@ import pygame
 import math
 import sys
 import random
+import time
 from enum import Enum
 
+try:
+    import numpy as np  # Optional: enables the surfarray wall buffer
+except ImportError:
+    np = None
+
 # Initialize Pygame
 pygame.init()
 
@@ -29,10 +35,94 @@ class Color(Enum):
     PORTAL_ORANGE = (255, 128, 0)
     UI_BG = (30, 30, 40)
 
+class TrigTable:
+    """Sine and cosine read from a table of `resolution` angles, or from math if accurate"""
+    def __init__(self, resolution=9600, accurate=False):
+        self.resolution = resolution
+        self.accurate = accurate
+        self.step = 2 * math.pi / resolution
+        angles = [i * self.step for i in range(resolution)]
+        self.sin_table = [math.sin(angle) for angle in angles]
+        self.cos_table = [math.cos(angle) for angle in angles]
+
+    def steps(self, angle):
+        """Number of table steps closest to angle"""
+        return round(angle / self.step)
+
+    def index(self, angle):
+        return round(angle / self.step) % self.resolution
+
+    def sin(self, angle):
+        if self.accurate:
+            return math.sin(angle)
+        return self.sin_table[round(angle / self.step) % self.resolution]
+
+    def cos(self, angle):
+        if self.accurate:
+            return math.cos(angle)
+        return self.cos_table[round(angle / self.step) % self.resolution]
+
+    def fan(self, start_angle, count, stride):
+        """(cos, sin) for count angles from start_angle, stride table steps apart"""
+        if self.accurate:
+            angles = [start_angle + i * stride * self.step for i in range(count)]
+            return [(math.cos(angle), math.sin(angle)) for angle in angles]
+        first = self.index(start_angle)
+        indices = [(first + i * stride) % self.resolution for i in range(count)]
+        return [(self.cos_table[i], self.sin_table[i]) for i in indices]
+
+# Shared by the renderer and everything that moves along a heading
+TRIG = TrigTable()
+
+class SimulationClock:
+    """Fixed-timestep clock behind Game.run; alpha is how far a frame sits between two steps"""
+    
+    def __init__(self, rate=60, max_steps=8):
+        self.rate = rate
+        self.step = 1 / rate
+        self.max_steps = max_steps  # Most steps run in one frame before time is dropped
+        self.accumulator = 0.0
+        self.alpha = 0.0
+    
+    def advance(self, elapsed):
+        """Adds elapsed real seconds and returns how many steps to simulate."""
+        self.accumulator += elapsed
+        steps = int(self.accumulator / self.step)
+        self.accumulator -= steps * self.step
+        # After a long stall, drop the backlog instead of trying to catch up,
+        # which would only make the next frame slower still
+        steps = min(steps, self.max_steps)
+        self.alpha = self.accumulator / self.step
+        return steps
+
+# Shared by the game loop and every gameplay timer
+CLOCK = SimulationClock()
+
 class GameObject:
+    depth_bias = 0  # How far behind the wall depth a billboard may still show
+    angle = 0
+    
     def __init__(self, x, y):
         self.x = x
         self.y = y
+        self.previous_pose = (x, y, 0)
+    
+    def remember_pose(self):
+        # The pose at the start of a simulation step, for blend_pose()
+        self.previous_pose = (self.x, self.y, self.angle)
+    
+    def blend_pose(self, alpha):
+        """Blends alpha of the way on from the last step's pose for drawing; returns the pose to restore"""
+        pose = (self.x, self.y, self.angle)
+        x, y, angle = self.previous_pose
+        if abs(self.x - x) + abs(self.y - y) < 1:  # Jumps such as teleports are not blended
+            self.x = x + (self.x - x) * alpha
+            self.y = y + (self.y - y) * alpha
+            self.angle = angle + (self.angle - angle) * alpha
+        return pose
+    
+    def restore_pose(self, pose):
+        self.x, self.y, self.angle = pose
     
     def update(self):
         pass
@@ -46,13 +136,13 @@ class PortalProjectile(GameObject):
         self.angle = angle
         self.color = color
         self.speed = 0.3
-        self.lifetime = 60  # frames
+        self.lifetime = 60  # simulation steps
         self.size = 0.2
         self.active = True
     
     def update(self, game_map):
-        self.x += math.cos(self.angle) * self.speed
-        self.y += math.sin(self.angle) * self.speed
+        self.x += TRIG.cos(self.angle) * self.speed
+        self.y += TRIG.sin(self.angle) * self.speed
         self.lifetime -= 1
         
         # Check if hit wall
@@ -65,28 +155,17 @@ class PortalProjectile(GameObject):
         
         return None
     
-    def draw(self, screen, player, renderer):
-        dx = self.x - player.x
-        dy = self.y - player.y
-        dist_sq = dx**2 + dy**2
-        
-        if dist_sq > (renderer.MAX_DEPTH * 0.7) ** 2:
-            return
-            
-        angle = math.atan2(dy, dx) - player.angle
-        while angle > math.pi: angle -= 2 * math.pi
-        while angle < -math.pi: angle += 2 * math.pi
-        
-        if -renderer.HALF_FOV <= angle <= renderer.HALF_FOV:
-            dist = math.sqrt(dist_sq)
-            proj_height = (HEIGHT - UI_HEIGHT) / (dist + 0.0001)
-            screen_x = int((angle + renderer.HALF_FOV) / renderer.FOV * WIDTH)
-            
-            size = int(proj_height * self.size)
-            pygame.draw.circle(screen, self.color.value, 
-                              (screen_x, (HEIGHT - UI_HEIGHT)//2), size)
+    def add_billboard(self, billboards, player, renderer):
+        billboards.add(self, player, renderer.MAX_DEPTH * 0.7)
+    
+    def draw_billboard(self, screen, screen_x, proj_height):
+        size = int(proj_height * self.size)
+        pygame.draw.circle(screen, self.color.value, 
+                          (screen_x, (HEIGHT - UI_HEIGHT)//2), size)
 
 class Portal(GameObject):
+    depth_bias = 0.5  # Portals sit just inside the wall they were shot onto
+    
     def __init__(self, x, y, color, normal_angle):
         super().__init__(x, y)
         self.color = color
@@ -109,58 +188,35 @@ class Portal(GameObject):
         self.linked_portal = other_portal
         other_portal.linked_portal = self
     
-    def draw(self, screen, player, renderer):
-        if not self.active:
-            return
-            
-        dx = self.x - player.x
-        dy = self.y - player.y
-        dist_sq = dx**2 + dy**2
+    def add_billboard(self, billboards, player, renderer):
+        if self.active:
+            billboards.add(self, player, renderer.MAX_DEPTH * 0.7)
+    
+    def draw_billboard(self, screen, screen_x, proj_height):
+        size = int(proj_height * self.size)
+        pulse_size = int(size * (1 + self.pulse * 0.1))
+        portal_color = self.color.value
         
-        if dist_sq > (renderer.MAX_DEPTH * 0.7) ** 2:
-            return
-            
-        angle = math.atan2(dy, dx) - player.angle
-        while angle > math.pi: angle -= 2 * math.pi
-        while angle < -math.pi: angle += 2 * math.pi
+        portal_surface = pygame.Surface((pulse_size*2, pulse_size*2), pygame.SRCALPHA)
+        pygame.draw.circle(portal_surface, (*portal_color, 200), 
+                         (pulse_size, pulse_size), pulse_size)
+        pygame.draw.circle(portal_surface, (*portal_color, 100), 
+                         (pulse_size, pulse_size), int(pulse_size * 0.7))
+        pygame.draw.circle(portal_surface, (*portal_color, 150), 
+                         (pulse_size, pulse_size), int(pulse_size * 0.3))
         
-        if -renderer.HALF_FOV <= angle <= renderer.HALF_FOV:
-            dist = math.sqrt(dist_sq)
-            proj_height = (HEIGHT - UI_HEIGHT) / (dist + 0.0001)
-            screen_x = int((angle + renderer.HALF_FOV) / renderer.FOV * WIDTH)
-            
-            size = int(proj_height * self.size)
-            pulse_size = int(size * (1 + self.pulse * 0.1))
-            portal_color = self.color.value
-            
-            portal_surface = pygame.Surface((pulse_size*2, pulse_size*2), pygame.SRCALPHA)
-            pygame.draw.circle(portal_surface, (*portal_color, 200), 
-                             (pulse_size, pulse_size), pulse_size)
-            pygame.draw.circle(portal_surface, (*portal_color, 100), 
-                             (pulse_size, pulse_size), int(pulse_size * 0.7))
-            pygame.draw.circle(portal_surface, (*portal_color, 150), 
-                             (pulse_size, pulse_size), int(pulse_size * 0.3))
-            
-            screen.blit(portal_surface, 
-                       (screen_x - pulse_size, 
-                        (HEIGHT - UI_HEIGHT)//2 - pulse_size))
+        screen.blit(portal_surface, 
+                   (screen_x - pulse_size, 
+                    (HEIGHT - UI_HEIGHT)//2 - pulse_size))
 
 class Wall(GameObject):
     def __init__(self, x, y):
         super().__init__(x, y)
         self.color = Color.GRAY.value
     
-    def draw(self, screen, ray, proj_height, depth_shade):
-        base_color = self.color
-        shaded_color = (
-            max(0, min(255, base_color[0] * (depth_shade[0]/255))),
-            max(0, min(255, base_color[1] * (depth_shade[1]/255))),
-            max(0, min(255, base_color[2] * (depth_shade[2]/255)))
-        )
-        
-        pygame.draw.rect(screen, shaded_color, 
-                        (ray, (HEIGHT - UI_HEIGHT) // 2 - proj_height // 2, 
-                         1, proj_height))
+    def draw(self, columns, ray, proj_height, depth):
+        columns.fill(ray, (HEIGHT - UI_HEIGHT) // 2 - proj_height // 2,
+                     proj_height, columns.shade(self.color, depth))
 
 class Player(GameObject):
     def __init__(self, x, y):
@@ -174,7 +230,7 @@ class Player(GameObject):
         self.blue_portal = None
         self.orange_portal = None
         self.portal_cooldown = 0
-        self.teleport_cooldown = 0
+        self.teleport_cooldown = 0  # seconds
         self.projectiles = []
     
     def shoot_portal(self, angle, color):
@@ -207,7 +263,7 @@ class Player(GameObject):
     
     def try_teleport(self):
         if self.teleport_cooldown > 0:
-            self.teleport_cooldown -= 1
+            self.teleport_cooldown -= CLOCK.step
             return False
             
         teleported = False
@@ -229,7 +285,7 @@ class Player(GameObject):
                     break
                 
         if teleported:
-            self.teleport_cooldown = 10
+            self.teleport_cooldown = 0.17
         return teleported
     
     def update(self, game_map):
@@ -253,8 +309,8 @@ class Player(GameObject):
             self.speed = min(0, self.speed + self.deceleration)
         
         # Try to move
-        new_x = self.x + math.cos(self.angle) * self.speed
-        new_y = self.y + math.sin(self.angle) * self.speed
+        new_x = self.x + TRIG.cos(self.angle) * self.speed
+        new_y = self.y + TRIG.sin(self.angle) * self.speed
         
         if game_map.get_cell(int(new_x), int(new_y)) == 0:
             self.x = new_x
@@ -314,6 +370,174 @@ class GameMap:
         
         return None
 
+class RayCaster:
+    """Steps a ray from one grid line to the next (DDA), so the hit distance is exact"""
+    def __init__(self, max_depth):
+        self.max_depth = max_depth
+
+    def cast(self, origin_x, origin_y, cos_a, sin_a, is_hit):
+        # is_hit(cell_x, cell_y) is True for a wall and None off the map.
+        # Returns (depth, cell_x, cell_y) of the first wall, or None
+        cell_x = int(origin_x)
+        cell_y = int(origin_y)
+
+        # Ray length between grid lines; 1e30 for lines a ray along an axis never crosses
+        delta_x = abs(1 / cos_a) if cos_a != 0 else 1e30
+        delta_y = abs(1 / sin_a) if sin_a != 0 else 1e30
+
+        if cos_a < 0:
+            step_x = -1
+            side_x = (origin_x - cell_x) * delta_x
+        else:
+            step_x = 1
+            side_x = (cell_x + 1 - origin_x) * delta_x
+        if sin_a < 0:
+            step_y = -1
+            side_y = (origin_y - cell_y) * delta_y
+        else:
+            step_y = 1
+            side_y = (cell_y + 1 - origin_y) * delta_y
+
+        max_depth = self.max_depth
+        while True:
+            # Step into whichever neighbouring cell the ray reaches first
+            if side_x < side_y:
+                depth = side_x
+                side_x += delta_x
+                cell_x += step_x
+            else:
+                depth = side_y
+                side_y += delta_y
+                cell_y += step_y
+
+            if depth >= max_depth:
+                return None
+
+            hit = is_hit(cell_x, cell_y)
+            if hit is None:
+                return None
+            if hit:
+                return (depth, cell_x, cell_y)
+
+class WallColumns:
+    """Frame buffer the wall slices are written into, then blitted to the screen in one go"""
+    KEY_COLOR = (255, 0, 255)  # Marks pixels with no wall so the floor shows through
+    DEPTH_BUCKETS = 256        # One shading step per 0.1 units of distance
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.frame = pygame.Surface((width, height)).convert()
+        self.frame.set_colorkey(self.KEY_COLOR)
+        if np is not None:
+            self.blank = self.frame.map_rgb(self.KEY_COLOR)
+            self.pixels = np.full((width, height), self.blank, dtype=np.uint32)
+        self.shade_table = {}
+
+    def pack(self, color):
+        """Converts an RGB tuple into the buffer's pixel format"""
+        if np is not None:
+            return self.frame.map_rgb(color)
+        return color
+
+    def shaded_rgb(self, color, depth):
+        """Returns the RGB tuple for a wall of this color seen at this depth"""
+        bucket = min(int(depth * 10), self.DEPTH_BUCKETS - 1)
+        light = (255 - bucket) / 255
+        return tuple(max(0, min(255, int(c * light))) for c in color)
+
+    def shade(self, color, depth):
+        """Returns the packed pixel for a wall of this color seen at this depth"""
+        shades = self.shade_table.get(color)
+        if shades is None:
+            shades = [self.pack(self.shaded_rgb(color, bucket / 10))
+                      for bucket in range(self.DEPTH_BUCKETS)]
+            self.shade_table[color] = shades
+        return shades[min(int(depth * 10), self.DEPTH_BUCKETS - 1)]
+
+    def clear(self):
+        if np is not None:
+            self.pixels.fill(self.blank)
+        else:
+            self.frame.fill(self.KEY_COLOR)
+
+    def fill(self, x, top, height, pixel):
+        """Paints one column from top down to top + height"""
+        bottom = min(self.height, int(top + height))
+        top = max(0, int(top))
+        if bottom <= top or not 0 <= x < self.width:
+            return
+        if np is not None:
+            self.pixels[x, top:bottom] = pixel
+        else:
+            self.frame.fill(pixel, (x, top, 1, bottom - top))
+
+    def blit(self, screen):
+        if np is not None:
+            pygame.surfarray.blit_array(self.frame, self.pixels)
+        screen.blit(self.frame, (0, 0))
+
+class Billboards:
+    """Sprites drawn furthest first after the walls, clipped to the columns no wall hides"""
+    def __init__(self, width, height, fov):
+        self.width = width
+        self.height = height
+        self.fov = fov
+        self.half_fov = fov / 2
+        self.depths = [math.inf] * width  # Nearest wall per screen column
+        self.sprites = []                 # (distance, screen_x, sprite) queued this frame
+
+    def clear(self):
+        self.depths = [math.inf] * self.width
+
+    def set_depth(self, x, width, depth):
+        """Records the wall depth for the columns x to x + width"""
+        for column in range(x, min(x + width, self.width)):
+            self.depths[column] = depth
+
+    def add(self, sprite, player, max_distance):
+        """Queues sprite if it is within max_distance of the player and in view"""
+        dx = sprite.x - player.x
+        dy = sprite.y - player.y
+        dist_sq = dx * dx + dy * dy
+        if dist_sq > max_distance * max_distance:
+            return
+
+        angle = (math.atan2(dy, dx) - player.angle + math.pi) % (2 * math.pi) - math.pi
+        if not -self.half_fov <= angle <= self.half_fov:
+            return
+
+        screen_x = int((angle + self.half_fov) / self.fov * self.width)
+        self.sprites.append((math.sqrt(dist_sq), screen_x, sprite))
+
+    def open_spans(self, left, right, depth):
+        """Yields (start, end) runs of columns in left..right with no wall nearer than depth"""
+        depths = self.depths
+        start = None
+        for x in range(left, right):
+            if depths[x] > depth:
+                if start is None:
+                    start = x
+            elif start is not None:
+                yield start, x
+                start = None
+        if start is not None:
+            yield start, right
+
+    def draw(self, screen):
+        self.sprites.sort(key=lambda entry: entry[0], reverse=True)
+        for distance, screen_x, sprite in self.sprites:
+            proj_height = self.height / (distance + 0.0001)
+            # Generous half-width so glows and outlines are not cut off
+            reach = int(proj_height * sprite.size * 1.2) + 12
+            left = max(0, screen_x - reach)
+            right = min(self.width, screen_x + reach + 1)
+            for start, end in self.open_spans(left, right, distance - sprite.depth_bias):
+                screen.set_clip((start, 0, end - start, self.height))
+                sprite.draw_billboard(screen, screen_x, proj_height)
+        screen.set_clip(None)
+        self.sprites.clear()
+
 class Renderer:
     def __init__(self):
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -324,7 +548,11 @@ class Renderer:
         self.HALF_FOV = self.FOV / 2
         self.NUM_RAYS = WIDTH // 2
         self.DELTA_ANGLE = self.FOV / self.NUM_RAYS
+        self.RAY_STRIDE = TRIG.steps(self.DELTA_ANGLE)  # Trig table steps between rays
         self.MAX_DEPTH = 20
+        self.ray_caster = RayCaster(self.MAX_DEPTH)
+        self.wall_columns = WallColumns(WIDTH, HEIGHT - UI_HEIGHT)
+        self.billboards = Billboards(WIDTH, HEIGHT - UI_HEIGHT, self.FOV)
         
         self.font = pygame.font.Font(None, 32)
         self.big_font = pygame.font.Font(None, 72)
@@ -335,35 +563,35 @@ class Renderer:
         pygame.draw.rect(self.screen, Color.ROOF.value, (0, 0, WIDTH, (HEIGHT - UI_HEIGHT)//2))
     
     def cast_rays(self, player, game_map):
-        for ray in range(self.NUM_RAYS):
-            ray_angle = (player.angle - self.HALF_FOV) + (ray * self.DELTA_ANGLE)
-            
-            depth = 0
-            hit_wall = False
-
-            while not hit_wall and depth < self.MAX_DEPTH:
-                depth += 0.1
-                
-                test_x = int(player.x + depth * math.cos(ray_angle))
-                test_y = int(player.y + depth * math.sin(ray_angle))
+        def is_hit(cell_x, cell_y):
+            cell = game_map.get_cell(cell_x, cell_y)
+            if cell is None:
+                return None
+            return cell == 1
 
-                if game_map.get_cell(test_x, test_y) == 1:
-                    hit_wall = True
-                    wall_x, wall_y = test_x, test_y
-                elif game_map.get_cell(test_x, test_y) is None:
-                    hit_wall = True
-                    depth = self.MAX_DEPTH
+        self.wall_columns.clear()
+        self.billboards.clear()
+        directions = TRIG.fan(player.angle - self.HALF_FOV, self.NUM_RAYS, self.RAY_STRIDE)
+        for ray, (cos_a, sin_a) in enumerate(directions):
+            hit = self.ray_caster.cast(player.x, player.y, cos_a, sin_a, is_hit)
 
-            if hit_wall and game_map.get_cell(test_x, test_y) == 1:
+            if hit:
+                depth, wall_x, wall_y = hit
                 proj_height = (HEIGHT-UI_HEIGHT) / (depth + 0.0001)
-                depth_shade = (255 - int(depth * 10),) * 3
                 
                 if (wall_x, wall_y) in game_map.walls:
-                    game_map.walls[(wall_x, wall_y)].draw(self.screen, ray*2, proj_height, depth_shade)
+                    game_map.walls[(wall_x, wall_y)].draw(self.wall_columns, ray*2, proj_height, depth)
+                    self.billboards.set_depth(ray*2, 2, depth)
+        self.wall_columns.blit(self.screen)
     
-    def draw_projectiles(self, screen, player):
+    def draw_sprites(self, player):
+        # Queue everything first so the billboards are drawn back to front
         for projectile in player.projectiles:
-            projectile.draw(screen, player, self)
+            projectile.add_billboard(self.billboards, player, self)
+        for portal in (player.blue_portal, player.orange_portal):
+            if portal:
+                portal.add_billboard(self.billboards, player, self)
+        self.billboards.draw(self.screen)
     
     def draw_ui(self, player):
         # Draw UI background
@@ -461,6 +689,7 @@ class Game:
     
     def update(self):
         if self.state == GameState.PLAYING:
+            self.player.remember_pose()
             self.player.update(self.game_map)
     
     def render(self):
@@ -468,33 +697,76 @@ class Game:
             self.renderer.draw_main_menu()
         
         elif self.state == GameState.PLAYING:
+            # Draw from between the last two simulated poses
+            pose = self.player.blend_pose(CLOCK.alpha)
             self.renderer.draw_floor_and_ceiling()
             self.renderer.cast_rays(self.player, self.game_map)
-            
-            # Draw projectiles first (behind portals)
-            self.renderer.draw_projectiles(self.renderer.screen, self.player)
-            
-            # Draw portals
-            if self.player.blue_portal:
-                self.player.blue_portal.draw(self.renderer.screen, self.player, self.renderer)
-            if self.player.orange_portal:
-                self.player.orange_portal.draw(self.renderer.screen, self.player, self.renderer)
+            self.renderer.draw_sprites(self.player)
+            self.player.restore_pose(pose)
             
             self.renderer.draw_ui(self.player)
         
         pygame.display.flip()
     
     def run(self):
+        # One update() per CLOCK.step of real time; the dummy driver takes one step per frame
+        headless = pygame.display.get_driver() == "dummy"
+        last_frame = time.perf_counter()
         while self.running:
+            frame_start = time.perf_counter()
+            steps = 1 if headless else CLOCK.advance(frame_start - last_frame)
+            last_frame = frame_start
+            
             self.handle_events()
-            self.update()
+            for _ in range(steps):
+                self.update()
             self.render()
-            self.clock.tick(60)
+            if not headless:
+                self.clock.tick(60)
+    
+    def simulate(self, seconds):
+        """Plays `seconds` of game time without drawing and returns the real seconds it took"""
+        self.state = GameState.PLAYING
+        start = time.perf_counter()
+        for _ in range(int(seconds * CLOCK.rate)):
+            pygame.event.pump()
+            self.update()
+        return time.perf_counter() - start
+
+def run_benchmarks(frames=200):
+    """Times cast_rays with trig table lookups against plain math calls"""
+    game = Game()
+    renderer = game.renderer
+    headings = [i * 0.05 for i in range(frames)]
+    
+    for accurate in (True, False):
+        TRIG.accurate = accurate
+        start = time.perf_counter()
+        for heading in headings:
+            TRIG.fan(heading - renderer.HALF_FOV, renderer.NUM_RAYS, renderer.RAY_STRIDE)
+        direction_time = (time.perf_counter() - start) * 1000 / frames
+        
+        start = time.perf_counter()
+        for heading in headings:
+            game.player.angle = heading
+            renderer.cast_rays(game.player, game.game_map)
+        frame_time = (time.perf_counter() - start) * 1000 / frames
+        
+        label = "math calls" if accurate else "table lookups"
+        print(f"{label:>13}: ray directions {direction_time:.3f} ms, "
+              f"cast_rays {frame_time:.3f} ms per frame")
+    TRIG.accurate = False
 
 if __name__ == "__main__":
     try:
-        game = Game()
-        game.run()
+        if "--benchmark" in sys.argv:
+            run_benchmarks()
+        elif "--headless" in sys.argv:
+            elapsed = Game().simulate(60)
+            print(f"Simulated 60 s of play in {elapsed:.2f} s")
+        else:
+            game = Game()
+            game.run()
     finally:
         pygame.quit()
         sys.exit()
\ No newline at end of file
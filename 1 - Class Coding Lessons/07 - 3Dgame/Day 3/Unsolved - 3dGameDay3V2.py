@@ -3,6 +3,7 @@ import math
 import sys
 import random
 from enum import Enum
+from collections import deque
 
 # Initialize Pygame
 pygame.init()
@@ -33,6 +34,8 @@ class Color(Enum):
     STAR_DARK = (200, 200, 50)
 
 class GameObject:
+    depth_bias = 0  # How far behind the wall depth a billboard may still show
+    
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -74,76 +77,64 @@ class StarObject(GameObject):
         self.pulse_speed = 0.05
         self.y_offset = 0.4  # Additional offset to make it sit lower
         
-    def draw(self, screen, player, renderer):
+    def add_billboard(self, billboards, player, renderer):
         if self.collected:
             return
-            
-        # Calculate distance to player
-        dx = self.x - player.x
-        dy = self.y - player.y
-        dist = math.sqrt(dx**2 + dy**2)
         
-        # Only draw if player is close enough
-        if dist > self.visible_distance:
-            return
-            
-        # Calculate angle and ensure it's within FOV
-        angle = math.atan2(dy, dx) - player.angle
-        while angle > math.pi: angle -= 2 * math.pi
-        while angle < -math.pi: angle += 2 * math.pi
-        
-        if -renderer.HALF_FOV <= angle <= renderer.HALF_FOV:
-            # Calculate projection
-            proj_height = (HEIGHT-UI_HEIGHT) / (dist + 0.0001)
-            screen_x = int((angle + renderer.HALF_FOV) / renderer.FOV * WIDTH)
-            
+        # Only queued if player is close enough and it's within FOV
+        if billboards.add(self, player, self.visible_distance):
             # Animate pulsing effect
             self.pulse += self.pulse_speed
-            pulse_offset = math.sin(self.pulse) * 2
-            
-            # Base size with pulse effect
-            base_size = int(proj_height * self.size) + pulse_offset
-            
-            # Calculate position on ground - lowered by adding more to base_y
-            base_y = (HEIGHT-UI_HEIGHT)//2 + base_size//2 + int(proj_height * self.y_offset)
-            
-            # Create star points (5-point star)
-            outer_radius = base_size
-            inner_radius = outer_radius // 2
-            points = []
-            
-            for i in range(10):
-                angle = math.pi * 2 * i / 10 - math.pi/2
-                radius = inner_radius if i % 2 else outer_radius
-                x = screen_x + radius * math.cos(angle)
-                y = base_y - outer_radius + radius * math.sin(angle) - base_size//2
-                points.append((x, y))
-            
-            # Draw dark shadow first (for 3D effect)
-            shadow_points = [(x, y+3) for x,y in points]
-            pygame.draw.polygon(screen, Color.STAR_DARK.value, shadow_points)
-            
-            # Draw main star
-            pygame.draw.polygon(screen, Color.STAR.value, points)
-            
-            # Add highlight
-            highlight_points = []
-            for i in range(0, 10, 2):
-                x = screen_x + (outer_radius * 0.7) * math.cos(math.pi * 2 * i / 10 - math.pi/2)
-                y = base_y - outer_radius + (outer_radius * 0.7) * math.sin(math.pi * 2 * i / 10 - math.pi/2) - base_size//2
-                highlight_points.append((x, y))
-            
-            highlight_color = (min(255, Color.STAR.value[0]+50), 
-                             min(255, Color.STAR.value[1]+50), 
-                             min(255, Color.STAR.value[2]+50))
-            pygame.draw.polygon(screen, highlight_color, highlight_points)
+    
+    def draw_billboard(self, screen, screen_x, proj_height):
+        pulse_offset = math.sin(self.pulse) * 2
+        
+        # Base size with pulse effect
+        base_size = int(proj_height * self.size) + pulse_offset
+        
+        # Calculate position on ground - lowered by adding more to base_y
+        base_y = (HEIGHT-UI_HEIGHT)//2 + base_size//2 + int(proj_height * self.y_offset)
+        
+        # Create star points (5-point star)
+        outer_radius = base_size
+        inner_radius = outer_radius // 2
+        points = []
+        
+        for i in range(10):
+            angle = math.pi * 2 * i / 10 - math.pi/2
+            radius = inner_radius if i % 2 else outer_radius
+            x = screen_x + radius * math.cos(angle)
+            y = base_y - outer_radius + radius * math.sin(angle) - base_size//2
+            points.append((x, y))
+        
+        # Draw dark shadow first (for 3D effect)
+        shadow_points = [(x, y+3) for x,y in points]
+        pygame.draw.polygon(screen, Color.STAR_DARK.value, shadow_points)
+        
+        # Draw main star
+        pygame.draw.polygon(screen, Color.STAR.value, points)
+        
+        # Add highlight
+        highlight_points = []
+        for i in range(0, 10, 2):
+            x = screen_x + (outer_radius * 0.7) * math.cos(math.pi * 2 * i / 10 - math.pi/2)
+            y = base_y - outer_radius + (outer_radius * 0.7) * math.sin(math.pi * 2 * i / 10 - math.pi/2) - base_size//2
+            highlight_points.append((x, y))
+        
+        highlight_color = (min(255, Color.STAR.value[0]+50), 
+                         min(255, Color.STAR.value[1]+50), 
+                         min(255, Color.STAR.value[2]+50))
+        pygame.draw.polygon(screen, highlight_color, highlight_points)
 
 class NPC(GameObject):
+    facing = (1, 0)  # The view cone has always pointed along +x
+    
     def __init__(self, x, y):
         super().__init__(x + 0.5, y + 0.5)  # Center in the cell
         self.speed = 0.03
         self.detection_radius = 5
         self.detection_angle = math.pi / 3  # 60 degree FOV
+        self.view_cos = math.cos(self.detection_angle / 2)  # For the dot-product FOV check
         self.state = "patrolling"  # "patrolling", "chasing", "searching"
         self.path = []
         self.color = Color.RED.value
@@ -213,37 +204,24 @@ class NPC(GameObject):
         return False
     
     def is_visible_to_player(self, player, game_map):
-        # Calculate positions
-        px, py = player.x, player.y
-        ex, ey = self.x, self.y
-        
-        # Check if there's a direct line without walls between player and enemy
-        steps = max(abs(ex - px), abs(ey - py)) * 10  # Check 10 points per unit
-        for i in range(1, int(steps)):
-            # Calculate intermediate point
-            t = i / steps
-            test_x = px + (ex - px) * t
-            test_y = py + (ey - py) * t
-            
-            # Check if we hit a wall
-            if game_map.get_cell(int(test_x), int(test_y)) == 1:
-                return False
-        return True
+        # Check if there's a direct line without walls between our cell and the player's
+        return game_map.line_of_sight(self.x, self.y, player.x, player.y)
     
     def can_see_player(self, player, game_map):
-        # Calculate distance to player
+        # Calculate squared distance to player
         dx = player.x - self.x
         dy = player.y - self.y
-        distance = math.sqrt(dx**2 + dy**2)
+        distance_sq = dx**2 + dy**2
         
         # Check if player is within detection radius
-        if distance > self.detection_radius:
+        if distance_sq > self.detection_radius**2:
             return False
             
-        # Check if player is within field of view
-        angle_to_player = math.atan2(dy, dx)
-        relative_angle = abs(self.get_angle_to_player(player))
-        if relative_angle > self.detection_angle/2:
+        # Check if player is within field of view: the angle to the player is
+        # inside the cone when its cosine, the dot product over the distance,
+        # is at least the cosine of half the cone
+        dot = dx * self.facing[0] + dy * self.facing[1]
+        if dot < self.view_cos * math.sqrt(distance_sq):
             return False
             
         # Check line of sight (must be clear path with no walls)
@@ -293,79 +271,74 @@ class NPC(GameObject):
         if distance < 0.2:  # Reached last known position
             return
             
-        # Move toward last known position
-        angle = math.atan2(dy, dx)
-        new_x = self.x + math.cos(angle) * self.speed
-        new_y = self.y + math.sin(angle) * self.speed
-        
-        if game_map.get_cell(int(new_x), int(new_y)) == 0:
-            self.x = new_x
-            self.y = new_y
+        # Follow the maze towards last known position
+        self.move_along(game_map.flow_field(target_x, target_y), target_x, target_y, game_map)
     
     def follow_player(self, player, game_map):
-        # Simple movement towards player
-        angle = math.atan2(player.y - self.y, player.x - self.x)
-        new_x = self.x + math.cos(angle) * self.speed
-        new_y = self.y + math.sin(angle) * self.speed
+        # Follow the maze towards the player, sharing one flow field with every other chaser
+        self.move_along(game_map.flow_field(player.x, player.y), player.x, player.y, game_map)
+    
+    def move_along(self, field, target_x, target_y, game_map):
+        # Head for the centre of the next cell on the shortest path, or
+        # straight for the target once we share its cell
+        cell = (int(self.x), int(self.y))
+        if cell == field.goal:
+            aim_x, aim_y = target_x, target_y
+        else:
+            next_cell = field.next_cell.get(cell)
+            if next_cell is None:  # No way through from here
+                return
+            aim_x, aim_y = next_cell[0] + 0.5, next_cell[1] + 0.5
+        
+        dx = aim_x - self.x
+        dy = aim_y - self.y
+        distance = math.sqrt(dx**2 + dy**2)
+        if distance == 0:
+            return
+        step = min(self.speed, distance)
+        new_x = self.x + dx / distance * step
+        new_y = self.y + dy / distance * step
         
-        # Check if new position is valid
-        if game_map.get_cell(int(new_x), int(new_y)) == 0:
+        # Neighbouring cells are both open, so the straight line between them never clips a wall
+        if game_map.get_cell(int(new_x), int(new_y)) != 1:
             self.x = new_x
             self.y = new_y
     
-    def draw(self, screen, player, renderer, game_map):
-        # Calculate distance to player
-        dx = self.x - player.x
-        dy = self.y - player.y
-        dist = math.sqrt(dx**2 + dy**2)
-        
-        # Only draw if player is close enough
-        if dist > self.detection_radius * 1.5:
-            return
-            
-        # Calculate angle and ensure it's within FOV
-        angle = math.atan2(dy, dx) - player.angle
-        while angle > math.pi: angle -= 2 * math.pi
-        while angle < -math.pi: angle += 2 * math.pi
-        
-        # Only draw if enemy is in player's view and has line of sight
-        if (-renderer.HALF_FOV <= angle <= renderer.HALF_FOV and 
-            self.is_visible_to_player(player, game_map)):
-            
-            # Calculate projection
-            proj_height = (HEIGHT-UI_HEIGHT) / (dist + 0.0001)
-            screen_x = int((angle + renderer.HALF_FOV) / renderer.FOV * WIDTH)
-            
-            # Calculate size based on distance
-            size = int(proj_height * self.size)
-            
-            # Calculate position on ground
-            base_y = (HEIGHT-UI_HEIGHT)//2 + size//2
-            
-            # Draw enemy
-            pygame.draw.circle(screen, self.color, (screen_x, base_y), size)
-            
-            # Draw red eyes if chasing
-            if self.state == "chasing":
-                eye_size = size // 3
-                pygame.draw.circle(screen, Color.WHITE.value,
-                                 (screen_x - size//3, base_y - size//4), eye_size)
-                pygame.draw.circle(screen, Color.WHITE.value,
-                                 (screen_x + size//3, base_y - size//4), eye_size)
-                pygame.draw.circle(screen, Color.BLACK.value,
-                                 (screen_x - size//3, base_y - size//4), eye_size//2)
-                pygame.draw.circle(screen, Color.BLACK.value,
-                                 (screen_x + size//3, base_y - size//4), eye_size//2)
+    def add_billboard(self, billboards, player, renderer):
+        # Only drawn if player is close enough; walls in front are clipped away
+        billboards.add(self, player, self.detection_radius * 1.5)
+    
+    def draw_billboard(self, screen, screen_x, proj_height):
+        # Calculate size based on distance
+        size = int(proj_height * self.size)
+        
+        # Calculate position on ground
+        base_y = (HEIGHT-UI_HEIGHT)//2 + size//2
+        
+        # Draw enemy
+        pygame.draw.circle(screen, self.color, (screen_x, base_y), size)
+        
+        # Draw red eyes if chasing
+        if self.state == "chasing":
+            eye_size = size // 3
+            pygame.draw.circle(screen, Color.WHITE.value,
+                             (screen_x - size//3, base_y - size//4), eye_size)
+            pygame.draw.circle(screen, Color.WHITE.value,
+                             (screen_x + size//3, base_y - size//4), eye_size)
+            pygame.draw.circle(screen, Color.BLACK.value,
+                             (screen_x - size//3, base_y - size//4), eye_size//2)
+            pygame.draw.circle(screen, Color.BLACK.value,
+                             (screen_x + size//3, base_y - size//4), eye_size//2)
+        
+        # Add state indicator
+        if self.state == "chasing":
+            state_color = Color.RED.value
+        elif self.state == "searching":
+            state_color = Color.YELLOW.value
+        else:  # patrolling
+            state_color = Color.GREEN.value
             
-            # Add state indicator
-            if self.state == "chasing":
-                state_color = Color.RED.value
-            elif self.state == "searching":
-                state_color = Color.YELLOW.value
-            else:  # patrolling
-                state_color = Color.GREEN.value
-                
-            pygame.draw.circle(screen, state_color, (screen_x, base_y - size - 5), 3)
+        pygame.draw.circle(screen, state_color, (screen_x, base_y - size - 5), 3)
 
 class FastEnemy(NPC):
     def __init__(self, x, y):
@@ -389,12 +362,39 @@ class FastEnemy(NPC):
             self.x = new_x
             self.y = new_y
 
+class FlowField:
+    """Shortest-path steps through the maze towards one goal cell, shared by every enemy chasing it"""
+    NEIGHBOURS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+
+    def __init__(self, map_data, goal):
+        # Breadth-first search out from the goal over every open cell
+        self.goal = goal
+        self.next_cell = {}  # The neighbour one step nearer the goal
+        reached = {goal}
+        width, height = len(map_data[0]), len(map_data)
+        frontier = deque([goal])
+        while frontier:
+            x, y = frontier.popleft()
+            for dx, dy in self.NEIGHBOURS:
+                cell = (x + dx, y + dy)
+                if cell in reached:
+                    continue
+                if not (0 <= cell[0] < width and 0 <= cell[1] < height) or map_data[cell[1]][cell[0]] == 1:
+                    continue
+                reached.add(cell)
+                self.next_cell[cell] = (x, y)
+                frontier.append(cell)
+
 class GameMap:
+    MAX_FLOW_FIELDS = 8  # Goal cells kept at once, oldest dropped first
+
     def __init__(self, map_data):
         self.map_data = map_data
         self.walls = {}
         self.star_object = None
         self.enemies = []  # List to store all enemies
+        self.flow_fields = {}  # Goal cell -> FlowField, only rebuilt when the goal moves to a new cell
+        self.sight_lines = {}  # (cell, cell) -> whether the line between their centres is clear
         self.initialize_walls()
     
     def initialize_walls(self):
@@ -416,6 +416,64 @@ class GameMap:
             return self.map_data[y][x]
         return None
     
+    def set_cell(self, x, y, value):
+        # Paths and sight lines worked out from the old layout no longer hold
+        self.map_data[y][x] = value
+        self.flow_fields.clear()
+        self.sight_lines.clear()
+    
+    def line_of_sight(self, x0, y0, x1, y1):
+        # Visibility is worked out between cell centres, so it only has to be
+        # traced once for each pair of cells until the map changes
+        a, b = (int(x0), int(y0)), (int(x1), int(y1))
+        key = (a, b) if a <= b else (b, a)
+        clear = self.sight_lines.get(key)
+        if clear is None:
+            clear = self.trace_line(*key)
+            self.sight_lines[key] = clear
+        return clear
+    
+    def trace_line(self, start, end):
+        # Step through exactly the cells the line between the two centres
+        # crosses, one grid line at a time, stopping at the first wall
+        (x, y), (end_x, end_y) = start, end
+        step_x = 1 if end_x > x else -1
+        step_y = 1 if end_y > y else -1
+        n_x, n_y = abs(end_x - x), abs(end_y - y)
+        i = j = 0  # Grid lines crossed so far along x and along y
+        while i < n_x or j < n_y:
+            # The next vertical grid line is at t = (2i+1) / 2n_x along the line
+            # and the next horizontal one at (2j+1) / 2n_y; compare without dividing
+            x_first = (2 * i + 1) * n_y
+            y_first = (2 * j + 1) * n_x
+            if j == n_y or (i < n_x and x_first < y_first):
+                x += step_x
+                i += 1
+            elif i == n_x or y_first < x_first:
+                y += step_y
+                j += 1
+            else:
+                # Exactly through a corner, which only walls on both sides close off
+                if self.get_cell(x + step_x, y) == 1 and self.get_cell(x, y + step_y) == 1:
+                    return False
+                x += step_x
+                y += step_y
+                i += 1
+                j += 1
+            if self.get_cell(x, y) == 1:
+                return False
+        return True
+    
+    def flow_field(self, x, y):
+        goal = (int(x), int(y))
+        field = self.flow_fields.get(goal)
+        if field is None:
+            if len(self.flow_fields) >= self.MAX_FLOW_FIELDS:
+                del self.flow_fields[next(iter(self.flow_fields))]
+            field = FlowField(self.map_data, goal)
+            self.flow_fields[goal] = field
+        return field
+    
     def color_wall(self, x, y, color):
         if (x, y) in self.walls:
             self.walls[(x, y)].set_color(color)
@@ -563,6 +621,68 @@ class Reticle:
                         (center_x, center_y + self.size), self.thickness)
         pygame.draw.circle(screen, inverted_color, (center_x, center_y), self.size, self.thickness)
 
+class Billboards:
+    """Sprites drawn furthest first after the walls, clipped to the columns no wall hides"""
+    def __init__(self, width, height, fov):
+        self.width = width
+        self.height = height
+        self.fov = fov
+        self.half_fov = fov / 2
+        self.depths = [math.inf] * width  # Nearest wall per screen column
+        self.sprites = []                 # (distance, screen_x, sprite) queued this frame
+
+    def clear(self):
+        self.depths = [math.inf] * self.width
+
+    def set_depth(self, x, width, depth):
+        """Records the wall depth for the columns x to x + width"""
+        for column in range(x, min(x + width, self.width)):
+            self.depths[column] = depth
+
+    def add(self, sprite, player, max_distance):
+        """Queues sprite if it is within max_distance and in view, and returns whether it was"""
+        dx = sprite.x - player.x
+        dy = sprite.y - player.y
+        dist_sq = dx * dx + dy * dy
+        if dist_sq > max_distance * max_distance:
+            return False
+
+        angle = (math.atan2(dy, dx) - player.angle + math.pi) % (2 * math.pi) - math.pi
+        if not -self.half_fov <= angle <= self.half_fov:
+            return False
+
+        screen_x = int((angle + self.half_fov) / self.fov * self.width)
+        self.sprites.append((math.sqrt(dist_sq), screen_x, sprite))
+        return True
+
+    def open_spans(self, left, right, depth):
+        """Yields (start, end) runs of columns in left..right with no wall nearer than depth"""
+        depths = self.depths
+        start = None
+        for x in range(left, right):
+            if depths[x] > depth:
+                if start is None:
+                    start = x
+            elif start is not None:
+                yield start, x
+                start = None
+        if start is not None:
+            yield start, right
+
+    def draw(self, screen):
+        self.sprites.sort(key=lambda entry: entry[0], reverse=True)
+        for distance, screen_x, sprite in self.sprites:
+            proj_height = self.height / (distance + 0.0001)
+            # Generous half-width so glows and outlines are not cut off
+            reach = int(proj_height * sprite.size * 1.2) + 12
+            left = max(0, screen_x - reach)
+            right = min(self.width, screen_x + reach + 1)
+            for start, end in self.open_spans(left, right, distance - sprite.depth_bias):
+                screen.set_clip((start, 0, end - start, self.height))
+                sprite.draw_billboard(screen, screen_x, proj_height)
+        screen.set_clip(None)
+        self.sprites.clear()
+
 class Renderer:
     def __init__(self):
         # Set up the game window with specified dimensions
@@ -575,6 +695,9 @@ class Renderer:
         self.NUM_RAYS = WIDTH            # One ray cast for each vertical screen column
         self.DELTA_ANGLE = self.FOV / self.NUM_RAYS  # Angle between adjacent rays
         self.MAX_DEPTH = 20              # Maximum distance rays can travel
+        
+        # Collects stars and enemies each frame and hides them behind nearer walls
+        self.billboards = Billboards(WIDTH, HEIGHT - UI_HEIGHT, self.FOV)
     
     def draw_floor_and_ceiling(self):
         """
@@ -597,7 +720,10 @@ class Renderer:
         1. Shoots rays in a fan-shaped pattern from the player
         2. Checks for wall collisions
         3. Draws vertical wall slices based on distance
+        4. Records each column's wall distance for the billboards
         """
+        self.billboards.clear()
+        
         # Cast one ray for each vertical screen column
         for ray in range(self.NUM_RAYS):
             # Calculate angle of this ray (spread across the FOV)
@@ -642,6 +768,8 @@ class Renderer:
                         proj_height,   # height of wall slice
                         depth_shade    # color with distance shading
                     )
+                    # Sprites further away than this are hidden behind the wall
+                    self.billboards.set_depth(ray, 1, depth)
 
 class Game:
     def __init__(self):
@@ -781,13 +909,15 @@ class Game:
             self.renderer.draw_floor_and_ceiling()
             self.renderer.cast_rays(self.player, self.game_map)
             
-            # Draw star object if it exists and isn't collected
+            # Queue star object if it exists and isn't collected
+            billboards = self.renderer.billboards
             if self.game_map.star_object and not self.game_map.star_object.collected:
-                self.game_map.star_object.draw(self.screen, self.player, self.renderer)
+                self.game_map.star_object.add_billboard(billboards, self.player, self.renderer)
             
-            # Draw enemies
+            # Queue enemies, then draw everything furthest first
             for enemy in self.game_map.enemies:
-                enemy.draw(self.screen, self.player, self.renderer, self.game_map)
+                enemy.add_billboard(billboards, self.player, self.renderer)
+            billboards.draw(self.screen)
             
             self.player.projectile.draw(self.screen)
             self.color_selector.draw_notification(self.screen)
@@ -2,7 +2,16 @@ import pygame
 import sys
 import random
 import math
+import time
+import gc
+import tracemalloc
 from enum import Enum
+from operator import attrgetter
+
+try:
+    import numpy as np  # Optional: enables the vectorized enemy steering
+except ImportError:
+    np = None
 
 # Initialize Pygame
 pygame.init()
@@ -34,6 +43,7 @@ class Player:
     def __init__(self):
         self.x = WIDTH // 2
         self.y = HEIGHT // 2
+        self.prev_x, self.prev_y = self.x, self.y  # Position at the start of the last step
         self.size = 15
         self.speed = 5
         self.health = 3
@@ -50,28 +60,34 @@ class Player:
         self.x = max(self.size, min(WIDTH - self.size, self.x + dx * self.speed))
         self.y = max(self.size, min(HEIGHT - self.size, self.y + dy * self.speed))
         
-    def draw(self, screen):
+    def draw(self, screen, alpha=1):
+        # alpha is how far to draw between the last two simulated positions
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        y = self.prev_y + (self.y - self.prev_y) * alpha
         if self.shape == "square":
-            pygame.draw.rect(screen, self.color, (self.x - self.size//2, self.y - self.size//2, self.size, self.size))
+            pygame.draw.rect(screen, self.color, (x - self.size//2, y - self.size//2, self.size, self.size))
         else:  # circle
-            pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), self.size//2)
+            pygame.draw.circle(screen, self.color, (int(x), int(y)), self.size//2)
         
     def can_shoot(self):
         return self.shoot_cooldown <= 0
         
-    def shoot(self, target_x, target_y):
+    def shoot(self, target_x, target_y, second_target=None):
         bullets = []
         if self.can_shoot():
             self.shoot_cooldown = self.shoot_delay
-            bullets.append(Bullet(self.x, self.y, target_x, target_y))
-            if self.double_shot:
+            bullets.append(BULLETS.acquire(self.x, self.y, target_x, target_y))
+            if self.double_shot and second_target is not None:
+                # Send the second bullet at a different enemy
+                bullets.append(BULLETS.acquire(self.x, self.y, second_target.x, second_target.y))
+            elif self.double_shot:
                 # Add slight angle variation for second bullet
                 angle = math.atan2(target_y - self.y, target_x - self.x)
                 angle += math.radians(10)  # 10 degree offset
                 dist = math.sqrt((target_x-self.x)**2 + (target_y-self.y)**2)
                 new_target_x = self.x + dist * math.cos(angle)
                 new_target_y = self.y + dist * math.sin(angle)
-                bullets.append(Bullet(self.x, self.y, new_target_x, new_target_y))
+                bullets.append(BULLETS.acquire(self.x, self.y, new_target_x, new_target_y))
         return bullets
         
     def update(self):
@@ -79,9 +95,17 @@ class Player:
             self.shoot_cooldown -= 1
 
 class Bullet:
+    # Slots instead of a __dict__ per bullet; there can be hundreds on screen
+    __slots__ = ("x", "y", "prev_x", "prev_y", "radius", "speed", "damage", "vx", "vy")
+    
     def __init__(self, x, y, target_x, target_y):
+        self.reset(x, y, target_x, target_y)
+        
+    def reset(self, x, y, target_x, target_y):
+        # Sets up a fresh bullet, or a pooled one being fired again
         self.x = x
         self.y = y
+        self.prev_x, self.prev_y = x, y
         self.radius = 5
         self.speed = 10
         self.damage = 1
@@ -95,17 +119,26 @@ class Bullet:
         self.x += self.vx
         self.y += self.vy
         
-    def draw(self, screen):
-        pygame.draw.circle(screen, RED, (int(self.x), int(self.y)), self.radius)
+    def draw(self, screen, alpha=1):
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        y = self.prev_y + (self.y - self.prev_y) * alpha
+        pygame.draw.circle(screen, RED, (int(x), int(y)), self.radius)
         
     def is_off_screen(self):
         return (self.x < -self.radius or self.x > WIDTH + self.radius or 
                 self.y < -self.radius or self.y > HEIGHT + self.radius)
 
 class Enemy:
+    __slots__ = ("x", "y", "prev_x", "prev_y", "size", "speed", "health", "color")
+    
     def __init__(self, x, y):
+        self.reset(x, y)
+        
+    def reset(self, x, y):
+        # Sets up a fresh enemy, or a pooled one being spawned again
         self.x = x
         self.y = y
+        self.prev_x, self.prev_y = x, y
         self.size = 20
         self.speed = random.uniform(1.0, 2.5)
         self.health = 1
@@ -119,17 +152,290 @@ class Enemy:
             self.x += (dx / dist) * self.speed
             self.y += (dy / dist) * self.speed
             
-    def draw(self, screen):
+    def draw(self, screen, alpha=1):
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        y = self.prev_y + (self.y - self.prev_y) * alpha
         points = [
-            (self.x, self.y - self.size),
-            (self.x - self.size, self.y + self.size),
-            (self.x + self.size, self.y + self.size)
+            (x, y - self.size),
+            (x - self.size, y + self.size),
+            (x + self.size, y + self.size)
         ]
         pygame.draw.polygon(screen, self.color, points)
         
     def collides_with(self, bullet):
-        distance = math.sqrt((self.x - bullet.x)**2 + (self.y - bullet.y)**2)
-        return distance < self.size + bullet.radius
+        # Compare squared distances so no square root is needed
+        dx = self.x - bullet.x
+        dy = self.y - bullet.y
+        reach = self.size + bullet.radius
+        return dx*dx + dy*dy < reach*reach
+
+class Horde:
+    # Steers every enemy towards the player in one go with NumPy arrays
+    # instead of one Enemy.update call each. Positions and speeds are
+    # gathered from the enemies, moved together and written back. With
+    # separation on, enemies closer than a cell apart also push away from
+    # each other, so a crowd spreads out instead of stacking up. Without
+    # NumPy, or for a small horde with no separation, they are moved in
+    # one plain loop instead
+    MIN_BATCH = 64  # Fewer enemies than this are quicker to move one by one
+    NEIGHBOURS = 4  # How many enemies further along the cell order each one is checked against
+    get_x = attrgetter("x")
+    get_y = attrgetter("y")
+    get_speed = attrgetter("speed")
+    
+    def __init__(self, separation=0.0, cell_size=20):
+        self.separation = separation  # Push apart as a fraction of each enemy's speed, 0 for none
+        self.cell_size = cell_size
+        
+    def steer(self, enemies, player):
+        count = len(enemies)
+        if np is None or (count < self.MIN_BATCH and not self.separation):
+            self.steer_one_by_one(enemies, player)
+            return
+        
+        x = np.fromiter(map(self.get_x, enemies), float, count)
+        y = np.fromiter(map(self.get_y, enemies), float, count)
+        speed = np.fromiter(map(self.get_speed, enemies), float, count)
+        
+        # Straight at the player at each enemy's own speed
+        dx = player.x - x
+        dy = player.y - y
+        scale = np.divide(speed, np.hypot(dx, dy), out=np.zeros(count), where=(dx != 0) | (dy != 0))
+        step_x = dx * scale
+        step_y = dy * scale
+        
+        if self.separation and count > 1:
+            push_x, push_y = self.separate(x, y)
+            step_x += push_x * speed * self.separation
+            step_y += push_y * speed * self.separation
+        
+        x += step_x
+        y += step_y
+        for enemy, new_x, new_y in zip(enemies, x.tolist(), y.tolist()):
+            enemy.x = new_x
+            enemy.y = new_y
+            
+    @staticmethod
+    def steer_one_by_one(enemies, player):
+        # Same as calling Enemy.update on each enemy, in one loop with the
+        # player's position held in locals
+        px = player.x
+        py = player.y
+        sqrt = math.sqrt
+        for enemy in enemies:
+            dx = px - enemy.x
+            dy = py - enemy.y
+            dist = sqrt(dx*dx + dy*dy)
+            if dist > 0:
+                speed = enemy.speed
+                enemy.x += (dx / dist) * speed
+                enemy.y += (dy / dist) * speed
+                
+    def separate(self, x, y):
+        # Sorts the enemies by cell so neighbours in the same cell sit next
+        # to each other, then compares each with the next few in that order.
+        # Every close pair pushes apart, harder the more they overlap, and
+        # the pushes are summed per enemy
+        reach = self.cell_size
+        cells = (x // reach).astype(np.int64) * 65536 + (y // reach).astype(np.int64)
+        order = np.argsort(cells, kind="stable")
+        cells, sorted_x, sorted_y = cells[order], x[order], y[order]
+        push_x = np.zeros(len(x))
+        push_y = np.zeros(len(x))
+        for shift in range(1, self.NEIGHBOURS + 1):
+            apart_x = sorted_x[:-shift] - sorted_x[shift:]
+            apart_y = sorted_y[:-shift] - sorted_y[shift:]
+            distance = np.hypot(apart_x, apart_y)
+            close = (cells[:-shift] == cells[shift:]) & (distance < reach)
+            # Enemies on exactly the same spot split sideways
+            stacked = distance == 0
+            apart_x[stacked] = 1.0
+            distance[stacked] = 1.0
+            strength = np.where(close, (1 - distance / reach) / distance, 0.0)
+            push_x[:-shift] += apart_x * strength
+            push_x[shift:] -= apart_x * strength
+            push_y[:-shift] += apart_y * strength
+            push_y[shift:] -= apart_y * strength
+        # Back into the enemies' own order
+        unsorted_x = np.empty_like(push_x)
+        unsorted_y = np.empty_like(push_y)
+        unsorted_x[order] = push_x
+        unsorted_y[order] = push_y
+        return unsorted_x, unsorted_y
+
+class Pool:
+    # Keeps bullets and enemies that left play so new ones can reuse them
+    # instead of allocating, which keeps long rounds off the allocator and GC
+    def __init__(self, kind):
+        self.kind = kind
+        self.free = []
+        self.created = 0
+        self.reused = 0
+        self.enabled = True  # When off every object is new and dropped objects are left to the GC
+        
+    def restart(self, enabled=True):
+        # Empties the pool and its counters, and turns pooling on or off
+        self.enabled = enabled
+        self.free.clear()
+        self.created = 0
+        self.reused = 0
+        
+    def acquire(self, *args):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args)
+            self.reused += 1
+            return obj
+        self.created += 1
+        return self.kind(*args)
+        
+    def compact(self, items, is_dead):
+        # Removes every object is_dead picks out of the list in place and
+        # keeps it for reuse; the last object fills each gap, so nothing
+        # after it has to shift down the way it would with list.remove
+        i = 0
+        while i < len(items):
+            obj = items[i]
+            if is_dead(obj):
+                if self.enabled:
+                    self.free.append(obj)
+                items[i] = items[-1]
+                items.pop()
+            else:
+                i += 1
+                
+    def release_all(self, items):
+        if self.enabled:
+            self.free.extend(items)
+        items.clear()
+
+# Shared by the player's gun, enemy spawning and every cleanup of the live lists
+BULLETS = Pool(Bullet)
+ENEMIES = Pool(Enemy)
+
+class SpatialGrid:
+    # Buckets objects by the square cell their centre is in, so collision
+    # checks only look at objects in nearby cells instead of every object
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.count = 0
+        
+    def clear(self):
+        self.cells.clear()
+        self.count = 0
+        
+    def rebuild(self, objs):
+        # Buckets all of objs from scratch, much faster than inserting them
+        # one at a time. Floor division leaves float keys, which hash and
+        # compare equal to the int keys looked up below
+        cells = {}
+        add_to = cells.setdefault
+        size = self.cell_size
+        for obj in objs:
+            add_to((obj.x // size, obj.y // size), []).append(obj)
+        self.cells = cells
+        self.count = len(objs)
+        
+    def insert(self, obj):
+        self.count += 1
+        key = (int(obj.x // self.cell_size), int(obj.y // self.cell_size))
+        cell = self.cells.get(key)
+        if cell is None:
+            self.cells[key] = [obj]
+        else:
+            cell.append(obj)
+            
+    def remove(self, obj):
+        # Takes out an object that has not moved since the grid was built
+        self.cells[(obj.x // self.cell_size, obj.y // self.cell_size)].remove(obj)
+        self.count -= 1
+            
+    def nearby(self, x, y, reach):
+        # Every object in a cell that overlaps the box reach pixels around (x, y)
+        min_col = int((x - reach) // self.cell_size)
+        max_col = int((x + reach) // self.cell_size)
+        min_row = int((y - reach) // self.cell_size)
+        max_row = int((y + reach) // self.cell_size)
+        for col in range(min_col, max_col + 1):
+            for row in range(min_row, max_row + 1):
+                cell = self.cells.get((col, row))
+                if cell:
+                    yield from cell
+                    
+    def nearest(self, x, y, count=1):
+        # The count objects closest to (x, y), nearest first. Cells are
+        # searched in growing square rings around the cell (x, y) is in, and
+        # the search stops once no ring further out could hold anything
+        # closer than the count best found so far
+        col = int(x // self.cell_size)
+        row = int(y // self.cell_size)
+        # Distance from (x, y) to the edge of its own cell; every cell in
+        # ring n is at least this plus n - 1 whole cells away
+        inner = min(x - col * self.cell_size, (col + 1) * self.cell_size - x,
+                    y - row * self.cell_size, (row + 1) * self.cell_size - y)
+        found = []
+        seen = 0
+        ring = 0
+        while seen < self.count:
+            if len(found) >= count and ring > 0:
+                reach = inner + (ring - 1) * self.cell_size
+                if reach * reach >= found[count - 1][0]:
+                    break
+            for key in self.ring_cells(col, row, ring):
+                cell = self.cells.get(key)
+                if cell:
+                    seen += len(cell)
+                    for obj in cell:
+                        dx = obj.x - x
+                        dy = obj.y - y
+                        found.append((dx*dx + dy*dy, obj))
+            found.sort(key=lambda item: item[0])
+            ring += 1
+        return [obj for _, obj in found[:count]]
+        
+    @staticmethod
+    def ring_cells(col, row, ring):
+        # The cells exactly ring steps from (col, row), counting diagonals as one step
+        if ring == 0:
+            yield (col, row)
+            return
+        for c in range(col - ring, col + ring + 1):
+            yield (c, row - ring)
+            yield (c, row + ring)
+        for r in range(row - ring + 1, row + ring):
+            yield (col - ring, r)
+            yield (col + ring, r)
+
+class SimulationClock:
+    # Fixed-timestep clock behind Game.run; gameplay timers read the simulated time, now
+    
+    def __init__(self, rate=60, max_steps=8):
+        self.rate = rate
+        self.step = 1 / rate
+        self.max_steps = max_steps  # Most steps run in one frame before time is dropped
+        self.ticks = 0
+        self.now = 0.0
+        self.accumulator = 0.0
+        self.alpha = 0.0
+    
+    def advance(self, elapsed):
+        # Adds elapsed real seconds and returns how many steps to simulate
+        self.accumulator += elapsed
+        steps = int(self.accumulator / self.step)
+        self.accumulator -= steps * self.step
+        # After a long stall, drop the backlog instead of trying to catch up,
+        # which would only make the next frame slower still
+        steps = min(steps, self.max_steps)
+        self.alpha = self.accumulator / self.step
+        return steps
+    
+    def tick(self):
+        self.ticks += 1
+        self.now = self.ticks * self.step
+
+# Shared by the game loop and every gameplay timer
+CLOCK = SimulationClock()
 
 class Button:
     def __init__(self, x, y, width, height, text, color, hover_color):
@@ -200,11 +506,13 @@ class Game:
         self.player = Player()
         self.bullets = []
         self.enemies = []
+        self.enemy_grid = SpatialGrid(50)  # Rebuilt once a step for hits, then reused for aiming
+        self.horde = Horde(0.5 if "--separation" in sys.argv else 0.0)
         self.level = 1
         self.level_shoot_delays = {1: 40, 2: 20}
         self.round_time = 30
         self.last_enemy_spawn = 0
-        self.enemy_spawn_delay = 1000
+        self.enemy_spawn_delay = 1.0  # seconds
         self.start_time = 0
         self.time_when_died = 0
         self.upgrades = [
@@ -236,9 +544,9 @@ class Game:
         self.player = Player()
         self.player.color = self.get_player_color()
         self.player.shape = "circle" if "circle" in self.player_shape_button.text else "square"
-        self.bullets = []
-        self.enemies = []
-        self.start_time = pygame.time.get_ticks()
+        BULLETS.release_all(self.bullets)
+        ENEMIES.release_all(self.enemies)
+        self.start_time = CLOCK.now
         self.last_enemy_spawn = 0
         self.player.shoot_delay = self.level_shoot_delays.get(self.level, 30)
         if self.level == 2:
@@ -266,22 +574,21 @@ class Game:
         else:
             x = -20
             y = random.randint(0, HEIGHT)
-        self.enemies.append(Enemy(x, y))
+        self.enemies.append(ENEMIES.acquire(x, y))
         
-    def find_closest_enemy(self):
-        closest_enemy = None
-        min_distance = float('inf')
-        for enemy in self.enemies:
-            distance = math.sqrt((enemy.x - self.player.x)**2 + (enemy.y - self.player.y)**2)
-            if distance < min_distance:
-                min_distance = distance
-                closest_enemy = enemy
-        return closest_enemy
+    def find_closest_enemies(self, count):
+        # The count enemies nearest the player, nearest first, from the grid
+        # handle_collisions built this step
+        return self.enemy_grid.nearest(self.player.x, self.player.y, count)
         
     def auto_shoot(self):
-        closest_enemy = self.find_closest_enemy()
-        if closest_enemy:
-            new_bullets = self.player.shoot(closest_enemy.x, closest_enemy.y)
+        # Only look for targets on steps when the gun can actually fire
+        if not self.player.can_shoot():
+            return
+        targets = self.find_closest_enemies(2 if self.player.double_shot else 1)
+        if targets:
+            second_target = targets[1] if len(targets) > 1 else None
+            new_bullets = self.player.shoot(targets[0].x, targets[0].y, second_target)
             if new_bullets:
                 self.bullets.extend(new_bullets)
         
@@ -367,6 +674,10 @@ class Game:
     def update(self):
         if self.state != GameState.PLAYING:
             return
+        
+        # Where everything was at the start of this step, for drawing between steps
+        for obj in (self.player, *self.enemies, *self.bullets):
+            obj.prev_x, obj.prev_y = obj.x, obj.y
             
         keys = pygame.key.get_pressed()
         dx, dy = 0, 0
@@ -384,42 +695,65 @@ class Game:
             self.player.move(dx, dy)
             
         self.player.update()
-        self.auto_shoot()
         
-        current_time = pygame.time.get_ticks()
+        current_time = CLOCK.now
         if current_time - self.last_enemy_spawn > self.enemy_spawn_delay:
             self.spawn_enemy()
             self.last_enemy_spawn = current_time
             
-        for bullet in self.bullets[:]:
+        for bullet in self.bullets:
             bullet.update()
-            if bullet.is_off_screen():
-                self.bullets.remove(bullet)
+        BULLETS.compact(self.bullets, Bullet.is_off_screen)
                 
-        for enemy in self.enemies[:]:
-            enemy.update(self.player)
-            distance = math.sqrt((enemy.x - self.player.x)**2 + (enemy.y - self.player.y)**2)
-            if distance < enemy.size + self.player.size//2:
-                self.player.health -= 1
-                self.enemies.remove(enemy)
-                if self.player.health <= 0:
-                    self.time_when_died = (pygame.time.get_ticks() - self.start_time) / 1000
-                    self.state = GameState.GAME_OVER
-                continue
+        self.horde.steer(self.enemies, self.player)
+        self.handle_collisions()
+        self.auto_shoot()
+                    
+        elapsed = CLOCK.now - self.start_time
+        if elapsed >= self.round_time:
+            self.state = GameState.UPGRADE
                 
-            for bullet in self.bullets[:]:
-                if enemy.collides_with(bullet):
+    def handle_collisions(self):
+        # Put every enemy in the grid so the player and each bullet only
+        # check nearby enemies. The grid is kept for auto_shoot afterwards
+        self.enemy_grid.rebuild(self.enemies)
+        enemy_reach = max((enemy.size for enemy in self.enemies), default=0)
+        
+        # Hits are collected first and swept out of the lists in one go at the
+        # end. Each bullet hits at most one enemy and each enemy takes at most
+        # one bullet a step, so a bullet passes over an enemy already hit
+        used_bullets = set()
+        hit_enemies = set()
+        removed_enemies = set()
+        player = self.player
+        for enemy in self.enemy_grid.nearby(player.x, player.y, enemy_reach + player.size//2):
+            dx = enemy.x - player.x
+            dy = enemy.y - player.y
+            reach = enemy.size + player.size//2
+            if dx*dx + dy*dy < reach*reach:
+                player.health -= 1
+                removed_enemies.add(enemy)
+                if player.health <= 0:
+                    self.time_when_died = CLOCK.now - self.start_time
+                    self.state = GameState.GAME_OVER
+                    
+        for bullet in self.bullets:
+            for enemy in self.enemy_grid.nearby(bullet.x, bullet.y, enemy_reach + bullet.radius):
+                if enemy not in hit_enemies and enemy not in removed_enemies and enemy.collides_with(bullet):
                     enemy.health -= bullet.damage
-                    if bullet in self.bullets:
-                        self.bullets.remove(bullet)
+                    used_bullets.add(bullet)
+                    hit_enemies.add(enemy)
                     if enemy.health <= 0:
-                        self.player.score += 10
-                        self.enemies.remove(enemy)
+                        player.score += 10
+                        removed_enemies.add(enemy)
                     break
-                    
-        elapsed = (pygame.time.get_ticks() - self.start_time) / 1000
-        if elapsed >= self.round_time:
-            self.state = GameState.UPGRADE
+        
+        if used_bullets:
+            BULLETS.compact(self.bullets, used_bullets.__contains__)
+        if removed_enemies:
+            ENEMIES.compact(self.enemies, removed_enemies.__contains__)
+            for enemy in removed_enemies:
+                self.enemy_grid.remove(enemy)
                 
     def draw(self):
         # Set background color based on options
@@ -453,11 +787,13 @@ class Game:
         self.credits_button.draw(self.screen)
         
     def draw_game(self):
+        # Only blend positions while the simulation is still stepping
+        alpha = CLOCK.alpha if self.state == GameState.PLAYING else 1
         for bullet in self.bullets:
-            bullet.draw(self.screen)
+            bullet.draw(self.screen, alpha)
         for enemy in self.enemies:
-            enemy.draw(self.screen)
-        self.player.draw(self.screen)
+            enemy.draw(self.screen, alpha)
+        self.player.draw(self.screen, alpha)
         
         health_text = self.font.render(f"Health: {self.player.health}", True, BLACK)
         score_text = self.font.render(f"Score: {self.player.score}", True, BLACK)
@@ -465,7 +801,7 @@ class Game:
         if self.state == GameState.GAME_OVER:
             time_left = max(0, self.round_time - self.time_when_died)
         else:
-            elapsed = (pygame.time.get_ticks() - self.start_time) / 1000
+            elapsed = CLOCK.now - self.start_time
             time_left = max(0, self.round_time - elapsed)
             
         time_text = self.font.render(f"Time: {time_left:.1f}", True, BLACK)
@@ -548,15 +884,236 @@ class Game:
         self.back_button.draw(self.screen)
         
     def run(self):
+        # One update() per CLOCK.step of real time; the dummy driver takes one step per frame
+        headless = pygame.display.get_driver() == "dummy"
+        last_frame = time.perf_counter()
         running = True
         while running:
+            frame_start = time.perf_counter()
+            steps = 1 if headless else CLOCK.advance(frame_start - last_frame)
+            last_frame = frame_start
+            
             running = self.handle_events()
-            self.update()
+            for _ in range(steps):
+                self.update()
+                CLOCK.tick()
             self.draw()
-            self.clock.tick(FPS)
+            if not headless:
+                self.clock.tick(FPS)
         pygame.quit()
         sys.exit()
+        
+    def simulate(self, seconds):
+        # Plays seconds of game time without drawing and returns the real seconds it took
+        self.reset_level()
+        self.state = GameState.PLAYING
+        start = time.perf_counter()
+        for _ in range(int(seconds * CLOCK.rate)):
+            pygame.event.pump()
+            self.update()
+            CLOCK.tick()
+        return time.perf_counter() - start
+
+def run_collision_benchmark():
+    # Times one collision pass with the grid against the old check of every
+    # enemy against every bullet (run with --benchmark)
+    game = Game()
+    game.state = GameState.PLAYING
+    
+    def fill(count):
+        random.seed(0)
+        game.player = Player()
+        game.player.health = count + 1
+        game.enemies = [Enemy(random.uniform(0, WIDTH), random.uniform(0, HEIGHT)) for _ in range(count)]
+        game.bullets = [Bullet(random.uniform(0, WIDTH), random.uniform(0, HEIGHT),
+                               random.uniform(0, WIDTH), random.uniform(0, HEIGHT)) for _ in range(count)]
+        
+    def check_every_pair():
+        for enemy in game.enemies[:]:
+            for bullet in game.bullets[:]:
+                if enemy.collides_with(bullet):
+                    game.bullets.remove(bullet)
+                    game.enemies.remove(enemy)
+                    break
+    
+    for count in (1000, 5000):
+        fill(count)
+        start = time.perf_counter()
+        game.handle_collisions()
+        grid_ms = (time.perf_counter() - start) * 1000
+        print(f"{count} enemies, {count} bullets: grid {grid_ms:.1f} ms, "
+              f"{count - len(game.enemies)} enemies hit")
+        
+        fill(count)
+        start = time.perf_counter()
+        check_every_pair()
+        print(f"{count} enemies, {count} bullets: every pair {(time.perf_counter() - start) * 1000:.1f} ms")
+    pygame.quit()
+
+def run_aim_benchmark(shots=2000):
+    # Times finding auto-aim targets in the enemy grid handle_collisions
+    # already built against scanning every enemy with a square root each.
+    # Building the grid is timed on its own since collisions pay for it
+    # every step either way (run with --benchmark)
+    game = Game()
+    
+    def scan():
+        closest_enemy = None
+        min_distance = float('inf')
+        for enemy in game.enemies:
+            distance = math.sqrt((enemy.x - game.player.x)**2 + (enemy.y - game.player.y)**2)
+            if distance < min_distance:
+                min_distance = distance
+                closest_enemy = enemy
+        return closest_enemy
+    
+    for count in (50, 500, 2000):
+        random.seed(0)
+        game.enemies = [Enemy(random.uniform(0, WIDTH), random.uniform(0, HEIGHT)) for _ in range(count)]
+        start = time.perf_counter()
+        for _ in range(shots):
+            scan()
+        scan_us = (time.perf_counter() - start) * 1e6 / shots
+        start = time.perf_counter()
+        for _ in range(shots):
+            game.enemy_grid.rebuild(game.enemies)
+        build_us = (time.perf_counter() - start) * 1e6 / shots
+        start = time.perf_counter()
+        for _ in range(shots):
+            game.find_closest_enemies(1)
+        grid_us = (time.perf_counter() - start) * 1e6 / shots
+        start = time.perf_counter()
+        for _ in range(shots):
+            game.find_closest_enemies(2)
+        pair_us = (time.perf_counter() - start) * 1e6 / shots
+        assert game.find_closest_enemies(1)[0] is scan()
+        print(f"{count} enemies: scan {scan_us:.1f} us, grid nearest {grid_us:.1f} us, "
+              f"grid 2 nearest {pair_us:.1f} us per shot, building the grid for "
+              f"collisions {build_us:.1f} us per step")
+
+def run_horde_benchmark(steps=20):
+    # Times moving hordes of growing size with an Enemy.update call each,
+    # the plain loop Horde falls back on and the vectorized Horde with and
+    # without separation, then whole 10,000 enemy game steps (run with --benchmark)
+    game = Game()
+    
+    def fill(count):
+        random.seed(0)
+        return [Enemy(random.uniform(0, WIDTH), random.uniform(0, HEIGHT)) for _ in range(count)]
+    
+    def time_steps(move, count):
+        enemies = fill(count)
+        start = time.perf_counter()
+        for _ in range(steps):
+            move(enemies)
+        return (time.perf_counter() - start) * 1000 / steps
+    
+    def update_each(enemies):
+        for enemy in enemies:
+            enemy.update(game.player)
+    
+    for count in (1000, 5000, 10000, 20000):
+        times = [time_steps(update_each, count),
+                 time_steps(lambda enemies: Horde.steer_one_by_one(enemies, game.player), count)]
+        if np is not None:
+            for separation in (0.0, 0.5):
+                horde = Horde(separation)
+                times.append(time_steps(lambda enemies: horde.steer(enemies, game.player), count))
+        print(f"{count} enemies: " + ", ".join(
+            f"{label} {ms:.2f} ms" for label, ms in
+            zip(("Enemy.update each", "one loop", "vectorized", "vectorized with separation"), times))
+            + " per step")
+    
+    for separation in (0.0, 0.5):
+        game.horde = Horde(separation)
+        game.reset_level()
+        game.state = GameState.PLAYING
+        game.player.health = 10**9
+        game.enemies = fill(10000)
+        start = time.perf_counter()
+        for _ in range(steps):
+            game.update()
+        print(f"10000 enemies, separation {separation}: whole game step "
+              f"{(time.perf_counter() - start) * 1000 / steps:.1f} ms")
+
+def play_session(game, seconds, step_times=None):
+    # Scripted play: the player stands in the middle with every upgrade and
+    # cannot die, enemies pour in ten times as fast as usual and each round
+    # goes straight into the next one
+    random.seed(0)
+    game.level = 1
+    game.enemy_spawn_delay = 0.1
+    game.state = GameState.UPGRADE
+    for _ in range(int(seconds * CLOCK.rate)):
+        if game.state != GameState.PLAYING:
+            game.level += 1
+            game.reset_level()
+            game.state = GameState.PLAYING
+            game.player.double_shot = True
+            game.player.shoot_delay = 2
+            game.player.health = 10**9
+        start = time.perf_counter()
+        game.update()
+        game.draw_game()
+        if step_times is not None:
+            step_times.append((time.perf_counter() - start) * 1000)
+        CLOCK.tick()
+
+def run_session_report(seconds=300):
+    # Plays a scripted five minute session with the object pools off and
+    # then on. Each is played twice, once timed and once with tracemalloc
+    # on, and frame times, garbage collections, allocations and memory are
+    # printed side by side (run with --report)
+    game = Game()
+    columns = []
+    for pooled in (False, True):
+        game.bullets.clear()
+        game.enemies.clear()
+        BULLETS.restart(pooled)
+        ENEMIES.restart(pooled)
+        step_times = []
+        collections = sum(stat["collections"] for stat in gc.get_stats())
+        play_session(game, seconds, step_times)
+        collections = sum(stat["collections"] for stat in gc.get_stats()) - collections
+        step_times.sort()
+        column = {
+            "frames": f"{len(step_times)}",
+            "average ms": f"{sum(step_times) / len(step_times):.3f}",
+            "99th percentile ms": f"{step_times[len(step_times) * 99 // 100]:.3f}",
+            "worst ms": f"{step_times[-1]:.3f}",
+            "garbage collections": f"{collections}",
+            "bullets created": f"{BULLETS.created}",
+            "bullets reused": f"{BULLETS.reused}",
+            "enemies created": f"{ENEMIES.created}",
+            "enemies reused": f"{ENEMIES.reused}",
+        }
+        
+        tracemalloc.start()
+        play_session(game, seconds)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        column["KiB held at the end"] = f"{current / 1024:.0f}"
+        column["KiB at peak"] = f"{peak / 1024:.0f}"
+        columns.append(column)
+    
+    print(f"{'':>20} {'no pools':>10} {'pools':>10}")
+    for label in columns[0]:
+        print(f"{label:>20} {columns[0][label]:>10} {columns[1][label]:>10}")
+    pygame.quit()
 
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        run_collision_benchmark()
+        run_aim_benchmark()
+        run_horde_benchmark()
+        sys.exit()
+    if "--report" in sys.argv:
+        run_session_report()
+        sys.exit()
+    if "--headless" in sys.argv:
+        game = Game()
+        elapsed = game.simulate(30)
+        print(f"Simulated 30 s of play in {elapsed:.2f} s, score {game.player.score}")
+        sys.exit()
     game = Game()
     game.run()
\ No newline at end of file
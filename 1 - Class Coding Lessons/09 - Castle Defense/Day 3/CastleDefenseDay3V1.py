@@ -2,14 +2,65 @@ import pygame
 import sys
 import random
 import math
+import time
+import numpy as np
+import multiprocessing
 
 # Initialize Pygame
 pygame.init()
 
 # Screen dimensions
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Top-Down Castle Defense")
+screen = None  # The window is only opened when the game is run directly
+
+# Entity storage
+class EntityStore:
+    # One NumPy array per field, row i of each belonging to the same entity.
+    # store["x"] is the live part of the x column. Removing a row moves the
+    # last row into the gap, so rows stay packed but do not keep their order
+    def __init__(self, **fields):
+        self.count = 0
+        self.columns = {name: np.zeros(16, dtype=dtype) for name, dtype in fields.items()}
+    
+    def __len__(self):
+        return self.count
+    
+    def __getitem__(self, name):
+        return self.columns[name][:self.count]
+    
+    def __setitem__(self, name, values):
+        self.columns[name][:self.count] = values
+    
+    def add(self, **values):
+        # Double the columns whenever they fill up
+        if self.count == len(self.columns["x"]):
+            for name, column in self.columns.items():
+                self.columns[name] = np.concatenate([column, np.zeros_like(column)])
+        
+        row = self.count
+        for name, column in self.columns.items():
+            column[row] = values.get(name, 0)
+        self.count += 1
+        return row
+    
+    def remove(self, row):
+        last = self.count - 1
+        for column in self.columns.values():
+            column[row] = column[last]
+        self.count = last
+    
+    def remove_where(self, mask):
+        # Removes every row where mask is True in one pass
+        if not mask.any():
+            return
+        keep = ~mask
+        kept = int(keep.sum())
+        for column in self.columns.values():
+            column[:kept] = column[:self.count][keep]
+        self.count = kept
+    
+    def clear(self):
+        self.count = 0
 
 # Colors
 GRASS_GREEN = (34, 139, 34)
@@ -77,12 +128,30 @@ dragon_damage = 23
 range_upgrade_cost = 20
 range_upgrade_amount = 30
 
-placed_towers = []
-selected_tower = None
+# Tower kinds, stored as numbers so they fit in a NumPy column
+CANNON = 0
+WIZARD = 1
+DRAGON = 2
+
+# How a tower picks between the enemies in its range
+NEAREST = 0
+FIRST = 1  # Furthest along the path
+LAST = 2
+STRONGEST = 3
+targeting_names = ["Nearest", "First", "Last", "Strongest"]
+
+# aim is the angle to the target the tower last picked, or NaN if it had none
+placed_towers = EntityStore(x=float, y=float, kind=int, cooldown=int, range=float, kills=int,
+                            targeting=int, aim=float)
+selected_tower = None  # Row of the selected tower in placed_towers
 dragging_tower = False
 
 # Enemy settings
-enemies = []
+# kind is the index into enemy_types, or len(enemy_types) for the super boss.
+# distance is how far the enemy has walked along the path.
+enemies = EntityStore(x=float, y=float, kind=int, size=int, speed=float,
+                      health=float, max_health=float, reward=int,
+                      distance=float, is_boss=bool, last_hit_by=int)
 enemy_spawn_timer = 0
 enemy_spawn_delay = 120
 enemy_speed = 1.5
@@ -101,12 +170,40 @@ super_boss_stats = {
     "size": 25,
     "damage": 25
 }
+boss_kind = len(enemy_types)
+max_enemy_size = max([super_boss_stats["size"]] + [enemy_type["size"] for enemy_type in enemy_types])
+
+# Path lookups used to move every enemy at once
+# path_distances[i] is how far along the path path_points[i] is, so the
+# segment an enemy is on can be found with a binary search on its distance.
+path_array = np.array(path_points, dtype=float)
+segment_lengths = np.hypot(*(path_array[1:] - path_array[:-1]).T)
+segment_directions = (path_array[1:] - path_array[:-1]) / segment_lengths[:, None]
+path_distances = np.concatenate([[0], np.cumsum(segment_lengths)])
+path_length = path_distances[-1]
+
+# Spatial grid settings
+# Enemies are sorted by square cell each frame so towers and projectiles
+# only look at enemies in nearby cells instead of every enemy on the map.
+# enemy_grid_order lists enemy rows cell by cell and the rows of cell c are
+# enemy_grid_order[enemy_grid_starts[c]:enemy_grid_starts[c + 1]].
+grid_cell_size = 50
+grid_cols = WIDTH // grid_cell_size + 1
+grid_rows = HEIGHT // grid_cell_size + 1
+enemy_grid_order = np.zeros(0, dtype=int)
+enemy_grid_starts = np.zeros(grid_cols * grid_rows + 1, dtype=int)
+neighbour_cols = np.array([-1, 0, 1] * 3)
+neighbour_rows = np.repeat([-1, 0, 1], 3)
+use_spatial_grid = True
 
 # Projectile settings
-projectiles = []
+# owner is the row of the tower that fired the shot, or -1 once that tower is gone
+projectiles = EntityStore(x=float, y=float, dx=float, dy=float, damage=float,
+                          kind=int, start_x=float, start_y=float, owner=int)
 projectile_speed = 5
 projectile_radius = 4
-fire_projectiles = []
+fire_projectiles = EntityStore(x=float, y=float, dx=float, dy=float, damage=float,
+                               radius=float, life=int, owner=int)
 
 # Resources
 gold = 125
@@ -141,17 +238,86 @@ def draw_wave_announcement():
                         border_radius=15)
         screen.blit(wave_text, text_rect)
 
-def find_nearest_enemy(x, y):
-    nearest_enemy = None
-    min_distance = float('inf')
+def rebuild_enemy_grid():
+    global enemy_grid_order, enemy_grid_starts
+    cols = np.clip((enemies["x"] // grid_cell_size).astype(int), 0, grid_cols - 1)
+    rows = np.clip((enemies["y"] // grid_cell_size).astype(int), 0, grid_rows - 1)
+    cells = rows * grid_cols + cols
+    enemy_grid_order = np.argsort(cells, kind="stable")
+    enemy_grid_starts = np.searchsorted(cells[enemy_grid_order], np.arange(grid_cols * grid_rows + 1))
+
+def grid_rows_in_box(left, top, right, bottom):
+    # Enemy rows in every grid cell that overlaps the box
+    min_col = max(0, int(left // grid_cell_size))
+    max_col = min(grid_cols - 1, int(right // grid_cell_size))
+    min_row = max(0, int(top // grid_cell_size))
+    max_row = min(grid_rows - 1, int(bottom // grid_cell_size))
+    if min_col > max_col or min_row > max_row:
+        return np.zeros(0, dtype=int)
     
-    for enemy in enemies:
-        distance = math.dist((x, y), (enemy["x"], enemy["y"]))
-        if distance < min_distance:
-            min_distance = distance
-            nearest_enemy = enemy
+    # The cells of one grid row sit next to each other, so each row is one slice
+    return np.concatenate([
+        enemy_grid_order[enemy_grid_starts[row * grid_cols + min_col]:
+                         enemy_grid_starts[row * grid_cols + max_col + 1]]
+        for row in range(min_row, max_row + 1)])
+
+def enemy_pairs(xs, ys):
+    # Pairs up each point in xs, ys with the enemies close enough to touch it.
+    # Returns two arrays: the point index and the enemy row of every pair.
+    if not use_spatial_grid:
+        points = np.repeat(np.arange(len(xs)), len(enemies))
+        return points, np.tile(np.arange(len(enemies)), len(xs))
     
-    return nearest_enemy
+    if len(xs) == 0 or len(enemies) == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    
+    # Projectiles and fire blasts reach less than one cell past their own cell,
+    # so the 3x3 block of cells around each point is enough
+    cols = ((xs // grid_cell_size).astype(int)[:, None] + neighbour_cols).ravel()
+    rows = ((ys // grid_cell_size).astype(int)[:, None] + neighbour_rows).ravel()
+    inside = (cols >= 0) & (cols < grid_cols) & (rows >= 0) & (rows < grid_rows)
+    points = np.flatnonzero(inside) // 9
+    cells = rows[inside] * grid_cols + cols[inside]
+    
+    # Expand every (point, cell) into one pair per enemy in that cell
+    first = enemy_grid_starts[cells]
+    counts = enemy_grid_starts[cells + 1] - first
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(points, counts), enemy_grid_order[np.repeat(first, counts) + offsets]
+
+def path_positions(distance):
+    # Turns distances along the path into x and y arrays
+    segment = np.searchsorted(path_distances, distance, side="right") - 1
+    segment = np.clip(segment, 0, len(segment_lengths) - 1)
+    along = distance - path_distances[segment]
+    return (path_array[segment, 0] + segment_directions[segment, 0] * along,
+            path_array[segment, 1] + segment_directions[segment, 1] * along)
+
+def find_target(x, y, max_distance=float('inf'), targeting=NEAREST):
+    # Returns the row of the enemy to shoot within max_distance, or None
+    if use_spatial_grid and max_distance != float('inf'):
+        rows = grid_rows_in_box(x - max_distance, y - max_distance,
+                                x + max_distance, y + max_distance)
+    else:
+        rows = np.arange(len(enemies))
+    if len(rows) == 0:
+        return None
+    
+    distances = np.hypot(enemies["x"][rows] - x, enemies["y"][rows] - y)
+    in_range = distances <= max_distance
+    if not in_range.any():
+        return None
+    rows, distances = rows[in_range], distances[in_range]
+    
+    if targeting == FIRST:
+        target = np.argmax(enemies["distance"][rows])
+    elif targeting == LAST:
+        target = np.argmin(enemies["distance"][rows])
+    elif targeting == STRONGEST:
+        target = np.argmax(enemies["health"][rows])
+    else:
+        target = np.argmin(distances)
+    return int(rows[target])
 
 def draw_castle():
     pygame.draw.rect(screen, STONE_GRAY, (castle_x, castle_y, castle_width, castle_height))
@@ -189,90 +355,109 @@ def draw_path():
                            (x, min(start[1], end[1]), 
                            path_width, abs(end[1] - start[1])))
 
+def tower_radius(kind):
+    return (cannon_radius if kind == CANNON else 
+            wizard_radius if kind == WIZARD else dragon_radius)
+
+def tower_base_range(kind):
+    return (cannon_range if kind == CANNON else 
+            wizard_range if kind == WIZARD else dragon_range)
+
+def tower_cooldown_max(kind):
+    return (cannon_cooldown_max if kind == CANNON else 
+            wizard_cooldown_max if kind == WIZARD else dragon_cooldown_max)
+
 def draw_towers():
-    for tower in placed_towers:
-        if tower["cooldown"] > 0:
-            color = (100, 100, 100) if tower["cooldown"] > 0 else (
-                BLACK if tower["type"] == "cannon" else (
-                    PURPLE if tower["type"] == "wizard" else ORANGE))
+    towers = zip(placed_towers["x"].tolist(), placed_towers["y"].tolist(),
+                 placed_towers["kind"].tolist(), placed_towers["cooldown"].tolist(),
+                 placed_towers["range"].tolist(), placed_towers["aim"].tolist())
+    for tower, (x, y, kind, cooldown, tower_range, aim) in enumerate(towers):
+        if cooldown > 0:
+            color = (100, 100, 100)
         else:
-            color = (BLACK if tower["type"] == "cannon" else (
-                PURPLE if tower["type"] == "wizard" else ORANGE))
+            color = (BLACK if kind == CANNON else (
+                PURPLE if kind == WIZARD else ORANGE))
             
-        radius = (cannon_radius if tower["type"] == "cannon" else 
-                 wizard_radius if tower["type"] == "wizard" else dragon_radius)
-        pygame.draw.circle(screen, color, (int(tower["x"]), int(tower["y"])), radius)
+        radius = tower_radius(kind)
+        pygame.draw.circle(screen, color, (int(x), int(y)), radius)
 
-        if tower["type"] == "wizard":
+        if kind == WIZARD:
             hat_height = radius * 1.5
             hat_width = radius * 1.8
             hat_points = [
-                (tower["x"] - hat_width/2, tower["y"] - radius),
-                (tower["x"] + hat_width/2, tower["y"] - radius),
-                (tower["x"], tower["y"] - radius - hat_height)
+                (x - hat_width/2, y - radius),
+                (x + hat_width/2, y - radius),
+                (x, y - radius - hat_height)
             ]
             pygame.draw.polygon(screen, PURPLE, hat_points)
         
-        if tower["type"] == "dragon" and tower["cooldown"] <= dragon_cooldown_max * 0.8:
+        if kind == DRAGON and cooldown <= dragon_cooldown_max * 0.8:
             pygame.draw.polygon(screen, ORANGE, [
-                (tower["x"] - radius, tower["y"]),
-                (tower["x"] - radius - 15, tower["y"] - 10),
-                (tower["x"] - radius - 25, tower["y"] + 5),
-                (tower["x"] - radius - 15, tower["y"] + 20),
-                (tower["x"] - radius, tower["y"] + 10)
+                (x - radius, y),
+                (x - radius - 15, y - 10),
+                (x - radius - 25, y + 5),
+                (x - radius - 15, y + 20),
+                (x - radius, y + 10)
             ])
             pygame.draw.polygon(screen, ORANGE, [
-                (tower["x"] + radius, tower["y"]),
-                (tower["x"] + radius + 15, tower["y"] - 10),
-                (tower["x"] + radius + 25, tower["y"] + 5),
-                (tower["x"] + radius + 15, tower["y"] + 20),
-                (tower["x"] + radius, tower["y"] + 10)
+                (x + radius, y),
+                (x + radius + 15, y - 10),
+                (x + radius + 25, y + 5),
+                (x + radius + 15, y + 20),
+                (x + radius, y + 10)
             ])
         
-        if tower["cooldown"] <= (cannon_cooldown_max if tower["type"] == "cannon" else 
-                                wizard_cooldown_max if tower["type"] == "wizard" else dragon_cooldown_max) * 0.8:
-            nearest_enemy = find_nearest_enemy(tower["x"], tower["y"])
-            if nearest_enemy:
-                angle = math.atan2(nearest_enemy["y"] - tower["y"], nearest_enemy["x"] - tower["x"])
-                length = radius + 10
-                end_x = tower["x"] + length * math.cos(angle)
-                end_y = tower["y"] + length * math.sin(angle)
-                line_color = (BLACK if tower["type"] == "cannon" else 
-                             YELLOW if tower["type"] == "wizard" else RED)
-                pygame.draw.line(screen, line_color, (tower["x"], tower["y"]), (end_x, end_y), 4)
+        if cooldown <= tower_cooldown_max(kind) * 0.8 and not math.isnan(aim):
+            length = radius + 10
+            end_x = x + length * math.cos(aim)
+            end_y = y + length * math.sin(aim)
+            line_color = (BLACK if kind == CANNON else 
+                         YELLOW if kind == WIZARD else RED)
+            pygame.draw.line(screen, line_color, (x, y), (end_x, end_y), 4)
         
         if selected_tower == tower:
-            pygame.draw.circle(screen, (200, 200, 200, 100), (int(tower["x"]), int(tower["y"])), tower["range"], 1)
+            pygame.draw.circle(screen, (200, 200, 200, 100), (int(x), int(y)), int(tower_range), 1)
+            targeting = targeting_names[placed_towers["targeting"][tower]]
+            targeting_text = small_font.render(f"Target: {targeting} (T)", True, WHITE)
+            screen.blit(targeting_text, (x - targeting_text.get_width() // 2, y + radius + 5))
+
+def enemy_color(kind):
+    return super_boss_stats["color"] if kind == boss_kind else enemy_types[kind]["color"]
 
 def draw_enemies():
-    for enemy in enemies:
-        pygame.draw.circle(screen, enemy["color"], (int(enemy["x"]), int(enemy["y"])), enemy["size"])
-        health_width = enemy["size"] * 2
+    columns = zip(enemies["x"].tolist(), enemies["y"].tolist(), enemies["kind"].tolist(),
+                  enemies["size"].tolist(), enemies["health"].tolist(), enemies["max_health"].tolist())
+    for x, y, kind, size, health, max_health in columns:
+        pygame.draw.circle(screen, enemy_color(kind), (int(x), int(y)), size)
+        health_width = size * 2
         health_height = 4
-        health_ratio = enemy["health"] / enemy["max_health"]
-        pygame.draw.rect(screen, RED, (int(enemy["x"] - enemy["size"]), int(enemy["y"] - enemy["size"] - 8), 
+        health_ratio = health / max_health
+        pygame.draw.rect(screen, RED, (int(x - size), int(y - size - 8), 
                          health_width, health_height))
-        pygame.draw.rect(screen, (0, 255, 0), (int(enemy["x"] - enemy["size"]), int(enemy["y"] - enemy["size"] - 8), 
+        pygame.draw.rect(screen, (0, 255, 0), (int(x - size), int(y - size - 8), 
                          health_width * health_ratio, health_height))
 
 def draw_projectiles():
-    for projectile in projectiles:
-        if projectile["type"] == "cannon":
-            pygame.draw.circle(screen, BLACK, (int(projectile["x"]), int(projectile["y"])), projectile_radius)
-        elif projectile["type"] == "wizard":
+    shots = zip(projectiles["x"].tolist(), projectiles["y"].tolist(), projectiles["kind"].tolist(),
+                projectiles["start_x"].tolist(), projectiles["start_y"].tolist())
+    for x, y, kind, start_x, start_y in shots:
+        if kind == CANNON:
+            pygame.draw.circle(screen, BLACK, (int(x), int(y)), projectile_radius)
+        elif kind == WIZARD:
             pygame.draw.line(screen, YELLOW, 
-                            (projectile["start_x"], projectile["start_y"]), 
-                            (int(projectile["x"]), int(projectile["y"])), 2)
+                            (start_x, start_y), 
+                            (int(x), int(y)), 2)
             for i in range(2):
-                mid_x = (projectile["start_x"] + projectile["x"]) // 2
-                mid_y = (projectile["start_y"] + projectile["y"]) // 2
+                mid_x = (start_x + x) // 2
+                mid_y = (start_y + y) // 2
                 branch_x = mid_x + random.randint(-8, 8)
                 branch_y = mid_y + random.randint(-8, 8)
                 pygame.draw.line(screen, YELLOW, (mid_x, mid_y), (branch_x, branch_y), 1)
     
-    for fire in fire_projectiles:
+    for x, y, radius in zip(fire_projectiles["x"].tolist(), fire_projectiles["y"].tolist(),
+                            fire_projectiles["radius"].tolist()):
         pygame.draw.circle(screen, (255, random.randint(100, 200), 0), 
-                          (int(fire["x"]), int(fire["y"])), fire["radius"])
+                          (int(x), int(y)), int(radius))
 
 def spawn_enemy():
     global enemies_in_wave, enemies_remaining
@@ -282,20 +467,19 @@ def spawn_enemy():
         if current_mode == HARD:
             health_multiplier *= 1.5
             
-        enemy = {
-            "x": path_points[0][0],
-            "y": path_points[0][1],
-            "size": super_boss_stats["size"],
-            "speed": super_boss_stats["speed"],
-            "health": super_boss_stats["health"] * health_multiplier,
-            "max_health": super_boss_stats["health"] * health_multiplier,
-            "color": super_boss_stats["color"],
-            "reward": super_boss_stats["reward"],
-            "path_index": 0,
-            "progress": 0,
-            "is_boss": True
-        }
-        enemies.append(enemy)
+        enemies.add(
+            x=path_points[0][0],
+            y=path_points[0][1],
+            kind=boss_kind,
+            size=super_boss_stats["size"],
+            speed=super_boss_stats["speed"],
+            health=super_boss_stats["health"] * health_multiplier,
+            max_health=super_boss_stats["health"] * health_multiplier,
+            reward=super_boss_stats["reward"],
+            distance=0,
+            is_boss=True,
+            last_hit_by=-1
+        )
         enemies_in_wave += 1
         enemies_remaining += 1
     else:
@@ -329,126 +513,179 @@ def spawn_enemy():
             # Add this scaled enemy type to our list
             scaled_enemy_types.append(scaled_type)
         
-        enemy_type = random.choice(scaled_enemy_types)
-        enemy = {
-            "x": path_points[0][0],
-            "y": path_points[0][1],
-            "size": enemy_type["size"],
-            "speed": enemy_type["speed"],
-            "health": enemy_type["health"],
-            "max_health": enemy_type["health"],
-            "color": enemy_type["color"],
-            "reward": enemy_type["reward"],
-            "path_index": 0,
-            "progress": 0,
-            "is_boss": False
-        }
-        enemies.append(enemy)
+        kind = random.randrange(len(scaled_enemy_types))
+        enemy_type = scaled_enemy_types[kind]
+        enemies.add(
+            x=path_points[0][0],
+            y=path_points[0][1],
+            kind=kind,
+            size=enemy_type["size"],
+            speed=enemy_type["speed"],
+            health=enemy_type["health"],
+            max_health=enemy_type["health"],
+            reward=enemy_type["reward"],
+            distance=0,
+            is_boss=False,
+            last_hit_by=-1
+        )
         enemies_in_wave += 1
         enemies_remaining += 1
 
 def update_enemies():
-    global castle_health, gold, enemies_remaining
-    for enemy in enemies[:]:
-        path_index = enemy["path_index"]
-        if path_index >= len(path_points) - 1:
-            damage = super_boss_stats["damage"] if "is_boss" in enemy and enemy["is_boss"] else 10
-            castle_health -= damage
-            enemies.remove(enemy)
-            enemies_remaining -= 1
-            if castle_health <= 0:
-                global current_state
-                current_state = GAME_OVER
-            continue
-        
-        start = path_points[path_index]
-        end = path_points[path_index + 1]
-        enemy["progress"] += enemy["speed"] / math.dist(start, end)
-        
-        if enemy["progress"] >= 1:
-            enemy["path_index"] += 1
-            enemy["progress"] = 0
-        else:
-            enemy["x"] = start[0] + (end[0] - start[0]) * enemy["progress"]
-            enemy["y"] = start[1] + (end[1] - start[1]) * enemy["progress"]
+    global castle_health, enemies_remaining, current_state
+    
+    # Enemies at the end of the path hit the castle
+    arrived = enemies["distance"] >= path_length
+    if arrived.any():
+        damage = np.where(enemies["is_boss"][arrived], super_boss_stats["damage"], 10)
+        castle_health -= int(damage.sum())
+        enemies_remaining -= int(arrived.sum())
+        enemies.remove_where(arrived)
+        if castle_health <= 0:
+            current_state = GAME_OVER
+    
+    # Move every other enemy along the path at once
+    enemies["distance"] += enemies["speed"]
+    enemies["x"], enemies["y"] = path_positions(np.minimum(enemies["distance"], path_length))
+
+def remove_tower(tower):
+    # Shots and hits from the removed tower no longer belong to anyone, and
+    # the ones from the last row follow that tower into the freed row
+    last = len(placed_towers) - 1
+    for owners in (projectiles["owner"], fire_projectiles["owner"], enemies["last_hit_by"]):
+        owners[owners == tower] = -1
+        if last != tower:
+            owners[owners == last] = tower
+    placed_towers.remove(tower)
 
 def update_towers():
-    for tower in placed_towers:
-        if tower["cooldown"] > 0:
-            tower["cooldown"] -= 1
+    cooldown = placed_towers["cooldown"]
+    aim = placed_towers["aim"]
+    ready = np.flatnonzero(cooldown <= 0)
+    cooldown[cooldown > 0] -= 1
+    if dragging_tower and selected_tower is not None:
+        # A tower that is still being dragged has not been placed yet
+        ready = ready[ready != selected_tower]
+        aim[selected_tower] = np.nan
+    
+    for tower in ready.tolist():
+        x = placed_towers["x"][tower]
+        y = placed_towers["y"][tower]
+        kind = placed_towers["kind"][tower]
+        target = find_target(x, y, placed_towers["range"][tower], placed_towers["targeting"][tower])
+        
+        if target is None:
+            aim[tower] = np.nan
         else:
-            nearest_enemy = find_nearest_enemy(tower["x"], tower["y"])
+            angle = math.atan2(enemies["y"][target] - y, enemies["x"][target] - x)
+            aim[tower] = angle
+            
+            if kind == DRAGON:
+                fire_projectiles.add(
+                    x=x,
+                    y=y,
+                    dx=projectile_speed * math.cos(angle),
+                    dy=projectile_speed * math.sin(angle),
+                    damage=dragon_damage,
+                    radius=12,
+                    life=60,
+                    owner=tower
+                )
+            else:
+                projectiles.add(
+                    x=x,
+                    y=y,
+                    dx=projectile_speed * math.cos(angle),
+                    dy=projectile_speed * math.sin(angle),
+                    damage=(cannon_damage if kind == CANNON else wizard_damage),
+                    kind=kind,
+                    start_x=x,
+                    start_y=y,
+                    owner=tower
+                )
             
-            if nearest_enemy and math.dist((tower["x"], tower["y"]), (nearest_enemy["x"], nearest_enemy["y"])) <= tower["range"]:
-                angle = math.atan2(nearest_enemy["y"] - tower["y"], nearest_enemy["x"] - tower["x"])
-                
-                if tower["type"] == "dragon":
-                    fire = {
-                        "x": tower["x"],
-                        "y": tower["y"],
-                        "dx": projectile_speed * math.cos(angle),
-                        "dy": projectile_speed * math.sin(angle),
-                        "damage": dragon_damage,
-                        "type": "fire",
-                        "radius": 12,
-                        "life": 60,
-                        "owner": tower
-                    }
-                    fire_projectiles.append(fire)
-                else:
-                    projectile = {
-                        "x": tower["x"],
-                        "y": tower["y"],
-                        "dx": projectile_speed * math.cos(angle),
-                        "dy": projectile_speed * math.sin(angle),
-                        "damage": (cannon_damage if tower["type"] == "cannon" else wizard_damage),
-                        "type": tower["type"],
-                        "start_x": tower["x"],
-                        "start_y": tower["y"]
-                    }
-                    projectiles.append(projectile)
-                
-                tower["cooldown"] = (cannon_cooldown_max if tower["type"] == "cannon" else 
-                                   wizard_cooldown_max if tower["type"] == "wizard" else dragon_cooldown_max)
+            cooldown[tower] = tower_cooldown_max(kind)
+
+def update_shots(health):
+    if len(projectiles) == 0:
+        return
+    
+    projectiles["x"] += projectiles["dx"]
+    projectiles["y"] += projectiles["dy"]
+    
+    # Test every projectile against the enemies near it in one batch
+    shots, targets = enemy_pairs(projectiles["x"], projectiles["y"])
+    touching = (np.hypot(projectiles["x"][shots] - enemies["x"][targets],
+                         projectiles["y"][shots] - enemies["y"][targets])
+                < enemies["size"][targets] + projectile_radius)
+    shots, targets = shots[touching], targets[touching]
+    
+    # Only the few touching pairs are left, so they are settled one at a time.
+    # In shot order, each projectile damages the first enemy it touches that
+    # an earlier shot this tick has not already killed, and is used up.
+    order = np.lexsort((targets, shots))
+    damage = projectiles["damage"]
+    owner = projectiles["owner"]
+    last_hit_by = enemies["last_hit_by"]
+    spent = ((projectiles["x"] < 0) | (projectiles["x"] > WIDTH) |
+             (projectiles["y"] < 0) | (projectiles["y"] > HEIGHT))
+    for shot, target in zip(shots[order].tolist(), targets[order].tolist()):
+        if spent[shot] or health[target] <= 0:
+            continue
+        health[target] -= damage[shot]
+        last_hit_by[target] = owner[shot]
+        spent[shot] = True
+    projectiles.remove_where(spent)
+
+def update_fire(health):
+    if len(fire_projectiles) == 0:
+        return
+    
+    fire_projectiles["x"] += fire_projectiles["dx"]
+    fire_projectiles["y"] += fire_projectiles["dy"]
+    fire_projectiles["life"] -= 1
+    
+    # Fire keeps going and burns every enemy it touches
+    blasts, targets = enemy_pairs(fire_projectiles["x"], fire_projectiles["y"])
+    touching = (np.hypot(fire_projectiles["x"][blasts] - enemies["x"][targets],
+                         fire_projectiles["y"][blasts] - enemies["y"][targets])
+                < enemies["size"][targets] + fire_projectiles["radius"][blasts])
+    blasts, targets = blasts[touching], targets[touching]
+    
+    # Blasts burn in order and stop burning an enemy once it is dead, so each
+    # enemy only takes the blasts that land while its running total of burn
+    # damage before them is still short of its health
+    order = np.lexsort((blasts, targets))
+    blasts, targets = blasts[order], targets[order]
+    burn = fire_projectiles["damage"][blasts] * 0.5
+    burnt = np.cumsum(burn) - burn
+    first = np.flatnonzero(np.diff(targets, prepend=-1))
+    burnt -= np.repeat(burnt[first], np.diff(first, append=len(targets)))
+    lands = burnt < health[targets]
+    np.subtract.at(health, targets[lands], burn[lands])
+    
+    # The last blast to land on an enemy is the one that killed it, if any did
+    burned, burners = targets[lands], blasts[lands]
+    last = np.flatnonzero(np.diff(burned, append=-1))
+    enemies["last_hit_by"][burned[last]] = fire_projectiles["owner"][burners[last]]
+    
+    fire_projectiles.remove_where((fire_projectiles["life"] <= 0) |
+                                  (fire_projectiles["x"] < 0) | (fire_projectiles["x"] > WIDTH) |
+                                  (fire_projectiles["y"] < 0) | (fire_projectiles["y"] > HEIGHT))
 
 def update_projectiles():
     global gold, enemies_remaining
-    for projectile in projectiles[:]:
-        projectile["x"] += projectile["dx"]
-        projectile["y"] += projectile["dy"]
-        
-        for enemy in enemies[:]:
-            distance = math.dist((projectile["x"], projectile["y"]), (enemy["x"], enemy["y"]))
-            if distance < enemy["size"] + projectile_radius:
-                enemy["health"] -= projectile["damage"]
-                if enemy["health"] <= 0:
-                    gold += enemy["reward"]
-                    enemies.remove(enemy)
-                    enemies_remaining -= 1
-                projectiles.remove(projectile)
-                break
-        
-        if (projectile["x"] < 0 or projectile["x"] > WIDTH or 
-            projectile["y"] < 0 or projectile["y"] > HEIGHT):
-            projectiles.remove(projectile)
-    
-    for fire in fire_projectiles[:]:
-        fire["x"] += fire["dx"]
-        fire["y"] += fire["dy"]
-        fire["life"] -= 1
-        
-        for enemy in enemies[:]:
-            distance = math.dist((fire["x"], fire["y"]), (enemy["x"], enemy["y"]))
-            if distance < enemy["size"] + fire["radius"]:
-                enemy["health"] -= fire["damage"] * 0.5
-                if enemy["health"] <= 0:
-                    gold += enemy["reward"]
-                    enemies.remove(enemy)
-                    enemies_remaining -= 1
-        
-        if (fire["life"] <= 0 or fire["x"] < 0 or fire["x"] > WIDTH or 
-            fire["y"] < 0 or fire["y"] > HEIGHT):
-            fire_projectiles.remove(fire)
+    health = enemies["health"]
+    update_shots(health)
+    update_fire(health)
+    
+    dead = health <= 0
+    if dead.any():
+        gold += int(enemies["reward"][dead].sum())
+        enemies_remaining -= int(dead.sum())
+        killers = enemies["last_hit_by"][dead]
+        np.add.at(placed_towers["kills"], killers[killers >= 0], 1)
+        enemies.remove_where(dead)
 
 def draw_ui():
     ui_box_rect = pygame.Rect(WIDTH - 160, HEIGHT - 280, 150, 270)
@@ -488,7 +725,7 @@ def draw_ui():
     dragon_text = small_font.render(f"Dragon: {dragon_cost}g", True, BLACK)
     screen.blit(dragon_text, (dragon_button_rect.x + 5, dragon_button_rect.y + 8))
     
-    range_color = (0, 200, 200) if (gold >= range_upgrade_cost and selected_tower) else (50, 100, 100)
+    range_color = (0, 200, 200) if (gold >= range_upgrade_cost and selected_tower is not None) else (50, 100, 100)
     pygame.draw.rect(screen, range_color, range_button_rect, border_radius=6)
     pygame.draw.rect(screen, WHITE, range_button_rect, 2, border_radius=6)
     range_text = small_font.render(f"Range +5", True, WHITE)
@@ -598,49 +835,82 @@ def draw_game_over():
     restart_text = font.render("Click to restart", True, BLACK)
     screen.blit(restart_text, (WIDTH//2 - restart_text.get_width()//2, HEIGHT*2//3))
 
-def is_valid_tower_position(x, y):
+# Tower placement map
+# One entry per pixel, indexed [x, y], for whether a tower can be built with
+# its centre there. map_blocked covers the path, the castle and the screen
+# edges and never changes. tower_cover counts how many placed towers are too
+# close to each pixel, so towers are stamped in when built and out when removed.
+map_blocked = np.zeros((WIDTH, HEIGHT), dtype=bool)
+tower_cover = np.zeros((WIDTH, HEIGHT), dtype=np.int16)
+placement_overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+placement_overlay.fill((255, 0, 0, 0))
+placement_overlay_dirty = True
+
+def block_area(left, top, right, bottom):
+    # Marks every pixel in the box as blocked, edges included
+    map_blocked[max(0, left):max(0, right + 1), max(0, top):max(0, bottom + 1)] = True
+
+def build_placement_map():
     for i in range(len(path_points) - 1):
         start = path_points[i]
         end = path_points[i + 1]
         
         if start[0] == end[0]:
-            seg_left = start[0] - path_width//2 - cannon_radius
-            seg_right = start[0] + path_width//2 + cannon_radius
-            seg_top = min(start[1], end[1]) - cannon_radius
-            seg_bottom = max(start[1], end[1]) + cannon_radius
-            if seg_left <= x <= seg_right and seg_top <= y <= seg_bottom:
-                return False
+            block_area(start[0] - path_width//2 - cannon_radius, min(start[1], end[1]) - cannon_radius,
+                       start[0] + path_width//2 + cannon_radius, max(start[1], end[1]) + cannon_radius)
         else:
-            seg_left = min(start[0], end[0]) - cannon_radius
-            seg_right = max(start[0], end[0]) + cannon_radius
-            seg_top = start[1] - path_width//2 - cannon_radius
-            seg_bottom = start[1] + path_width//2 + cannon_radius
-            if seg_left <= x <= seg_right and seg_top <= y <= seg_bottom:
-                return False
-    
-    if (castle_x - cannon_radius <= x <= castle_x + castle_width + cannon_radius and
-        castle_y - cannon_radius <= y <= castle_y + castle_height + cannon_radius):
-        return False
+            block_area(min(start[0], end[0]) - cannon_radius, start[1] - path_width//2 - cannon_radius,
+                       max(start[0], end[0]) + cannon_radius, start[1] + path_width//2 + cannon_radius)
     
-    for tower in placed_towers:
-        if tower == selected_tower:
-            continue
-        radius = (cannon_radius if tower["type"] == "cannon" else 
-                 wizard_radius if tower["type"] == "wizard" else dragon_radius)
-        if math.dist((x, y), (tower["x"], tower["y"])) < radius * 2:
-            return False
+    block_area(castle_x - cannon_radius, castle_y - cannon_radius,
+               castle_x + castle_width + cannon_radius, castle_y + castle_height + cannon_radius)
     
-    if (x < cannon_radius or x > WIDTH - cannon_radius or
-        y < cannon_radius or y > HEIGHT - cannon_radius):
-        return False
+    map_blocked[:cannon_radius, :] = True
+    map_blocked[WIDTH - cannon_radius + 1:, :] = True
+    map_blocked[:, :cannon_radius] = True
+    map_blocked[:, HEIGHT - cannon_radius + 1:] = True
+
+build_placement_map()
+
+def stamp_tower(tower, amount):
+    # Adds amount (1 when built, -1 when removed) to every pixel too close to the tower
+    global placement_overlay_dirty
+    x = placed_towers["x"][tower]
+    y = placed_towers["y"][tower]
+    reach = tower_radius(placed_towers["kind"][tower]) * 2
+    left, right = max(0, int(x) - reach), min(WIDTH, int(x) + reach + 1)
+    top, bottom = max(0, int(y) - reach), min(HEIGHT, int(y) + reach + 1)
+    if left >= right or top >= bottom:
+        return
     
-    return True
+    xs, ys = np.ogrid[left:right, top:bottom]
+    inside = (xs - x) ** 2 + (ys - y) ** 2 < reach ** 2
+    tower_cover[left:right, top:bottom] += amount * inside
+    placement_overlay_dirty = True
+
+def is_valid_tower_position(x, y):
+    # The tower being dragged is only stamped once it is dropped,
+    # so it never blocks itself
+    x, y = int(x), int(y)
+    if not (0 <= x < WIDTH and 0 <= y < HEIGHT):
+        return False
+    return bool(not map_blocked[x, y] and tower_cover[x, y] == 0)
+
+def draw_placement_overlay():
+    # Tints every spot a tower cannot be built on
+    global placement_overlay_dirty
+    if placement_overlay_dirty:
+        alpha = pygame.surfarray.pixels_alpha(placement_overlay)
+        alpha[:] = np.where(map_blocked | (tower_cover > 0), 70, 0)
+        del alpha
+        placement_overlay_dirty = False
+    screen.blit(placement_overlay, (0, 0))
 
 def reset_game():
     global castle_health, gold, current_wave, wave_timer, is_between_waves
-    global enemies, projectiles, placed_towers, selected_tower, dragging_tower
+    global selected_tower, dragging_tower, placement_overlay_dirty
     global wave_announcement_timer, enemies_in_wave, enemies_remaining
-    global fire_projectiles, enemy_spawn_delay, enemy_speed
+    global enemy_spawn_delay, enemy_speed, enemy_spawn_timer, gold_increase_timer
     
     # reset variables
     castle_health = max_castle_health
@@ -649,14 +919,18 @@ def reset_game():
     wave_timer = 0
     is_between_waves = False
     wave_announcement_timer = wave_announcement_duration
-    enemies = []
-    projectiles = []
-    fire_projectiles = []
-    placed_towers = []
+    enemies.clear()
+    projectiles.clear()
+    fire_projectiles.clear()
+    placed_towers.clear()
+    tower_cover[:] = 0
+    placement_overlay_dirty = True
     selected_tower = None
     dragging_tower = False
     enemies_in_wave = 0
     enemies_remaining = 0
+    enemy_spawn_timer = 0
+    gold_increase_timer = 0
     
     # Apply hard mode adjustments
     if current_mode == HARD:
@@ -666,183 +940,347 @@ def reset_game():
         enemy_spawn_delay = 120 # Slower spawns
         enemy_speed = 1.5 # Slower movement
 
-# Main game loop
-clock = pygame.time.Clock()
-running = True
-
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            if current_state == MAIN_MENU:
-                current_state = MODE_SELECT
-            elif current_state == MODE_SELECT:
-                mouse_x, mouse_y = pygame.mouse.get_pos()
-                easy_button_rect = pygame.Rect(WIDTH//2 - 150, HEIGHT//2 - 50, 300, 80)
-                hard_button_rect = pygame.Rect(WIDTH//2 - 150, HEIGHT//2 + 70, 300, 80)
-                
-                if easy_button_rect.collidepoint(mouse_x, mouse_y):
-                    current_mode = EASY
-                    current_state = GAME
-                    reset_game()
-                elif hard_button_rect.collidepoint(mouse_x, mouse_y):
-                    current_mode = HARD
-                    current_state = GAME
-                    reset_game()
-            elif current_state == GAME_OVER:
-                current_state = MAIN_MENU
-            elif current_state == GAME:
-                mouse_x, mouse_y = pygame.mouse.get_pos()
-                
-                button_width, button_height = 130, 35
-                cannon_button_rect = pygame.Rect(WIDTH - 150, HEIGHT - 170, button_width, button_height)
-                wizard_button_rect = pygame.Rect(WIDTH - 150, HEIGHT - 130, button_width, button_height)
-                dragon_button_rect = pygame.Rect(WIDTH - 150, HEIGHT - 90, button_width, button_height)
-                range_button_rect = pygame.Rect(WIDTH - 150, HEIGHT - 50, button_width, button_height)
-                
-                if cannon_button_rect.collidepoint(mouse_x, mouse_y) and gold >= cannon_cost:
-                    gold -= cannon_cost
-                    new_tower = {
-                        "x": mouse_x,
-                        "y": mouse_y,
-                        "cooldown": 0,
-                        "type": "cannon",
-                        "range": cannon_range
-                    }
-                    placed_towers.append(new_tower)
-                    selected_tower = new_tower
-                    dragging_tower = True
-                
-                elif wizard_button_rect.collidepoint(mouse_x, mouse_y) and gold >= wizard_cost:
-                    gold -= wizard_cost
-                    new_tower = {
-                        "x": mouse_x,
-                        "y": mouse_y,
-                        "cooldown": 0,
-                        "type": "wizard",
-                        "range": wizard_range
-                    }
-                    placed_towers.append(new_tower)
-                    selected_tower = new_tower
-                    dragging_tower = True
-                
-                elif dragon_button_rect.collidepoint(mouse_x, mouse_y) and gold >= dragon_cost:
-                    gold -= dragon_cost
-                    new_tower = {
-                        "x": mouse_x,
-                        "y": mouse_y,
-                        "cooldown": 0,
-                        "type": "dragon",
-                        "range": dragon_range
-                    }
-                    placed_towers.append(new_tower)
-                    selected_tower = new_tower
-                    dragging_tower = True
-                
-                elif range_button_rect.collidepoint(mouse_x, mouse_y) and selected_tower and gold >= range_upgrade_cost:
-                    gold -= range_upgrade_cost
-                    selected_tower["range"] += range_upgrade_amount
-                
-                elif not dragging_tower:
-                    for tower in placed_towers:
-                        radius = (cannon_radius if tower["type"] == "cannon" else 
-                                 wizard_radius if tower["type"] == "wizard" else dragon_radius)
-                        if math.dist((mouse_x, mouse_y), (tower["x"], tower["y"])) <= radius:
-                            selected_tower = tower
-                            break
-        
-        elif event.type == pygame.MOUSEBUTTONUP and current_state == GAME:
-            if dragging_tower:
-                mouse_x, mouse_y = pygame.mouse.get_pos()
-                if is_valid_tower_position(mouse_x, mouse_y):
-                    selected_tower["x"] = mouse_x
-                    selected_tower["y"] = mouse_y
-                else:
-                    if "original_x" not in selected_tower:
-                        placed_towers.remove(selected_tower)
-                        refund = (cannon_cost if selected_tower["type"] == "cannon" else 
-                                 wizard_cost if selected_tower["type"] == "wizard" else dragon_cost)
-                        gold += refund
-                
-                dragging_tower = False
-    
-    if current_state == GAME:
-        if dragging_tower and selected_tower:
-            mouse_x, mouse_y = pygame.mouse.get_pos()
-            selected_tower["x"] = mouse_x
-            selected_tower["y"] = mouse_y
-        
-        if wave_announcement_timer > 0:
-            wave_announcement_timer -= 1
-        
-        if is_between_waves:
-            if len(enemies) == 0:
-                wave_timer += 1
-                if wave_timer >= time_between_waves:
-                    current_wave += 1
-                    is_between_waves = False
-                    wave_timer = 0
-                    wave_announcement_timer = wave_announcement_duration
-                    enemy_speed += 0.1
-                    enemy_spawn_delay = max(30, enemy_spawn_delay - 5)
-                    enemies_in_wave = 0
-        else:
-            enemy_spawn_timer += 1
-            if enemy_spawn_timer >= enemy_spawn_delay:
-                spawn_enemy()
-                enemy_spawn_timer = 0
-                if wave_timer > wave_duration // 2:
-                    enemy_spawn_delay = max(30, enemy_spawn_delay - 2)
-            
+# Stress test settings (run with --stress)
+stress_mode = "--stress" in sys.argv
+stress_enemy_count = 5000
+frame_time_ms = 0
+
+def fill_stress_enemies():
+    # Keep the map full by dropping new enemies at random points along the path
+    while len(enemies) < stress_enemy_count:
+        spawn_enemy()
+        enemies["distance"][-1] = random.uniform(0, path_length)
+
+def start_stress_test():
+    global current_state
+    current_state = GAME
+    reset_game()
+    
+    # Fill every open spot on the map with towers
+    for x in range(40, WIDTH - 160, 60):
+        for y in range(40, HEIGHT - 40, 60):
+            if is_valid_tower_position(x, y):
+                kind = random.choice([CANNON, WIZARD, DRAGON])
+                stamp_tower(placed_towers.add(x=x, y=y, kind=kind, cooldown=0,
+                                              range=tower_base_range(kind)), 1)
+    fill_stress_enemies()
+
+def draw_stress_stats():
+    mode = "spatial grid" if use_spatial_grid else "brute force"
+    stats_text = small_font.render(
+        f"{len(enemies)} enemies | {mode} | {frame_time_ms:.1f} ms/frame (G to switch)", True, WHITE)
+    screen.blit(stats_text, (10, 10))
+
+def update_game():
+    # One tick of game logic. Used by the game loop and by simulate().
+    global wave_announcement_timer, is_between_waves, wave_timer, current_wave
+    global enemy_speed, enemy_spawn_delay, enemies_in_wave, enemy_spawn_timer
+    global gold_increase_timer, gold
+    
+    if wave_announcement_timer > 0:
+        wave_announcement_timer -= 1
+    
+    if is_between_waves:
+        if len(enemies) == 0:
             wave_timer += 1
-            if wave_timer >= wave_duration or (enemies_in_wave > 0 and enemies_remaining == 0):
-                is_between_waves = True
+            if wave_timer >= time_between_waves:
+                current_wave += 1
+                is_between_waves = False
                 wave_timer = 0
+                wave_announcement_timer = wave_announcement_duration
+                enemy_speed += 0.1
+                enemy_spawn_delay = max(30, enemy_spawn_delay - 5)
+                enemies_in_wave = 0
+    else:
+        enemy_spawn_timer += 1
+        if enemy_spawn_timer >= enemy_spawn_delay:
+            spawn_enemy()
+            enemy_spawn_timer = 0
+            if wave_timer > wave_duration // 2:
+                enemy_spawn_delay = max(30, enemy_spawn_delay - 2)
+        
+        wave_timer += 1
+        if wave_timer >= wave_duration or (enemies_in_wave > 0 and enemies_remaining == 0):
+            is_between_waves = True
+            wave_timer = 0
+    
+    gold_increase_timer += 1
+    if gold_increase_timer >= gold_increase_delay:
+        gold += 2
+        gold_increase_timer = 0
+    
+    update_enemies()
+    rebuild_enemy_grid()
+    update_towers()
+    update_projectiles()
+
+# Headless simulation
+def simulate(towers, ticks=10000, seed=0, mode=EASY, settings=None):
+    # Plays from the first wave without a window. towers are free (kind, x, y)
+    # or (kind, x, y, targeting) placements, and settings such as
+    # {"cannon_damage": 20} apply to this run only. The same arguments always
+    # give the same result dict, which includes the kills of each tower
+    global current_state, current_mode
+    settings = settings or {}
+    defaults = {name: globals()[name] for name in settings}
+    globals().update(settings)
+    try:
+        random.seed(seed)
+        current_mode = mode
+        current_state = GAME
+        reset_game()
+        for kind, x, y, *targeting in towers:
+            tower = placed_towers.add(x=x, y=y, kind=kind, cooldown=0, range=tower_base_range(kind),
+                                      targeting=targeting[0] if targeting else NEAREST)
+            stamp_tower(tower, 1)
         
-        gold_increase_timer += 1
-        if gold_increase_timer >= gold_increase_delay:
-            gold += 2
-            gold_increase_timer = 0
+        tick = 0
+        while tick < ticks and current_state == GAME:
+            update_game()
+            tick += 1
         
-        update_enemies()
-        update_towers()
+        return {
+            "castle_health": castle_health,
+            "gold": gold,
+            "wave": current_wave,
+            "ticks": tick,
+            "castle_fell": current_state == GAME_OVER,
+            "kills_per_tower": placed_towers["kills"].tolist()
+        }
+    finally:
+        globals().update(defaults)
+
+def run_simulation_checks():
+    # Checks the simulation is repeatable and credits kills to the right
+    # tower (run with --check)
+    layout = [(CANNON, 100, 210), (WIZARD, 300, 220), (CANNON, 460, 380), (DRAGON, 540, 500)]
+    damage = cannon_damage
+    first = simulate(layout, ticks=3000, seed=3)
+    assert simulate(layout, ticks=3000, seed=3) == first, "same seed gave a different game"
+    assert simulate(layout, ticks=3000, seed=3, settings={"cannon_damage": 30}) != first
+    assert cannon_damage == damage, "settings were not restored"
+    
+    def one_tick(hit):
+        # Two towers next to a 5 health enemy; hit adds their shots
+        reset_game()
+        placed_towers.add(x=50, y=50, kind=CANNON, cooldown=99)
+        placed_towers.add(x=50, y=50, kind=DRAGON, cooldown=99)
+        enemies.add(x=100, y=100, kind=0, size=11, speed=0, health=5, max_health=5,
+                    reward=1, distance=0, is_boss=False, last_hit_by=-1)
+        hit()
+        rebuild_enemy_grid()
         update_projectiles()
+        return placed_towers["kills"].tolist()
     
-    # Drawing
-    if current_state == MAIN_MENU:
-        draw_main_menu()
-    elif current_state == MODE_SELECT:
-        draw_mode_select()
-    elif current_state == GAME_OVER:
-        draw_game_over()
-    elif current_state == GAME:
-        # look for when the user selects hard mode or easy mode
-        if current_mode == HARD:
-            # Have the background be orange when in hard mode
-            screen.fill(HARD_MODE_BG)
-        else:
-            # Have the background be green when in easy mode
-            screen.fill(GRASS_GREEN)
+    # A cannon shot kills the enemy and a fire blast touches it on the same
+    # tick; the kill belongs to the cannon that landed the killing blow
+    def cannon_and_fire():
+        projectiles.add(x=100, y=100, damage=10, kind=CANNON, owner=0)
+        fire_projectiles.add(x=100, y=100, damage=30, radius=12, life=60, owner=1)
+    assert one_tick(cannon_and_fire) == [1, 0], "fire took the cannon's kill"
+    
+    # Two shots at one weak enemy: the second one flies on to the next enemy
+    def two_shots():
+        enemies.add(x=104, y=100, kind=0, size=11, speed=0, health=5, max_health=5,
+                    reward=1, distance=0, is_boss=False, last_hit_by=-1)
+        projectiles.add(x=102, y=100, damage=10, kind=CANNON, owner=0)
+        projectiles.add(x=102, y=100, damage=10, kind=CANNON, owner=1)
+    assert one_tick(two_shots) == [1, 1] and len(enemies) == 0, "a shot was spent on a dead enemy"
+    print("simulation checks passed")
+
+def run_balance_sweep():
+    # Example sweep (run with --simulate): one simulation per combination of
+    # cannon damage and wizard range, spread over every CPU core
+    layout = [(CANNON, 100, 210), (WIZARD, 300, 220), (CANNON, 460, 380), (DRAGON, 540, 500)]
+    jobs = [(layout, 10000, seed, EASY, {"cannon_damage": damage, "wizard_range": wizard_reach})
+            for damage in (8, 11, 14)
+            for wizard_reach in (160, 200, 240)
+            for seed in range(4)]
+    
+    # Workers are started fresh ("spawn") because forking a process that has
+    # already called pygame.init() can hang. They are closed rather than
+    # terminated because pygame catches the terminate signal.
+    start = time.perf_counter()
+    with multiprocessing.get_context("spawn").Pool() as pool:
+        results = pool.starmap(simulate, jobs)
+        pool.close()
+        pool.join()
+    elapsed = time.perf_counter() - start
+    
+    for (layout, ticks, seed, mode, settings), result in zip(jobs, results):
+        print(f"{settings} seed {seed}: wave {result['wave']}, castle {result['castle_health']}, "
+              f"gold {result['gold']}, kills {result['kills_per_tower']}")
+    print(f"{len(jobs)} simulations in {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        run_simulation_checks()
+        sys.exit()
+    if "--simulate" in sys.argv:
+        run_balance_sweep()
+        sys.exit()
+    
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Top-Down Castle Defense")
+    
+    # Main game loop
+    clock = pygame.time.Clock()
+    running = True
+
+    if stress_mode:
+        start_stress_test()
+
+    while running:
+        frame_start = time.perf_counter()
         
-        draw_path()
-        draw_castle()
-        draw_enemies()
-        draw_projectiles()
-        draw_towers()
-        draw_ui()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN and stress_mode and event.key == pygame.K_g:
+                use_spatial_grid = not use_spatial_grid
+            elif (event.type == pygame.KEYDOWN and event.key == pygame.K_t and
+                  current_state == GAME and selected_tower is not None):
+                targeting = placed_towers["targeting"]
+                targeting[selected_tower] = (targeting[selected_tower] + 1) % len(targeting_names)
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if current_state == MAIN_MENU:
+                    current_state = MODE_SELECT
+                elif current_state == MODE_SELECT:
+                    mouse_x, mouse_y = pygame.mouse.get_pos()
+                    easy_button_rect = pygame.Rect(WIDTH//2 - 150, HEIGHT//2 - 50, 300, 80)
+                    hard_button_rect = pygame.Rect(WIDTH//2 - 150, HEIGHT//2 + 70, 300, 80)
+                    
+                    if easy_button_rect.collidepoint(mouse_x, mouse_y):
+                        current_mode = EASY
+                        current_state = GAME
+                        reset_game()
+                    elif hard_button_rect.collidepoint(mouse_x, mouse_y):
+                        current_mode = HARD
+                        current_state = GAME
+                        reset_game()
+                elif current_state == GAME_OVER:
+                    current_state = MAIN_MENU
+                elif current_state == GAME:
+                    mouse_x, mouse_y = pygame.mouse.get_pos()
+                    
+                    button_width, button_height = 130, 35
+                    cannon_button_rect = pygame.Rect(WIDTH - 150, HEIGHT - 170, button_width, button_height)
+                    wizard_button_rect = pygame.Rect(WIDTH - 150, HEIGHT - 130, button_width, button_height)
+                    dragon_button_rect = pygame.Rect(WIDTH - 150, HEIGHT - 90, button_width, button_height)
+                    range_button_rect = pygame.Rect(WIDTH - 150, HEIGHT - 50, button_width, button_height)
+                    
+                    if cannon_button_rect.collidepoint(mouse_x, mouse_y) and gold >= cannon_cost:
+                        gold -= cannon_cost
+                        selected_tower = placed_towers.add(
+                            x=mouse_x,
+                            y=mouse_y,
+                            kind=CANNON,
+                            cooldown=0,
+                            range=cannon_range
+                        )
+                        dragging_tower = True
+                    
+                    elif wizard_button_rect.collidepoint(mouse_x, mouse_y) and gold >= wizard_cost:
+                        gold -= wizard_cost
+                        selected_tower = placed_towers.add(
+                            x=mouse_x,
+                            y=mouse_y,
+                            kind=WIZARD,
+                            cooldown=0,
+                            range=wizard_range
+                        )
+                        dragging_tower = True
+                    
+                    elif dragon_button_rect.collidepoint(mouse_x, mouse_y) and gold >= dragon_cost:
+                        gold -= dragon_cost
+                        selected_tower = placed_towers.add(
+                            x=mouse_x,
+                            y=mouse_y,
+                            kind=DRAGON,
+                            cooldown=0,
+                            range=dragon_range
+                        )
+                        dragging_tower = True
+                    
+                    elif range_button_rect.collidepoint(mouse_x, mouse_y) and selected_tower is not None and gold >= range_upgrade_cost:
+                        gold -= range_upgrade_cost
+                        placed_towers["range"][selected_tower] += range_upgrade_amount
+                    
+                    elif not dragging_tower:
+                        towers = zip(placed_towers["x"].tolist(), placed_towers["y"].tolist(), placed_towers["kind"].tolist())
+                        for tower, (tower_x, tower_y, kind) in enumerate(towers):
+                            if math.dist((mouse_x, mouse_y), (tower_x, tower_y)) <= tower_radius(kind):
+                                selected_tower = tower
+                                break
+            
+            elif event.type == pygame.MOUSEBUTTONUP and current_state == GAME:
+                if dragging_tower:
+                    mouse_x, mouse_y = pygame.mouse.get_pos()
+                    if is_valid_tower_position(mouse_x, mouse_y):
+                        placed_towers["x"][selected_tower] = mouse_x
+                        placed_towers["y"][selected_tower] = mouse_y
+                        stamp_tower(selected_tower, 1)
+                    else:
+                        kind = placed_towers["kind"][selected_tower]
+                        remove_tower(selected_tower)
+                        selected_tower = None
+                        refund = (cannon_cost if kind == CANNON else 
+                                 wizard_cost if kind == WIZARD else dragon_cost)
+                        gold += refund
+                    
+                    dragging_tower = False
         
-        if dragging_tower and selected_tower and "original_x" not in selected_tower:
-            mouse_x, mouse_y = pygame.mouse.get_pos()
-            color = (0, 255, 0) if is_valid_tower_position(mouse_x, mouse_y) else (255, 0, 0)
-            radius = (cannon_radius if selected_tower["type"] == "cannon" else 
-                     wizard_radius if selected_tower["type"] == "wizard" else dragon_radius)
-            pygame.draw.circle(screen, color, (mouse_x, mouse_y), radius, 2)
+        if current_state == GAME:
+            if dragging_tower and selected_tower is not None:
+                mouse_x, mouse_y = pygame.mouse.get_pos()
+                placed_towers["x"][selected_tower] = mouse_x
+                placed_towers["y"][selected_tower] = mouse_y
+            
+            if stress_mode:
+                castle_health = max_castle_health
+                fill_stress_enemies()
+            
+            update_game()
         
-        draw_wave_announcement()
-    
-    pygame.display.flip()
-    clock.tick(60)
+        # Drawing
+        if current_state == MAIN_MENU:
+            draw_main_menu()
+        elif current_state == MODE_SELECT:
+            draw_mode_select()
+        elif current_state == GAME_OVER:
+            draw_game_over()
+        elif current_state == GAME:
+            # look for when the user selects hard mode or easy mode
+            if current_mode == HARD:
+                # Have the background be orange when in hard mode
+                screen.fill(HARD_MODE_BG)
+            else:
+                # Have the background be green when in easy mode
+                screen.fill(GRASS_GREEN)
+            
+            draw_path()
+            draw_castle()
+            draw_enemies()
+            draw_projectiles()
+            draw_towers()
+            draw_ui()
+            
+            if dragging_tower and selected_tower is not None:
+                draw_placement_overlay()
+                mouse_x, mouse_y = pygame.mouse.get_pos()
+                color = (0, 255, 0) if is_valid_tower_position(mouse_x, mouse_y) else (255, 0, 0)
+                radius = tower_radius(placed_towers["kind"][selected_tower])
+                pygame.draw.circle(screen, color, (mouse_x, mouse_y), radius, 2)
+            
+            draw_wave_announcement()
+            
+            if stress_mode:
+                # Smooth the reading so it is easy to read while it changes
+                frame_time_ms = frame_time_ms * 0.9 + (time.perf_counter() - frame_start) * 100
+                draw_stress_stats()
+        
+        pygame.display.flip()
+        clock.tick(60)
 
-pygame.quit()
-sys.exit()
\ No newline at end of file
+    pygame.quit()
+    sys.exit()
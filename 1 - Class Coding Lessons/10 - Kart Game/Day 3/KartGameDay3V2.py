@@ -2,8 +2,16 @@ import pygame
 import math
 import sys
 import random
+import time
+import bisect
 import colorsys
 from enum import Enum
+from collections import OrderedDict
+
+try:
+    import numpy as np  # Optional: enables the vectorized ray caster and wall buffer
+except ImportError:
+    np = None
 
 # Initialize Pygame
 pygame.init()
@@ -40,10 +48,149 @@ class Color(Enum):
     PURPLE = (128, 0, 128)
     ORANGE = (255, 165, 0)
 
+class TrigTable:
+    """Sine and cosine read from a table of `resolution` angles, or from math if accurate"""
+    def __init__(self, resolution=9600, accurate=False):
+        self.resolution = resolution
+        self.accurate = accurate
+        self.step = 2 * math.pi / resolution
+        angles = [i * self.step for i in range(resolution)]
+        self.sin_table = [math.sin(angle) for angle in angles]
+        self.cos_table = [math.cos(angle) for angle in angles]
+        if np is not None:
+            self.sin_array = np.array(self.sin_table)
+            self.cos_array = np.array(self.cos_table)
+
+    def steps(self, angle):
+        """Number of table steps closest to angle"""
+        return round(angle / self.step)
+
+    def index(self, angle):
+        return round(angle / self.step) % self.resolution
+
+    def sin(self, angle):
+        if self.accurate:
+            return math.sin(angle)
+        return self.sin_table[round(angle / self.step) % self.resolution]
+
+    def cos(self, angle):
+        if self.accurate:
+            return math.cos(angle)
+        return self.cos_table[round(angle / self.step) % self.resolution]
+
+    def fan(self, start_angle, count, stride):
+        """(cos, sin) for count angles from start_angle, stride table steps apart"""
+        if self.accurate:
+            angles = [start_angle + i * stride * self.step for i in range(count)]
+            return [(math.cos(angle), math.sin(angle)) for angle in angles]
+        first = self.index(start_angle)
+        indices = [(first + i * stride) % self.resolution for i in range(count)]
+        return [(self.cos_table[i], self.sin_table[i]) for i in indices]
+
+    def fan_arrays(self, start_angle, count, stride):
+        """NumPy version of fan that returns separate cos and sin arrays"""
+        if self.accurate:
+            angles = start_angle + np.arange(count) * (stride * self.step)
+            return np.cos(angles), np.sin(angles)
+        indices = (self.index(start_angle) + np.arange(count) * stride) % self.resolution
+        return self.cos_array[indices], self.sin_array[indices]
+
+# Shared by the renderer and everything that moves along a heading
+TRIG = TrigTable()
+
+class SurfaceCache:
+    """Least-recently-used store for small alpha surfaces such as the glows drawn every frame"""
+    def __init__(self, capacity=512, max_size=256):
+        self.capacity = capacity
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def bucket(size):
+        """Rounds size down to a step of about 1/64 of its value"""
+        size = max(1, int(size))
+        return size - size % max(1, size // 64)
+
+    def get(self, shape, size, color, alpha, draw):
+        # draw(size, color, alpha) builds the surface on a miss. size is
+        # rounded into its bucket, so place the result by its own size
+        size = self.bucket(size)
+        if size > self.max_size:  # Too big to be worth keeping
+            self.misses += 1
+            return draw(size, color, alpha)
+        key = (shape, size, color, alpha)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            self.misses += 1
+            surface = draw(size, color, alpha)
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.capacity:
+                self.surfaces.popitem(last=False)
+        else:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+        return surface
+
+# Shared by everything that draws glows and other alpha shapes
+SURFACES = SurfaceCache()
+
+class SimulationClock:
+    """Fixed-timestep clock behind Game.run; gameplay timers read the simulated time, now"""
+    
+    def __init__(self, rate=60, max_steps=8):
+        self.rate = rate
+        self.step = 1 / rate
+        self.max_steps = max_steps  # Most steps run in one frame before time is dropped
+        self.ticks = 0
+        self.now = 0.0
+        self.accumulator = 0.0
+        self.alpha = 0.0
+    
+    def advance(self, elapsed):
+        """Adds elapsed real seconds and returns how many steps to simulate."""
+        self.accumulator += elapsed
+        steps = int(self.accumulator / self.step)
+        self.accumulator -= steps * self.step
+        # After a long stall, drop the backlog instead of trying to catch up,
+        # which would only make the next frame slower still
+        steps = min(steps, self.max_steps)
+        self.alpha = self.accumulator / self.step
+        return steps
+    
+    def tick(self):
+        self.ticks += 1
+        self.now = self.ticks * self.step
+
+# Shared by the game loop and every gameplay timer
+CLOCK = SimulationClock()
+
 class GameObject:
+    depth_bias = 0  # How far behind the wall depth a billboard may still show
+    angle = 0
+    
     def __init__(self, x, y):
         self.x = x
         self.y = y
+        self.previous_pose = (x, y, 0)
+    
+    def remember_pose(self):
+        # The pose at the start of a simulation step, for blend_pose()
+        self.previous_pose = (self.x, self.y, self.angle)
+    
+    def blend_pose(self, alpha):
+        """Blends alpha of the way on from the last step's pose for drawing; returns the pose to restore"""
+        pose = (self.x, self.y, self.angle)
+        x, y, angle = self.previous_pose
+        if abs(self.x - x) + abs(self.y - y) < 1:  # Jumps of a cell or more are not blended
+            self.x = x + (self.x - x) * alpha
+            self.y = y + (self.y - y) * alpha
+            self.angle = angle + (self.angle - angle) * alpha
+        return pose
+    
+    def restore_pose(self, pose):
+        self.x, self.y, self.angle = pose
     
     def update(self):
         pass
@@ -92,53 +239,37 @@ class Collectable(GameObject):
                 return True  # Notify game that boost should be applied
         return False  # No collection happened
     
-    def draw(self, screen, player, renderer):
-        # Don't draw if already collected
-        if self.collected:
-            return
-            
-        # Relative position to player
-        dx = self.x - player.x
-        dy = self.y - player.y
-        dist_sq = dx**2 + dy**2
-        
-        # Only render if within a certain distance (performance optimization)
-        if dist_sq > (renderer.MAX_DEPTH * 0.7) ** 2:
-            return
-            
-        # Compute angle from player to object relative to view direction
-        angle = math.atan2(dy, dx) - player.angle
-        while angle > math.pi: angle -= 2 * math.pi
-        while angle < -math.pi: angle += 2 * math.pi
-        
-        # Only draw if within player's field of view
-        if -renderer.HALF_FOV <= angle <= renderer.HALF_FOV:
-            dist = math.sqrt(dist_sq)
-            proj_height = (HEIGHT - UI_HEIGHT) / (dist + 0.0001)  # Perspective projection
-            screen_x = int((angle + renderer.HALF_FOV) / renderer.FOV * WIDTH)  # Horizontal screen position
-            
-            size = int(proj_height * self.size)  # Adjust size based on distance
-            
-            # Calculate rainbow glow color using HSV color cycling
-            hue = (pygame.time.get_ticks() * 0.002) % 1.0
-            r, g, b = colorsys.hsv_to_rgb(hue, 1.0, self.glow_intensity)
-            rainbow_color = (int(r*255), int(g*255), int(b*255))
-            
-            # Draw the main collectable
-            pygame.draw.rect(screen, rainbow_color, 
-                             (screen_x - size//2, 
-                              (HEIGHT - UI_HEIGHT)//2 - size//2, 
-                              size, size))
-            
-            # Add a soft glow using transparent rectangles
-            for i in range(3, 0, -1):
-                glow_size = size + i * 3
-                glow_surface = pygame.Surface((glow_size, glow_size), pygame.SRCALPHA)
-                pygame.draw.rect(glow_surface, (*rainbow_color, 30//i), 
-                                 (0, 0, glow_size, glow_size))
-                screen.blit(glow_surface, 
-                            (screen_x - glow_size//2, 
-                             (HEIGHT - UI_HEIGHT)//2 - glow_size//2))
+    def add_billboard(self, billboards, player, renderer):
+        # Don't draw if already collected, and only within 70% of max depth
+        if not self.collected:
+            billboards.add(self, player, renderer.MAX_DEPTH * 0.7)
+    
+    @staticmethod
+    def draw_glow(size, color, alpha):
+        glow_surface = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.rect(glow_surface, (*color, alpha), (0, 0, size, size))
+        return glow_surface
+    
+    def draw_billboard(self, screen, screen_x, proj_height):
+        size = int(proj_height * self.size)  # Adjust size based on distance
+        
+        # Calculate rainbow glow color using HSV color cycling, in whole
+        # steps of hue so the cached glows stay at a few dozen colors
+        hue = int(pygame.time.get_ticks() * 0.002 * 32) % 32 / 32
+        r, g, b = colorsys.hsv_to_rgb(hue, 1.0, self.glow_intensity)
+        rainbow_color = (int(r*255), int(g*255), int(b*255))
+        
+        # Draw the main collectable
+        pygame.draw.rect(screen, rainbow_color, 
+                         (screen_x - size//2, 
+                          (HEIGHT - UI_HEIGHT)//2 - size//2, 
+                          size, size))
+        
+        # Add a soft glow using transparent rectangles
+        for i in range(3, 0, -1):
+            glow_surface = SURFACES.get("square", size + i * 3, rainbow_color, 30//i, self.draw_glow)
+            screen.blit(glow_surface, 
+                        glow_surface.get_rect(center=(screen_x, (HEIGHT - UI_HEIGHT)//2)))
 
 class Wall(GameObject):
     def __init__(self, x, y, is_finish=False, is_lap_line=False):
@@ -154,38 +285,30 @@ class Wall(GameObject):
         else:
             self.color = Color.GRAY
     
-    def draw(self, screen, ray, proj_height, depth_shade):
+    def draw(self, columns, ray, proj_height, depth):
         proj_height *= 0.2
-        base_color = self.color.value
-        shaded_color = (
-            max(0, min(255, base_color[0] * (depth_shade[0]/255))),
-            max(0, min(255, base_color[1] * (depth_shade[1]/255))),
-            max(0, min(255, base_color[2] * (depth_shade[2]/255)))
-        )
+        wall_top = (HEIGHT - UI_HEIGHT) // 2 - proj_height // 2
         
         if self.is_finish or self.is_lap_line:
+            shaded_color = columns.shaded_rgb(self.color.value, depth)
             pulse = abs(math.sin(pygame.time.get_ticks() * 0.005))
-            pulse_color = (
+            pulse_color = columns.pack((
                 min(255, shaded_color[0] + int(pulse * 50)),
                 min(255, shaded_color[1] + int(pulse * 50)),
-                min(255, shaded_color[2] + int(pulse * 20)))
+                min(255, shaded_color[2] + int(pulse * 20))))
             if self.is_lap_line and ray % 2 == 0:
-                pygame.draw.rect(screen, pulse_color, 
-                               (ray, (HEIGHT - UI_HEIGHT) // 2 - proj_height // 2, 
-                                1, proj_height))
+                columns.fill(ray, wall_top, proj_height, pulse_color)
             elif self.is_finish:
-                pygame.draw.rect(screen, pulse_color, 
-                               (ray, (HEIGHT - UI_HEIGHT) // 2 - proj_height // 2, 
-                                1, proj_height))
+                columns.fill(ray, wall_top, proj_height, pulse_color)
             if random.random() < 0.02:
-                sparkle_y = (HEIGHT - UI_HEIGHT) // 2 - proj_height // 2 + random.random() * proj_height
-                pygame.draw.circle(screen, (255, 255, 255), (ray, int(sparkle_y)), 2)
+                sparkle_y = wall_top + random.random() * proj_height
+                columns.overlays.append(((255, 255, 255), (ray, int(sparkle_y)), 2))
         else:
-            pygame.draw.rect(screen, shaded_color, 
-                           (ray, (HEIGHT - UI_HEIGHT) // 2 - proj_height // 2, 
-                            1, proj_height))
+            columns.fill(ray, wall_top, proj_height, columns.shade(self.color.value, depth))
 
 class NPCRacer(GameObject):
+    UPDATE_RATE = 30  # Updates a second the speeds and turn rates below were tuned for
+    
     def __init__(self, x, y, color):
         super().__init__(x + 0.5, y + 0.5)
         self.color = color
@@ -195,14 +318,16 @@ class NPCRacer(GameObject):
         self.waypoints = []
         self.current_waypoint = 0
         self.laps = 1
-        self.last_lap_crossing = 0
+        self.last_lap_crossing = CLOCK.now
         self.acceleration = 0.0008
         self.deceleration = 0.0005
         self.max_speed = 0.5
         
-    def update(self, game_map):
+    def update(self, game_map, dt=1 / UPDATE_RATE):
         if not self.waypoints:
             return
+        # How many tuned updates this one stands in for
+        scale = dt * self.UPDATE_RATE
             
         target_x, target_y = self.waypoints[self.current_waypoint]
         dx = target_x - self.x
@@ -218,28 +343,29 @@ class NPCRacer(GameObject):
         
         target_angle = math.atan2(dy, dx)
         angle_diff = (target_angle - self.angle + math.pi) % (2 * math.pi) - math.pi
-        self.angle += min(max(angle_diff, -0.04), 0.04)
+        turn = 0.04 * scale
+        self.angle += min(max(angle_diff, -turn), turn)
         
         turn_factor = 1.0 - min(abs(angle_diff) / math.pi, 0.7)
         if distance < 2.0:
             turn_factor *= distance / 2.0
             
-        front_x = self.x + math.cos(self.angle) * 0.7
-        front_y = self.y + math.sin(self.angle) * 0.7
+        front_x = self.x + TRIG.cos(self.angle) * 0.7
+        front_y = self.y + TRIG.sin(self.angle) * 0.7
         if game_map.get_cell(int(front_x), int(front_y)) == 1:
-            self.speed = max(0.01, self.speed - self.deceleration * 3)
+            self.speed = max(0.01, self.speed - self.deceleration * 3 * scale)
         else:
-            self.speed = min(self.max_speed * turn_factor, self.speed + self.acceleration)
+            self.speed = min(self.max_speed * turn_factor, self.speed + self.acceleration * scale)
         
-        move_x = math.cos(self.angle) * self.speed
-        move_y = math.sin(self.angle) * self.speed
+        move_x = TRIG.cos(self.angle) * self.speed * scale
+        move_y = TRIG.sin(self.angle) * self.speed * scale
         
         if game_map.get_cell(int(self.x + move_x), int(self.y)) == 0:
             self.x += move_x
         if game_map.get_cell(int(self.x), int(self.y + move_y)) == 0:
             self.y += move_y
             
-        self.check_lap_completion(game_map, pygame.time.get_ticks() / 1000)
+        self.check_lap_completion(game_map, CLOCK.now)
     
     def check_lap_completion(self, game_map, current_time):
         if current_time - self.last_lap_crossing < 2.0:
@@ -255,49 +381,143 @@ class NPCRacer(GameObject):
                 return True
         return False
     
-    def draw(self, screen, player, renderer):
-        dx = self.x - player.x
-        dy = self.y - player.y
-        dist_sq = dx**2 + dy**2
-        
+    def add_billboard(self, billboards, player, renderer):
         # Only draw NPCs that are reasonably close (optimization)
-        if dist_sq > (renderer.MAX_DEPTH * 0.7) ** 2:  # 70% of max depth
-            return
-            
-        angle = math.atan2(dy, dx) - player.angle
-        while angle > math.pi: angle -= 2 * math.pi
-        while angle < -math.pi: angle += 2 * math.pi
-        
-        if -renderer.HALF_FOV <= angle <= renderer.HALF_FOV:
-            dist = math.sqrt(dist_sq)
-            proj_height = (HEIGHT-UI_HEIGHT) / (dist + 0.0001)
-            screen_x = int((angle + renderer.HALF_FOV) / renderer.FOV * WIDTH)
-            
-            size = int(proj_height * self.size)  # Smaller size due to reduced self.size
-            
-            # Simplified drawing - fewer elements for better performance
-            base_y = (HEIGHT-UI_HEIGHT)//2 + size//2 + int(proj_height * 0.3)
-            pygame.draw.ellipse(screen, self.color, 
-                              (screen_x - size//2, base_y - size//2, size, size//1.5))
-            
-            # Remove some decorative elements to improve performance
-            front_x = screen_x + math.cos(self.angle) * size//2
-            front_y = base_y + math.sin(self.angle) * size//4
-            pygame.draw.line(screen, (255, 255, 255), (screen_x, base_y), (front_x, front_y), 1)  # Thinner line
+        billboards.add(self, player, renderer.MAX_DEPTH * 0.7)  # 70% of max depth
+    
+    def draw_billboard(self, screen, screen_x, proj_height):
+        size = int(proj_height * self.size)  # Smaller size due to reduced self.size
+        
+        # Simplified drawing - fewer elements for better performance
+        base_y = (HEIGHT-UI_HEIGHT)//2 + size//2 + int(proj_height * 0.3)
+        pygame.draw.ellipse(screen, self.color, 
+                          (screen_x - size//2, base_y - size//2, size, size//1.5))
+        
+        # Remove some decorative elements to improve performance
+        front_x = screen_x + math.cos(self.angle) * size//2
+        front_y = base_y + math.sin(self.angle) * size//4
+        pygame.draw.line(screen, (255, 255, 255), (screen_x, base_y), (front_x, front_y), 1)  # Thinner line
+
+class NPCScheduler:
+    """Updates race NPCs at a fixed rate, one bucket of racers per step"""
+    
+    def __init__(self, racers, rate=NPCRacer.UPDATE_RATE):
+        self.racers = racers
+        self.buckets = max(1, round(CLOCK.rate / rate))
+        self.dt = self.buckets * CLOCK.step  # Simulated seconds between a racer's updates
+        self.steps = 0  # Counted from the start of the race, so every race plays out the same
+    
+    def update(self, game_map):
+        bucket = self.steps % self.buckets
+        for racer in self.racers[bucket::self.buckets]:
+            racer.update(game_map, self.dt)
+        self.steps += 1
+
+class TrackIndex:
+    """The racing line as segments, with the nearest few kept per cell for progress lookups"""
+    
+    def __init__(self, waypoints, map_data, lap_line):
+        self.segments = []  # (start x, start y, unit x, unit y, length)
+        self.starts = []
+        distance = 0.0
+        for (ax, ay), (bx, by) in zip(waypoints, waypoints[1:] + waypoints[:1]):
+            length = math.hypot(bx - ax, by - ay)
+            if length == 0:
+                continue  # The closing segment when the path already ends where it began
+            self.segments.append((ax, ay, (bx - ax) / length, (by - ay) / length, length))
+            self.starts.append(distance)
+            distance += length
+        self.length = distance
+        
+        self.cell_segments = {}
+        for y, row in enumerate(map_data):
+            for x, cell in enumerate(row):
+                if cell != 1:
+                    self.cell_segments[(x, y)] = self.nearest_segments(x + 0.5, y + 0.5)
+        
+        # Distances count from where the track enters the lap line, whose
+        # cell starts half a cell before its centre
+        self.origin = 0.0
+        lap_x, lap_y = lap_line
+        self.origin = self.progress(lap_x + 0.5, lap_y + 0.5) - 0.5
+    
+    def project(self, index, x, y):
+        """Returns (distance off the segment, distance along the track)."""
+        ax, ay, ux, uy, length = self.segments[index]
+        along = min(max((x - ax) * ux + (y - ay) * uy, 0.0), length)
+        return math.hypot(x - ax - ux * along, y - ay - uy * along), self.starts[index] + along
+    
+    def nearest_segments(self, x, y):
+        offsets = [self.project(i, x, y)[0] for i in range(len(self.segments))]
+        closest = min(offsets)
+        # Keep every segment about as near, so corners can go either way
+        return tuple(i for i, offset in enumerate(offsets) if offset <= closest + 0.5)
+    
+    def progress(self, x, y):
+        """Distance round the lap of the track point nearest to (x, y)."""
+        candidates = self.cell_segments.get((int(x), int(y))) or range(len(self.segments))
+        _, along = min(self.project(i, x, y) for i in candidates)
+        return (along - self.origin) % self.length
+    
+    def point_at(self, distance):
+        """Returns (x, y, segment) `distance` round the lap, heading for waypoint segment + 1"""
+        along = (distance + self.origin) % self.length
+        index = bisect.bisect_right(self.starts, along) - 1
+        ax, ay, ux, uy, _ = self.segments[index]
+        along -= self.starts[index]
+        return ax + ux * along, ay + uy * along, index
+
+class Standings:
+    """Race order by laps and then progress, kept up to date step by step"""
+    
+    def __init__(self, track, racers):
+        self.track = track
+        self.order = list(racers)
+        self.keys = {}
+        self.update()
+    
+    def update(self):
+        keys = self.keys
+        for racer in self.order:
+            keys[racer] = (racer.laps, self.track.progress(racer.x, racer.y))
+        
+        # Positions barely change between steps, so an insertion pass puts
+        # the last order right in about one comparison per racer
+        order = self.order
+        for i in range(1, len(order)):
+            racer = order[i]
+            key = keys[racer]
+            j = i
+            while j > 0 and keys[order[j - 1]] < key:
+                order[j] = order[j - 1]
+                j -= 1
+            order[j] = racer
 
 class GameMap:
-    def __init__(self, map_data, mode):
+    # Points inside a cell that special wall visibility is checked from
+    VIEW_POINTS = [(0.5, 0.5), (0.1, 0.1), (0.9, 0.1), (0.1, 0.9), (0.9, 0.9)]
+    
+    def __init__(self, map_data, mode, seed=None):
         self.map_data = map_data
         self.walls = {}
         self.finish_walls = []
         self.lap_lines = []
         self.npcs = []
+        self.waypoints = []
+        self.track = None
         self.collectables = []
         self.mode = mode
+        self.random = random.Random(seed)  # Same seed, same collectables
+        self.grid = np.array(map_data, dtype=np.uint8) if np is not None else None
+        self.visible_walls_by_cell = {}
         self.initialize_walls()
+        # Only one of these is filled, depending on the mode
+        self.special_walls = self.finish_walls + self.lap_lines
         if mode == GameMode.RACE:
             self.initialize_npcs(1.5, 1.5)  # Only initialize NPCs for race mode
             self.initialize_collectables()
+            self.track = TrackIndex(self.waypoints, map_data, self.lap_lines[0])
+        self.npc_scheduler = NPCScheduler(self.npcs)
     
     def initialize_collectables(self):
         # Find all empty cells that are adjacent to walls
@@ -308,7 +528,7 @@ class GameMap:
                     if (self.map_data[y-1][x] == 1 or self.map_data[y+1][x] == 1 or
                         self.map_data[y][x-1] == 1 or self.map_data[y][x+1] == 1):
                         # 20% chance to spawn a collectable in this cell
-                        if random.random() < 0.05:
+                        if self.random.random() < 0.05:
                             self.collectables.append(Collectable(x, y))
     
     def initialize_walls(self):
@@ -357,6 +577,7 @@ class GameMap:
             (1.5, 11.5),     # Return to outer track
             (1.5, 1.5)       # Back to start/finish line
         ]
+        self.waypoints = waypoints  # Also the line race standings are measured along
         
         # Spawn position offsets from the player's start position
         # Each NPC will be slightly offset to avoid stacking
@@ -413,6 +634,28 @@ class GameMap:
             if self.get_cell(test_x, test_y) == 1:
                 return False
         return True
+    
+    def visible_special_walls(self, player_x, player_y):
+        """Finish and lap-line walls seen from the player's cell, worked out once per cell"""
+        cell = (int(player_x), int(player_y))
+        visible = self.visible_walls_by_cell.get(cell)
+        if visible is None:
+            visible = set()
+            for wall_x, wall_y in self.special_walls:
+                for offset_x, offset_y in self.VIEW_POINTS:
+                    if self.is_visible(cell[0] + offset_x, cell[1] + offset_y, wall_x, wall_y):
+                        visible.add((wall_x, wall_y))
+                        break
+            self.visible_walls_by_cell[cell] = visible
+        return visible  # Shared between calls, so do not change it
+    
+    def solid_cells(self, visible_special_walls):
+        """Boolean [y, x] array of the cells that block rays this frame"""
+        solid = self.grid == 1
+        for wall_x, wall_y in visible_special_walls:
+            if self.get_cell(wall_x, wall_y) in [2, 3]:
+                solid[wall_y, wall_x] = True
+        return solid
 
 class Player(GameObject):
     def __init__(self, x, y):
@@ -446,8 +689,8 @@ class Player(GameObject):
         if self.speed > 0:
             self.speed = max(0, self.speed - self.deceleration)
         
-        new_x = self.x + math.cos(self.angle) * self.speed
-        new_y = self.y + math.sin(self.angle) * self.speed
+        new_x = self.x + TRIG.cos(self.angle) * self.speed
+        new_y = self.y + TRIG.sin(self.angle) * self.speed
         
         if game_map.get_cell(int(new_x), int(new_y)) == 0:
             self.x = new_x
@@ -573,6 +816,232 @@ class Car:
         pygame.draw.polygon(screen, (0, 255, 255), chassis_points, 2)
         pygame.draw.polygon(screen, (0, 200, 255), canopy_points, 1)
 
+class RayCaster:
+    """Steps a ray from one grid line to the next (DDA), so the hit distance is exact"""
+    def __init__(self, max_depth):
+        self.max_depth = max_depth
+
+    def cast(self, origin_x, origin_y, cos_a, sin_a, is_hit):
+        # is_hit(cell_x, cell_y) is True for a wall and None off the map.
+        # Returns (depth, cell_x, cell_y) of the first wall, or None
+        cell_x = int(origin_x)
+        cell_y = int(origin_y)
+
+        # Ray length between grid lines; 1e30 for lines a ray along an axis never crosses
+        delta_x = abs(1 / cos_a) if cos_a != 0 else 1e30
+        delta_y = abs(1 / sin_a) if sin_a != 0 else 1e30
+
+        if cos_a < 0:
+            step_x = -1
+            side_x = (origin_x - cell_x) * delta_x
+        else:
+            step_x = 1
+            side_x = (cell_x + 1 - origin_x) * delta_x
+        if sin_a < 0:
+            step_y = -1
+            side_y = (origin_y - cell_y) * delta_y
+        else:
+            step_y = 1
+            side_y = (cell_y + 1 - origin_y) * delta_y
+
+        max_depth = self.max_depth
+        while True:
+            # Step into whichever neighbouring cell the ray reaches first
+            if side_x < side_y:
+                depth = side_x
+                side_x += delta_x
+                cell_x += step_x
+            else:
+                depth = side_y
+                side_y += delta_y
+                cell_y += step_y
+
+            if depth >= max_depth:
+                return None
+
+            hit = is_hit(cell_x, cell_y)
+            if hit is None:
+                return None
+            if hit:
+                return (depth, cell_x, cell_y)
+
+class BatchRayCaster:
+    """RayCaster for every screen column at once, using NumPy arrays"""
+    def __init__(self, max_depth):
+        self.max_depth = max_depth
+        # A ray crosses at most two grid lines per unit of distance
+        self.max_steps = int(max_depth) * 2 + 2
+
+    def cast(self, origin_x, origin_y, cos_a, sin_a, solid):
+        # solid is a [y, x] boolean array of the cells that stop a ray.
+        # Returns (hit, depths, cells_x, cells_y), one entry per ray
+        count = len(cos_a)
+        map_height, map_width = solid.shape
+
+        # 1e30 instead of inf for rays along an axis, as in RayCaster.cast
+        delta_x = np.abs(1 / np.where(cos_a != 0, cos_a, 1e-30))
+        delta_y = np.abs(1 / np.where(sin_a != 0, sin_a, 1e-30))
+
+        start_x = int(origin_x)
+        start_y = int(origin_y)
+        step_x = np.where(cos_a < 0, -1, 1)
+        step_y = np.where(sin_a < 0, -1, 1)
+        side_x = np.where(cos_a < 0, origin_x - start_x, start_x + 1 - origin_x) * delta_x
+        side_y = np.where(sin_a < 0, origin_y - start_y, start_y + 1 - origin_y) * delta_y
+        cells_x = np.full(count, start_x)
+        cells_y = np.full(count, start_y)
+
+        hit = np.zeros(count, dtype=bool)
+        depths = np.zeros(count)
+        active = np.ones(count, dtype=bool)
+
+        for _ in range(self.max_steps):
+            # Every active ray steps into whichever neighbour it reaches first
+            step_in_x = side_x < side_y
+            depth = np.where(step_in_x, side_x, side_y)
+            move_x = active & step_in_x
+            move_y = active & ~step_in_x
+            cells_x[move_x] += step_x[move_x]
+            side_x[move_x] += delta_x[move_x]
+            cells_y[move_y] += step_y[move_y]
+            side_y[move_y] += delta_y[move_y]
+
+            active &= ((depth < self.max_depth) &
+                       (cells_x >= 0) & (cells_x < map_width) &
+                       (cells_y >= 0) & (cells_y < map_height))
+            new_hits = active & solid[np.clip(cells_y, 0, map_height - 1),
+                                      np.clip(cells_x, 0, map_width - 1)]
+            depths[new_hits] = depth[new_hits]
+            hit |= new_hits
+            active &= ~new_hits
+            if not active.any():
+                break
+
+        return hit, depths, cells_x, cells_y
+
+class WallColumns:
+    """Frame buffer the wall slices are written into, then blitted to the screen in one go"""
+    KEY_COLOR = (255, 0, 255)  # Marks pixels with no wall so the floor shows through
+    DEPTH_BUCKETS = 256        # One shading step per 0.1 units of distance
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.frame = pygame.Surface((width, height)).convert()
+        self.frame.set_colorkey(self.KEY_COLOR)
+        if np is not None:
+            self.blank = self.frame.map_rgb(self.KEY_COLOR)
+            self.pixels = np.full((width, height), self.blank, dtype=np.uint32)
+        self.shade_table = {}
+        self.overlays = []  # Small circles drawn on top after the blit
+
+    def pack(self, color):
+        """Converts an RGB tuple into the buffer's pixel format"""
+        if np is not None:
+            return self.frame.map_rgb(color)
+        return color
+
+    def shaded_rgb(self, color, depth):
+        """Returns the RGB tuple for a wall of this color seen at this depth"""
+        bucket = min(int(depth * 10), self.DEPTH_BUCKETS - 1)
+        light = (255 - bucket) / 255
+        return tuple(max(0, min(255, int(c * light))) for c in color)
+
+    def shade(self, color, depth):
+        """Returns the packed pixel for a wall of this color seen at this depth"""
+        shades = self.shade_table.get(color)
+        if shades is None:
+            shades = [self.pack(self.shaded_rgb(color, bucket / 10))
+                      for bucket in range(self.DEPTH_BUCKETS)]
+            self.shade_table[color] = shades
+        return shades[min(int(depth * 10), self.DEPTH_BUCKETS - 1)]
+
+    def clear(self):
+        if np is not None:
+            self.pixels.fill(self.blank)
+        else:
+            self.frame.fill(self.KEY_COLOR)
+        self.overlays.clear()
+
+    def fill(self, x, top, height, pixel):
+        """Paints one column from top down to top + height"""
+        bottom = min(self.height, int(top + height))
+        top = max(0, int(top))
+        if bottom <= top or not 0 <= x < self.width:
+            return
+        if np is not None:
+            self.pixels[x, top:bottom] = pixel
+        else:
+            self.frame.fill(pixel, (x, top, 1, bottom - top))
+
+    def blit(self, screen):
+        if np is not None:
+            pygame.surfarray.blit_array(self.frame, self.pixels)
+        screen.blit(self.frame, (0, 0))
+        for color, position, radius in self.overlays:
+            pygame.draw.circle(screen, color, position, radius)
+
+class Billboards:
+    """Sprites drawn furthest first after the walls, clipped to the columns no wall hides"""
+    def __init__(self, width, height, fov):
+        self.width = width
+        self.height = height
+        self.fov = fov
+        self.half_fov = fov / 2
+        self.depths = [math.inf] * width  # Nearest wall per screen column
+        self.sprites = []                 # (distance, screen_x, sprite) queued this frame
+
+    def clear(self):
+        self.depths = [math.inf] * self.width
+
+    def set_depth(self, x, width, depth):
+        """Records the wall depth for the columns x to x + width"""
+        for column in range(x, min(x + width, self.width)):
+            self.depths[column] = depth
+
+    def add(self, sprite, player, max_distance):
+        """Queues sprite if it is within max_distance of the player and in view"""
+        dx = sprite.x - player.x
+        dy = sprite.y - player.y
+        dist_sq = dx * dx + dy * dy
+        if dist_sq > max_distance * max_distance:
+            return
+
+        angle = (math.atan2(dy, dx) - player.angle + math.pi) % (2 * math.pi) - math.pi
+        if not -self.half_fov <= angle <= self.half_fov:
+            return
+
+        screen_x = int((angle + self.half_fov) / self.fov * self.width)
+        self.sprites.append((math.sqrt(dist_sq), screen_x, sprite))
+
+    def open_spans(self, left, right, depth):
+        """Yields (start, end) runs of columns in left..right with no wall nearer than depth"""
+        depths = self.depths
+        start = None
+        for x in range(left, right):
+            if depths[x] > depth:
+                if start is None:
+                    start = x
+            elif start is not None:
+                yield start, x
+                start = None
+        if start is not None:
+            yield start, right
+
+    def draw(self, screen):
+        self.sprites.sort(key=lambda entry: entry[0], reverse=True)
+        for distance, screen_x, sprite in self.sprites:
+            proj_height = self.height / (distance + 0.0001)
+            # Generous half-width so glows and outlines are not cut off
+            reach = int(proj_height * sprite.size * 1.2) + 12
+            left = max(0, screen_x - reach)
+            right = min(self.width, screen_x + reach + 1)
+            for start, end in self.open_spans(left, right, distance - sprite.depth_bias):
+                screen.set_clip((start, 0, end - start, self.height))
+                sprite.draw_billboard(screen, screen_x, proj_height)
+        screen.set_clip(None)
+        self.sprites.clear()
+
 class Renderer:
     def __init__(self):
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -581,9 +1050,21 @@ class Renderer:
         # Performance optimizations
         self.FOV = math.pi / 2
         self.HALF_FOV = self.FOV / 2
-        self.NUM_RAYS = WIDTH // 2  # Reduced number of rays
-        self.DELTA_ANGLE = self.FOV / self.NUM_RAYS
         self.MAX_DEPTH = 15  # Reduced draw distance
+        self.ray_caster = RayCaster(self.MAX_DEPTH)
+        self.wall_columns = WallColumns(WIDTH, HEIGHT - UI_HEIGHT)
+        self.billboards = Billboards(WIDTH, HEIGHT - UI_HEIGHT, self.FOV)
+        
+        # With NumPy every screen column gets its own ray, otherwise every other one
+        if np is not None:
+            self.batch_caster = BatchRayCaster(self.MAX_DEPTH)
+            self.NUM_RAYS = WIDTH
+        else:
+            self.batch_caster = None
+            self.NUM_RAYS = WIDTH // 2  # Reduced number of rays
+        self.DELTA_ANGLE = self.FOV / self.NUM_RAYS
+        self.RAY_STRIDE = TRIG.steps(self.DELTA_ANGLE)  # Trig table steps between rays
+        self.COLUMN_WIDTH = WIDTH // self.NUM_RAYS
         
         self.font = pygame.font.Font(None, 32)
         self.big_font = pygame.font.Font(None, 72)
@@ -591,6 +1072,7 @@ class Renderer:
         self.speed_font = pygame.font.Font(None, 24)
         self.lap_font = pygame.font.Font(None, 36)
         self.position_font = pygame.font.Font(None, 28)
+        self.static_layers = {}  # Pre-rendered menu screens, keyed by (name, size)
     
     def draw_floor_and_ceiling(self):
         pygame.draw.rect(self.screen, Color.FLOOR_GRAY.value, 
@@ -598,67 +1080,70 @@ class Renderer:
         pygame.draw.rect(self.screen, Color.ROOF.value, (0, 0, WIDTH, (HEIGHT-UI_HEIGHT)//2))
     
     def cast_rays(self, player, game_map):
-        visible_special_walls = set()
-        visible_npcs = []
+        visible_special_walls = game_map.visible_special_walls(player.x, player.y)
         
-        if game_map.mode == GameMode.TIME_TRIAL:
-            for wall_x, wall_y in game_map.finish_walls:
-                if game_map.is_visible(player.x, player.y, wall_x, wall_y):
-                    visible_special_walls.add((wall_x, wall_y))
-        elif game_map.mode == GameMode.RACE:
-            for wall_x, wall_y in game_map.lap_lines:
-                if game_map.is_visible(player.x, player.y, wall_x, wall_y):
-                    visible_special_walls.add((wall_x, wall_y))
+        self.wall_columns.clear()
+        self.billboards.clear()
+        if self.batch_caster:
+            self.cast_rays_batch(player, game_map, visible_special_walls)
+        else:
+            self.cast_rays_stepped(player, game_map, visible_special_walls)
+        self.wall_columns.blit(self.screen)
         
-        for ray in range(self.NUM_RAYS):
-            ray_angle = (player.angle - self.HALF_FOV) + (ray * self.DELTA_ANGLE)
-            
-            depth = 0
-            hit_wall = False
-            hit_special = False
-            wall_x, wall_y = 0, 0
+        # Collectables and NPCs are sorted by depth and hidden behind nearer walls
+        for collectable in game_map.collectables:
+            collectable.add_billboard(self.billboards, player, self)
+        for npc in game_map.npcs:
+            npc.add_billboard(self.billboards, player, self)
+        self.billboards.draw(self.screen)
+    
+    def cast_rays_stepped(self, player, game_map, visible_special_walls):
+        def is_hit(cell_x, cell_y):
+            cell = game_map.get_cell(cell_x, cell_y)
+            if cell is None:
+                return None
+            if cell == 1:
+                return True
+            return cell in [2, 3] and (cell_x, cell_y) in visible_special_walls
 
-            while not hit_wall and depth < self.MAX_DEPTH:
-                depth += 0.1
-                
-                test_x = int(player.x + depth * math.cos(ray_angle))
-                test_y = int(player.y + depth * math.sin(ray_angle))
-
-                if game_map.get_cell(test_x, test_y) is None:
-                    hit_wall = True
-                    depth = self.MAX_DEPTH
-                elif game_map.get_cell(test_x, test_y) == 1:
-                    hit_wall = True
-                    wall_x, wall_y = test_x, test_y
-                elif (game_map.get_cell(test_x, test_y) in [2, 3]) and (test_x, test_y) in visible_special_walls:
-                    hit_wall = True
-                    hit_special = True
-                    wall_x, wall_y = test_x, test_y
-                else:
-                    # Only check for NPCs every few rays for performance
-                    if ray % 3 == 0:  # Check every 3rd ray
-                        for npc in game_map.npcs:
-                            if (int(npc.x) == test_x and int(npc.y) == test_y and
-                                (npc, depth) not in visible_npcs):
-                                visible_npcs.append((npc, depth, ray_angle))
-
-            if hit_wall and (game_map.get_cell(test_x, test_y) in [1, 2, 3]):
+        directions = TRIG.fan(player.angle - self.HALF_FOV, self.NUM_RAYS, self.RAY_STRIDE)
+        for ray, (cos_a, sin_a) in enumerate(directions):
+            hit = self.ray_caster.cast(player.x, player.y, cos_a, sin_a, is_hit)
+
+            if hit:
+                depth, wall_x, wall_y = hit
                 proj_height = (HEIGHT-UI_HEIGHT) / (depth + 0.0001) * 0.95
-                depth_shade = (255 - int(depth * 10),) * 3
-                
+
                 if (wall_x, wall_y) in game_map.walls:
-                    if hit_special:
-                        game_map.walls[(wall_x, wall_y)].draw(self.screen, ray*2, proj_height, depth_shade)
-                    else:
-                        game_map.walls[(wall_x, wall_y)].draw(self.screen, ray*2, proj_height, depth_shade)
-        
-        # Draw collectables after walls but before NPCs
-        for collectable in game_map.collectables:
-            collectable.draw(self.screen, player, self)
-        
-        # Draw NPCs after walls and collectables
-        for npc, depth, angle in visible_npcs:
-            npc.draw(self.screen, player, self)
+                    game_map.walls[(wall_x, wall_y)].draw(self.wall_columns, ray * self.COLUMN_WIDTH,
+                                                          proj_height, depth)
+                    self.billboards.set_depth(ray * self.COLUMN_WIDTH, self.COLUMN_WIDTH, depth)
+    
+    def cast_rays_batch(self, player, game_map, visible_special_walls):
+        cos_a, sin_a = TRIG.fan_arrays(player.angle - self.HALF_FOV,
+                                       self.NUM_RAYS, self.RAY_STRIDE)
+        hit, depths, cells_x, cells_y = self.batch_caster.cast(
+            player.x, player.y, cos_a, sin_a,
+            game_map.solid_cells(visible_special_walls))
+        
+        # One ray per screen column, so the wall depths are the depth buffer
+        self.billboards.depths = np.where(hit, depths, math.inf).tolist()
+        
+        columns = zip(hit.tolist(), depths.tolist(), cells_x.tolist(), cells_y.tolist())
+        for ray, (ray_hit, depth, wall_x, wall_y) in enumerate(columns):
+            if not ray_hit:
+                continue
+            wall = game_map.walls.get((wall_x, wall_y))
+            if wall:
+                proj_height = (HEIGHT-UI_HEIGHT) / (depth + 0.0001) * 0.95
+                wall.draw(self.wall_columns, ray * self.COLUMN_WIDTH, proj_height, depth)
+    
+    @staticmethod
+    def draw_glow_circle(glow_radius, color, alpha):
+        glow_surface = pygame.Surface((glow_radius*2, glow_radius*2), pygame.SRCALPHA)
+        pygame.draw.circle(glow_surface, (*color, alpha), 
+                         (glow_radius, glow_radius), glow_radius)
+        return glow_surface
     
     def draw_speedometer(self, speed, max_speed):
         center_x = WIDTH - 60
@@ -678,14 +1163,12 @@ class Renderer:
             pulse_radius = radius
         
         for i in range(3, 0, -1):
-            glow_radius = pulse_radius + i * 3
-            glow_surface = pygame.Surface((glow_radius*2, glow_radius*2), pygame.SRCALPHA)
             glow_alpha = 30//i
             if speed_ratio >= 0.99:
                 glow_alpha = min(60, glow_alpha * 2)
-            pygame.draw.circle(glow_surface, (*speed_color, glow_alpha), 
-                             (glow_radius, glow_radius), glow_radius)
-            self.screen.blit(glow_surface, (center_x - glow_radius, center_y - glow_radius))
+            glow_surface = SURFACES.get("circle", pulse_radius + i * 3, speed_color, glow_alpha,
+                                        self.draw_glow_circle)
+            self.screen.blit(glow_surface, glow_surface.get_rect(center=(center_x, center_y)))
         
         pygame.draw.circle(self.screen, speed_color, (center_x, center_y), pulse_radius)
         pygame.draw.circle(self.screen, (0, 0, 50), (center_x, center_y), pulse_radius, 2)
@@ -708,90 +1191,88 @@ class Renderer:
         label_rect = label.get_rect(center=(center_x, center_y + label_y_offset))
         self.screen.blit(label, label_rect)
     
-    def draw_race_positions(self, player, npcs):
-        def get_distance(racer):
-            lap_line_x, lap_line_y = 1.5, 18.5
-            return math.sqrt((racer.x - lap_line_x)**2 + (racer.y - lap_line_y)**2)
-        
-        racers = []
-        racers.append({
-            'name': 'YOU',
-            'laps': player.laps,
-            'distance': get_distance(player),
-            'color': Color.GOLD.value,
-            'is_player': True
-        })
-        
-        for i, npc in enumerate(npcs):
-            racers.append({
-                'name': f'RACER {i+1}',
-                'laps': npc.laps,
-                'distance': get_distance(npc),
-                'color': npc.color,
-                'is_player': False
-            })
-        
-        racers.sort(key=lambda x: (-x['laps'], x['distance']))
-        
-        for i, racer in enumerate(racers[:4]):
-            position_text = f"{i+1}. {racer['name']} - Lap {racer['laps']}"
-            text_surf = self.position_font.render(position_text, True, racer['color'])
+    def draw_race_positions(self, standings, player, npcs):
+        for i, racer in enumerate(standings.order[:4]):
+            if racer is player:
+                name, color = 'YOU', Color.GOLD.value
+            else:
+                name, color = f'RACER {npcs.index(racer)+1}', racer.color
+            position_text = f"{i+1}. {name} - Lap {racer.laps}"
+            text_surf = self.position_font.render(position_text, True, color)
             self.screen.blit(text_surf, (20, 20 + i * 30))
     
-    def draw_main_menu(self):
-        for y in range(HEIGHT):
-            shade = int(49 + (y / HEIGHT) * 100)
-            pygame.draw.line(self.screen, (49, min(184, shade), 37), (0, y), (WIDTH, y))
+    def static_layer(self, name, draw):
+        """A screen that never changes, painted by draw(layer) the first time it is needed"""
+        size = self.screen.get_size()
+        layer = self.static_layers.get((name, size))
+        if layer is None:
+            layer = pygame.Surface(size).convert()
+            draw(layer)
+            self.static_layers[(name, size)] = layer
+        return layer
+    
+    def build_menu_background(self, layer):
+        width, height = layer.get_size()
+        for y in range(height):
+            shade = int(49 + (y / height) * 100)
+            pygame.draw.line(layer, (49, min(184, shade), 37), (0, y), (width, y))
+    
+    def build_main_menu(self, layer):
+        self.build_menu_background(layer)
         
         title_text = self.big_font.render("F-ZERO STYLE RACER", True, (200, 200, 255))
-        self.screen.blit(title_text, (WIDTH//2 - title_text.get_width()//2, HEIGHT//3))
+        layer.blit(title_text, (WIDTH//2 - title_text.get_width()//2, HEIGHT//3))
         
         car_x = WIDTH // 2
         car_y = HEIGHT // 2
         car_width = 120
         car_height = 70
         
-        pygame.draw.ellipse(self.screen, (200, 50, 50), 
+        pygame.draw.ellipse(layer, (200, 50, 50), 
                           (car_x - car_width//2, car_y - car_height//2, car_width, car_height))
         
-        pygame.draw.ellipse(self.screen, (50, 150, 255, 150), 
+        pygame.draw.ellipse(layer, (50, 150, 255, 150), 
                           (car_x - car_width//3, car_y - car_height//3, car_width//1.5, car_height//2))
         
-        pygame.draw.circle(self.screen, (0, 200, 255), 
+        pygame.draw.circle(layer, (0, 200, 255), 
                          (car_x + car_width//3, car_y), 15)
         
         button_rect = pygame.Rect(WIDTH//2 - 150, HEIGHT*2//3, 300, 50)
-        pygame.draw.rect(self.screen, Color.PURPLE.value, button_rect, border_radius=10)
-        pygame.draw.rect(self.screen, (200, 200, 255), button_rect, 3, border_radius=10)
+        pygame.draw.rect(layer, Color.PURPLE.value, button_rect, border_radius=10)
+        pygame.draw.rect(layer, (200, 200, 255), button_rect, 3, border_radius=10)
         
         start_text = self.font.render("START", True, Color.WHITE.value)
-        self.screen.blit(start_text, (WIDTH//2 - start_text.get_width()//2, HEIGHT*2//3 + 15))
+        layer.blit(start_text, (WIDTH//2 - start_text.get_width()//2, HEIGHT*2//3 + 15))
     
-    def draw_mode_select(self):
-        for y in range(HEIGHT):
-            shade = int(49 + (y / HEIGHT) * 100)
-            pygame.draw.line(self.screen, (49, min(184, shade), 37), (0, y), (WIDTH, y))
+    def build_mode_select(self, layer):
+        self.build_menu_background(layer)
         
         title_text = self.big_font.render("SELECT MODE", True, (200, 200, 255))
-        self.screen.blit(title_text, (WIDTH//2 - title_text.get_width()//2, HEIGHT//4))
+        layer.blit(title_text, (WIDTH//2 - title_text.get_width()//2, HEIGHT//4))
         
         time_trial_rect = pygame.Rect(WIDTH//2 - 150, HEIGHT//2 - 70, 300, 80)
-        pygame.draw.rect(self.screen, Color.PURPLE.value, time_trial_rect, border_radius=10)
-        pygame.draw.rect(self.screen, (200, 200, 255), time_trial_rect, 3, border_radius=10)
+        pygame.draw.rect(layer, Color.PURPLE.value, time_trial_rect, border_radius=10)
+        pygame.draw.rect(layer, (200, 200, 255), time_trial_rect, 3, border_radius=10)
         
         time_trial_text = self.font.render("TIME TRIAL", True, Color.WHITE.value)
         time_trial_desc = self.speed_font.render("Race against the clock!", True, Color.WHITE.value)
-        self.screen.blit(time_trial_text, (WIDTH//2 - time_trial_text.get_width()//2, HEIGHT//2 - 50))
-        self.screen.blit(time_trial_desc, (WIDTH//2 - time_trial_desc.get_width()//2, HEIGHT//2 - 20))
+        layer.blit(time_trial_text, (WIDTH//2 - time_trial_text.get_width()//2, HEIGHT//2 - 50))
+        layer.blit(time_trial_desc, (WIDTH//2 - time_trial_desc.get_width()//2, HEIGHT//2 - 20))
         
         race_rect = pygame.Rect(WIDTH//2 - 150, HEIGHT//2 + 30, 300, 80)
-        pygame.draw.rect(self.screen, Color.PURPLE.value, race_rect, border_radius=10)
-        pygame.draw.rect(self.screen, (200, 200, 255), race_rect, 3, border_radius=10)
+        pygame.draw.rect(layer, Color.PURPLE.value, race_rect, border_radius=10)
+        pygame.draw.rect(layer, (200, 200, 255), race_rect, 3, border_radius=10)
         
         race_text = self.font.render("RACE", True, Color.WHITE.value)
         race_desc = self.speed_font.render("3 laps against opponents!", True, Color.WHITE.value)
-        self.screen.blit(race_text, (WIDTH//2 - race_text.get_width()//2, HEIGHT//2 + 50))
-        self.screen.blit(race_desc, (WIDTH//2 - race_desc.get_width()//2, HEIGHT//2 + 80))
+        layer.blit(race_text, (WIDTH//2 - race_text.get_width()//2, HEIGHT//2 + 50))
+        layer.blit(race_desc, (WIDTH//2 - race_desc.get_width()//2, HEIGHT//2 + 80))
+    
+    def draw_main_menu(self):
+        self.screen.blit(self.static_layer("main_menu", self.build_main_menu), (0, 0))
+    
+    def draw_mode_select(self):
+        self.screen.blit(self.static_layer("mode_select", self.build_mode_select), (0, 0))
     
     def draw_countdown(self, count):
         overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
@@ -931,6 +1412,7 @@ class Game:
         self.renderer = Renderer()
         self.car = Car()
         self.game_map = None
+        self.standings = None
     
     def initialize_time_trial_map(self):
         return GameMap([
@@ -956,7 +1438,7 @@ class Game:
             [1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1]
         ], GameMode.TIME_TRIAL)
     
-    def initialize_race_map(self):
+    def initialize_race_map(self, seed=None):
         return GameMap([
             [1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1],
             [1,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,1],
@@ -978,7 +1460,7 @@ class Game:
             [1,0,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,0,1],
             [1,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,1],
             [1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1]
-        ], GameMode.RACE)
+        ], GameMode.RACE, seed)
 
     def handle_events(self):
         for event in pygame.event.get():
@@ -1011,6 +1493,7 @@ class Game:
                         self.player = Player(1.5, 1.5)
                         self.player.laps = 1
                         self.player.lap_times = []
+                        self.standings = Standings(self.game_map.track, [self.player] + self.game_map.npcs)
                 elif self.state == GameState.WON:
                     if self.restart_button_rect.collidepoint(event.pos):
                         self.initialize_game()
@@ -1024,12 +1507,12 @@ class Game:
                 self.countdown_value -= 1
                 if self.countdown_value <= 0:
                     self.state = GameState.PLAYING
-                    self.race_start_time = pygame.time.get_ticks() / 1000
+                    self.race_start_time = CLOCK.now
                     if self.game_mode == GameMode.RACE:
                         self.player.current_lap_start = self.race_start_time
         
         if self.state == GameState.PLAYING:
-            current_time = pygame.time.get_ticks() / 1000
+            current_time = CLOCK.now
             self.race_time = current_time - self.race_start_time
             
             # Update collectables
@@ -1052,14 +1535,14 @@ class Game:
             if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
                 self.player.rotate_right()
             
+            self.player.remember_pose()
             self.player.update_movement(self.game_map)
             self.car.update(self.player.speed, self.player.max_speed)
             
             if self.game_mode == GameMode.RACE:
-                # Only update NPCs every other frame for better performance
-                if pygame.time.get_ticks() % 2 == 0:
-                    for npc in self.game_map.npcs:
-                        npc.update(self.game_map)
+                for npc in self.game_map.npcs:
+                    npc.remember_pose()
+                self.game_map.npc_scheduler.update(self.game_map)
             
             if self.player.check_lap_completion(self.game_map, current_time):
                 if self.game_mode == GameMode.TIME_TRIAL:
@@ -1069,6 +1552,9 @@ class Game:
                     if self.player.laps >= self.total_laps + 1:
                         self.state = GameState.WON
             
+            if self.game_mode == GameMode.RACE:
+                self.standings.update()
+            
             if self.lap_notification_timer > 0:
                 self.lap_notification_timer -= 1
     
@@ -1086,15 +1572,20 @@ class Game:
             self.car.draw(self.screen)
             self.renderer.draw_countdown(self.countdown_value)
         elif self.state == GameState.PLAYING:
+            # Draw everything that moves between its last two simulated poses
+            movers = [self.player] + (self.game_map.npcs if self.game_mode == GameMode.RACE else [])
+            poses = [mover.blend_pose(CLOCK.alpha) for mover in movers]
             self.screen.fill(Color.BLACK.value)
             self.renderer.draw_floor_and_ceiling()
             self.renderer.cast_rays(self.player, self.game_map)
+            for mover, pose in zip(movers, poses):
+                mover.restore_pose(pose)
             self.car.draw(self.screen)
             
             if self.game_mode == GameMode.RACE:
                 self.renderer.draw_timer(self.race_time, self.game_mode, 
                                        self.player.laps, self.total_laps)
-                self.renderer.draw_race_positions(self.player, self.game_map.npcs)
+                self.renderer.draw_race_positions(self.standings, self.player, self.game_map.npcs)
                 if self.lap_notification_timer > 0 and self.player.laps > 1:
                     self.renderer.draw_lap_notification(self.player.laps - 1)
             else:
@@ -1123,16 +1614,165 @@ class Game:
         pygame.display.flip()
     
     def run(self):
+        # One update() per CLOCK.step of real time; the dummy driver takes one step per frame
+        headless = pygame.display.get_driver() == "dummy"
+        last_frame = time.perf_counter()
         while self.running:
+            frame_start = time.perf_counter()
+            steps = 1 if headless else CLOCK.advance(frame_start - last_frame)
+            last_frame = frame_start
+            
             self.handle_events()
-            self.update()
+            for _ in range(steps):
+                self.update()
+                CLOCK.tick()
             self.render()
-            self.clock.tick(60)
+            if not headless:
+                self.clock.tick(60)
+    
+    def simulate(self, seconds, seed=0):
+        """Plays `seconds` of the race for `seed` without drawing and returns the real seconds it took"""
+        self.game_mode = GameMode.RACE
+        self.game_map = self.initialize_race_map(seed)
+        self.standings = Standings(self.game_map.track, [self.player] + self.game_map.npcs)
+        self.state = GameState.PLAYING
+        self.race_start_time = CLOCK.now
+        start = time.perf_counter()
+        for _ in range(int(seconds * CLOCK.rate)):
+            pygame.event.pump()
+            self.update()
+            CLOCK.tick()
+        return time.perf_counter() - start
+
+def run_benchmarks(frames=200):
+    """Times cast_rays with trig table lookups against plain math calls"""
+    game = Game()
+    game.game_map = game.initialize_race_map()
+    renderer = game.renderer
+    headings = [i * 0.05 for i in range(frames)]
+    
+    for accurate in (True, False):
+        TRIG.accurate = accurate
+        directions = TRIG.fan_arrays if renderer.batch_caster else TRIG.fan
+        
+        start = time.perf_counter()
+        for heading in headings:
+            directions(heading - renderer.HALF_FOV, renderer.NUM_RAYS, renderer.RAY_STRIDE)
+        direction_time = (time.perf_counter() - start) * 1000 / frames
+        
+        start = time.perf_counter()
+        for heading in headings:
+            game.player.angle = heading
+            renderer.cast_rays(game.player, game.game_map)
+        frame_time = (time.perf_counter() - start) * 1000 / frames
+        
+        label = "math calls" if accurate else "table lookups"
+        print(f"{label:>13}: ray directions {direction_time:.3f} ms, "
+              f"cast_rays {frame_time:.3f} ms per frame")
+    TRIG.accurate = False
+    
+    # Whole race frames, to see how often the surface cache hits
+    game.game_mode = GameMode.RACE
+    game.state = GameState.PLAYING
+    game.standings = Standings(game.game_map.track, [game.player] + game.game_map.npcs)
+    start = time.perf_counter()
+    for heading in headings:
+        game.player.angle = heading
+        game.player.speed = game.player.max_speed * (heading % 1.0)
+        game.render()
+    frame_time = (time.perf_counter() - start) * 1000 / frames
+    print(f"{'render':>13}: {frame_time:.3f} ms per frame, surface cache "
+          f"{SURFACES.hits} hits, {SURFACES.misses} misses")
+
+def run_visibility_benchmark(frames=200):
+    """Times finding the visible lap-line walls by walking every wall against the per-cell cache"""
+    size = 60
+    map_data = [[1] * size]
+    for y in range(1, size - 1):
+        if y % 4 == 0:
+            row = [1] + [3] * (size - 2) + [1]  # A full row of lap lines
+        elif y % 4 == 2:
+            row = [1] + [0, 0, 1, 1] * ((size - 2) // 4) + [0] * ((size - 2) % 4) + [1]
+        else:
+            row = [1] + [0] * (size - 2) + [1]
+        map_data.append(row)
+    map_data.append([1] * size)
+    game_map = GameMap(map_data, GameMode.RACE)
+    
+    # Drive slowly in a loop around the track
+    path = [(size / 2 + (size / 3) * math.cos(i * 0.01), size / 2 + (size / 3) * math.sin(i * 0.01))
+            for i in range(frames)]
+    
+    start = time.perf_counter()
+    for x, y in path:
+        visible = {(wall_x, wall_y) for wall_x, wall_y in game_map.lap_lines
+                   if game_map.is_visible(x, y, wall_x, wall_y)}
+    walk_time = (time.perf_counter() - start) * 1000 / frames
+    
+    # The first lap fills the cache, later laps only look it up
+    cached_times = []
+    for lap in range(2):
+        start = time.perf_counter()
+        for x, y in path:
+            visible = game_map.visible_special_walls(x, y)
+        cached_times.append((time.perf_counter() - start) * 1000 / frames)
+    
+    print(f"{len(game_map.lap_lines)} lap-line walls, {len(game_map.visible_walls_by_cell)} cells visited: "
+          f"line walks {walk_time:.3f} ms, cell cache {cached_times[0]:.3f} ms on the first lap "
+          f"and {cached_times[1]:.4f} ms after that, per frame")
+
+def run_npc_benchmark(racers=48, seconds=20, repeats=5):
+    """Times NPC steps moving the whole field every other step against the staggered scheduler"""
+    # Each step keeps its fastest time over the repeats, so a stall from the
+    # rest of the machine does not pass for a slow step
+    game = Game()
+    steps = int(seconds * CLOCK.rate)
+    for staggered in (False, True):
+        step_times = [float("inf")] * steps
+        for _ in range(repeats):
+            game_map = game.initialize_race_map(seed=0)
+            template = game_map.npcs
+            for i in range(len(template), racers):
+                source = template[i % len(template)]
+                x, y, segment = game_map.track.point_at(i * game_map.track.length / racers)
+                npc = NPCRacer(x - 0.5, y - 0.5, source.color)
+                npc.waypoints = game_map.waypoints
+                npc.current_waypoint = (segment + 1) % len(game_map.waypoints)
+                npc.max_speed = source.max_speed
+                npc.acceleration = source.acceleration
+                npc.deceleration = source.deceleration
+                game_map.npcs.append(npc)
+            
+            for step in range(steps):
+                start = time.perf_counter()
+                if staggered:
+                    game_map.npc_scheduler.update(game_map)
+                elif step % 2 == 0:
+                    for npc in game_map.npcs:
+                        npc.update(game_map, 2 * CLOCK.step)
+                step_times[step] = min(step_times[step], (time.perf_counter() - start) * 1000)
+        
+        step_times.sort()
+        label = "staggered" if staggered else "every other"
+        print(f"{label:>11}: {len(game_map.npcs)} racers, {sum(step_times) / len(step_times):.3f} ms "
+              f"per step on average, {step_times[len(step_times) * 95 // 100]:.3f} ms at the "
+              f"95th percentile, {step_times[-1]:.3f} ms at worst")
 
 if __name__ == "__main__":
     try:
-        game = Game()
-        game.run()
+        if "--benchmark" in sys.argv:
+            run_benchmarks()
+            run_visibility_benchmark()
+            run_npc_benchmark()
+        elif "--headless" in sys.argv:
+            game = Game()
+            elapsed = game.simulate(60)
+            print(f"Simulated 60 s of racing in {elapsed:.2f} s")
+            for i, npc in enumerate(game.game_map.npcs):
+                print(f"RACER {i+1}: lap {npc.laps} at ({npc.x:.3f}, {npc.y:.3f})")
+        else:
+            game = Game()
+            game.run()
     finally:
         pygame.quit()
         sys.exit()
\ No newline at end of file
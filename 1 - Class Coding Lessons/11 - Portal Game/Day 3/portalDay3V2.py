@@ -3,9 +3,15 @@ import math
 import sys
 import random
 from enum import Enum
+from collections import OrderedDict
 import colorsys
 import time
 
+try:
+    import numpy as np  # Optional: enables the vectorized ray caster and wall buffer
+except ImportError:
+    np = None
+
 # Initialize Pygame
 pygame.init()
 
@@ -36,7 +42,127 @@ class Color(Enum):
     BUTTON_RED = (200, 0, 0)
     TIMED_WALL = (150, 150, 255)
 
+class TrigTable:
+    """Sine and cosine read from a table of `resolution` angles, or from math if accurate"""
+    def __init__(self, resolution=9600, accurate=False):
+        self.resolution = resolution
+        self.accurate = accurate
+        self.step = 2 * math.pi / resolution
+        angles = [i * self.step for i in range(resolution)]
+        self.sin_table = [math.sin(angle) for angle in angles]
+        self.cos_table = [math.cos(angle) for angle in angles]
+        if np is not None:
+            self.sin_array = np.array(self.sin_table)
+            self.cos_array = np.array(self.cos_table)
+
+    def steps(self, angle):
+        """Number of table steps closest to angle"""
+        return round(angle / self.step)
+
+    def index(self, angle):
+        return round(angle / self.step) % self.resolution
+
+    def sin(self, angle):
+        if self.accurate:
+            return math.sin(angle)
+        return self.sin_table[round(angle / self.step) % self.resolution]
+
+    def cos(self, angle):
+        if self.accurate:
+            return math.cos(angle)
+        return self.cos_table[round(angle / self.step) % self.resolution]
+
+    def fan(self, start_angle, count, stride):
+        """(cos, sin) for count angles from start_angle, stride table steps apart"""
+        if self.accurate:
+            angles = [start_angle + i * stride * self.step for i in range(count)]
+            return [(math.cos(angle), math.sin(angle)) for angle in angles]
+        first = self.index(start_angle)
+        indices = [(first + i * stride) % self.resolution for i in range(count)]
+        return [(self.cos_table[i], self.sin_table[i]) for i in indices]
+
+    def fan_arrays(self, start_angle, count, stride):
+        """NumPy version of fan that returns separate cos and sin arrays"""
+        if self.accurate:
+            angles = start_angle + np.arange(count) * (stride * self.step)
+            return np.cos(angles), np.sin(angles)
+        indices = (self.index(start_angle) + np.arange(count) * stride) % self.resolution
+        return self.cos_array[indices], self.sin_array[indices]
+
+# Shared by the renderer and everything that moves along a heading
+TRIG = TrigTable()
+
+class SurfaceCache:
+    """Least-recently-used store for small alpha surfaces such as glows, portals and buttons"""
+    def __init__(self, capacity=512, max_size=256):
+        self.capacity = capacity
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def bucket(size):
+        """Rounds size down to a step of about 1/64 of its value"""
+        size = max(1, int(size))
+        return size - size % max(1, size // 64)
+
+    def get(self, shape, size, color, alpha, draw):
+        # draw(size, color, alpha) builds the surface on a miss. size is
+        # rounded into its bucket, so place the result by its own size
+        size = self.bucket(size)
+        if size > self.max_size:  # Too big to be worth keeping
+            self.misses += 1
+            return draw(size, color, alpha)
+        key = (shape, size, color, alpha)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            self.misses += 1
+            surface = draw(size, color, alpha)
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.capacity:
+                self.surfaces.popitem(last=False)
+        else:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+        return surface
+
+# Shared by everything that draws glows and other alpha shapes
+SURFACES = SurfaceCache()
+
+class SimulationClock:
+    """Fixed-timestep clock behind Game.run; gameplay timers read the simulated time, now"""
+    
+    def __init__(self, rate=60, max_steps=8):
+        self.rate = rate
+        self.step = 1 / rate
+        self.max_steps = max_steps  # Most steps run in one frame before time is dropped
+        self.ticks = 0
+        self.now = 0.0
+        self.accumulator = 0.0
+        self.alpha = 0.0
+    
+    def advance(self, elapsed):
+        """Adds elapsed real seconds and returns how many steps to simulate."""
+        self.accumulator += elapsed
+        steps = int(self.accumulator / self.step)
+        self.accumulator -= steps * self.step
+        # After a long stall, drop the backlog instead of trying to catch up,
+        # which would only make the next frame slower still
+        steps = min(steps, self.max_steps)
+        self.alpha = self.accumulator / self.step
+        return steps
+    
+    def tick(self):
+        self.ticks += 1
+        self.now = self.ticks * self.step
+
+# Shared by the game loop and every gameplay timer
+CLOCK = SimulationClock()
+
 class GameObject:
+    depth_bias = 0  # How far behind the wall depth a billboard may still show
+    
     def __init__(self, x, y, z=0):
         self.x = x
         self.y = y
@@ -86,41 +212,31 @@ class Collectable(GameObject):
             return True
         return False
     
-    def draw(self, screen, player, renderer):
-        if self.collected or player.z != self.z:
-            return
-            
-        dx = self.x - player.x
-        dy = self.y - player.y
-        dist_sq = dx**2 + dy**2
-        
-        if dist_sq > (renderer.MAX_DEPTH * 0.7) ** 2:
-            return
-            
-        angle = math.atan2(dy, dx) - player.angle
-        while angle > math.pi: angle -= 2 * math.pi
-        while angle < -math.pi: angle += 2 * math.pi
-        
-        if -renderer.HALF_FOV <= angle <= renderer.HALF_FOV:
-            dist = math.sqrt(dist_sq)
-            proj_height = (HEIGHT - UI_HEIGHT) / (dist + 0.0001)
-            screen_x = int((angle + renderer.HALF_FOV) / renderer.FOV * WIDTH)
-            
-            size = int(proj_height * self.size)
-            hue = (pygame.time.get_ticks() * 0.002) % 1.0
-            r, g, b = colorsys.hsv_to_rgb(hue, 1.0, self.glow_intensity)
-            rainbow_color = (int(r*255), int(g*255), int(b*255))
-            
-            # Main collectable
-            pygame.draw.rect(screen, rainbow_color, 
-                           (screen_x - size//2, (HEIGHT - UI_HEIGHT)//2 - size//2, size, size))
-            
-            # Glow effect
-            for i in range(3, 0, -1):
-                glow_size = size + i * 3
-                glow_surface = pygame.Surface((glow_size, glow_size), pygame.SRCALPHA)
-                pygame.draw.rect(glow_surface, (*rainbow_color, 30//i), (0, 0, glow_size, glow_size))
-                screen.blit(glow_surface, (screen_x - glow_size//2, (HEIGHT - UI_HEIGHT)//2 - glow_size//2))
+    def add_billboard(self, billboards, player, renderer):
+        if not self.collected and player.z == self.z:
+            billboards.add(self, player, renderer.MAX_DEPTH * 0.7)
+    
+    @staticmethod
+    def draw_glow(size, color, alpha):
+        glow_surface = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.rect(glow_surface, (*color, alpha), (0, 0, size, size))
+        return glow_surface
+    
+    def draw_billboard(self, screen, screen_x, proj_height):
+        size = int(proj_height * self.size)
+        # Whole steps of hue keep the cached glows to a few dozen colors
+        hue = int(pygame.time.get_ticks() * 0.002 * 32) % 32 / 32
+        r, g, b = colorsys.hsv_to_rgb(hue, 1.0, self.glow_intensity)
+        rainbow_color = (int(r*255), int(g*255), int(b*255))
+        
+        # Main collectable
+        pygame.draw.rect(screen, rainbow_color, 
+                       (screen_x - size//2, (HEIGHT - UI_HEIGHT)//2 - size//2, size, size))
+        
+        # Glow effect
+        for i in range(3, 0, -1):
+            glow_surface = SURFACES.get("square", size + i * 3, rainbow_color, 30//i, self.draw_glow)
+            screen.blit(glow_surface, glow_surface.get_rect(center=(screen_x, (HEIGHT - UI_HEIGHT)//2)))
 
 class FloorTransportCollectable(Collectable):
     def __init__(self, x, y, z=0):
@@ -142,48 +258,37 @@ class FloorTransportCollectable(Collectable):
             return True
         return False
     
-    def draw(self, screen, player, renderer):
-        if self.collected or player.z != self.z:
-            return
-            
-        dx = self.x - player.x
-        dy = self.y - player.y
-        dist_sq = dx**2 + dy**2
-        
-        if dist_sq > (renderer.MAX_DEPTH * 0.3) ** 2:
-            return
-            
-        angle = math.atan2(dy, dx) - player.angle
-        while angle > math.pi: angle -= 2 * math.pi
-        while angle < -math.pi: angle += 2 * math.pi
-        
-        if -renderer.HALF_FOV <= angle <= renderer.HALF_FOV:
-            dist = math.sqrt(dist_sq)
-            proj_height = (HEIGHT - UI_HEIGHT) / (dist + 0.0001)
-            screen_x = int((angle + renderer.HALF_FOV) / renderer.FOV * WIDTH)
-            
-            size = int(proj_height * self.size)
-            # Draw gold diamond shape
-            points = [
-                (screen_x, (HEIGHT - UI_HEIGHT)//2 - size),
-                (screen_x + size, (HEIGHT - UI_HEIGHT)//2),
-                (screen_x, (HEIGHT - UI_HEIGHT)//2 + size),
-                (screen_x - size, (HEIGHT - UI_HEIGHT)//2)
-            ]
-            pygame.draw.polygon(screen, self.color, points)
-            
-            # Glow effect
-            for i in range(3, 0, -1):
-                glow_size = size + i * 3
-                glow_surface = pygame.Surface((glow_size*2, glow_size*2), pygame.SRCALPHA)
-                glow_points = [
-                    (glow_size, glow_size - glow_size//2),
-                    (glow_size + glow_size//2, glow_size),
-                    (glow_size, glow_size + glow_size//2),
-                    (glow_size - glow_size//2, glow_size)
-                ]
-                pygame.draw.polygon(glow_surface, (*self.color, 30//i), glow_points)
-                screen.blit(glow_surface, (screen_x - glow_size, (HEIGHT - UI_HEIGHT)//2 - glow_size))
+    def add_billboard(self, billboards, player, renderer):
+        if not self.collected and player.z == self.z:
+            billboards.add(self, player, renderer.MAX_DEPTH * 0.3)
+    
+    @staticmethod
+    def draw_glow(size, color, alpha):
+        glow_surface = pygame.Surface((size*2, size*2), pygame.SRCALPHA)
+        glow_points = [
+            (size, size - size//2),
+            (size + size//2, size),
+            (size, size + size//2),
+            (size - size//2, size)
+        ]
+        pygame.draw.polygon(glow_surface, (*color, alpha), glow_points)
+        return glow_surface
+    
+    def draw_billboard(self, screen, screen_x, proj_height):
+        size = int(proj_height * self.size)
+        # Draw gold diamond shape
+        points = [
+            (screen_x, (HEIGHT - UI_HEIGHT)//2 - size),
+            (screen_x + size, (HEIGHT - UI_HEIGHT)//2),
+            (screen_x, (HEIGHT - UI_HEIGHT)//2 + size),
+            (screen_x - size, (HEIGHT - UI_HEIGHT)//2)
+        ]
+        pygame.draw.polygon(screen, self.color, points)
+        
+        # Glow effect
+        for i in range(3, 0, -1):
+            glow_surface = SURFACES.get("diamond", size + i * 3, self.color, 30//i, self.draw_glow)
+            screen.blit(glow_surface, glow_surface.get_rect(center=(screen_x, (HEIGHT - UI_HEIGHT)//2)))
                 
                 
 class WinCollectable(Collectable):
@@ -205,74 +310,64 @@ class WinCollectable(Collectable):
             return True
         return False
 
-    def draw(self, screen, player, renderer):
+    def add_billboard(self, billboards, player, renderer):
         if self.collected or player.z != self.z:
             return
-            
-        dx = self.x - player.x
-        dy = self.y - player.y
-        dist_sq = dx**2 + dy**2
         
-        if dist_sq > (renderer.MAX_DEPTH * 0.3) ** 2:
-            return
-            
-        angle = math.atan2(dy, dx) - player.angle
-        while angle > math.pi: angle -= 2 * math.pi
-        while angle < -math.pi: angle += 2 * math.pi
-        
-        if -renderer.HALF_FOV <= angle <= renderer.HALF_FOV:
-            dist = math.sqrt(dist_sq)
-            proj_height = (HEIGHT - UI_HEIGHT) / (dist + 0.0001)
-            screen_x = int((angle + renderer.HALF_FOV) / renderer.FOV * WIDTH)
-            
-            size = int(proj_height * self.size)
-            
+        if billboards.add(self, player, renderer.MAX_DEPTH * 0.3):
             # Animate glow
             self.glow_intensity += 0.03 * self.glow_direction
             if self.glow_intensity >= 1.0:
                 self.glow_direction = -1
             elif self.glow_intensity <= 0.3:
                 self.glow_direction = 1
-                
-            # Draw glowing star
-            points = []
-            for i in range(5):
-                outer_angle = (i * 2 * math.pi / 5) - math.pi/2
-                inner_angle = outer_angle + math.pi/5
-                
-                points.append((
-                    screen_x + math.cos(outer_angle) * size,
-                    (HEIGHT - UI_HEIGHT)//2 + math.sin(outer_angle) * size
-                ))
-                points.append((
-                    screen_x + math.cos(inner_angle) * (size * 0.4),
-                    (HEIGHT - UI_HEIGHT)//2 + math.sin(inner_angle) * (size * 0.4)
-                ))
+    
+    @staticmethod
+    def draw_glow(size, color, alpha):
+        glow_surface = pygame.Surface((size*2, size*2), pygame.SRCALPHA)
+        
+        glow_points = []
+        for j in range(5):
+            outer_angle = (j * 2 * math.pi / 5) - math.pi/2
+            inner_angle = outer_angle + math.pi/5
             
-            # Main star
-            pygame.draw.polygon(screen, self.color, points)
+            glow_points.append((
+                size + math.cos(outer_angle) * size,
+                size + math.sin(outer_angle) * size
+            ))
+            glow_points.append((
+                size + math.cos(inner_angle) * (size * 0.4),
+                size + math.sin(inner_angle) * (size * 0.4)
+            ))
+        
+        pygame.draw.polygon(glow_surface, (*color, alpha), glow_points)
+        return glow_surface
+    
+    def draw_billboard(self, screen, screen_x, proj_height):
+        size = int(proj_height * self.size)
+        
+        # Draw glowing star
+        points = []
+        for i in range(5):
+            outer_angle = (i * 2 * math.pi / 5) - math.pi/2
+            inner_angle = outer_angle + math.pi/5
             
-            # Glow effect
-            for i in range(3, 0, -1):
-                glow_size = size + i * 4
-                glow_surface = pygame.Surface((glow_size*2, glow_size*2), pygame.SRCALPHA)
-                
-                glow_points = []
-                for j in range(5):
-                    outer_angle = (j * 2 * math.pi / 5) - math.pi/2
-                    inner_angle = outer_angle + math.pi/5
-                    
-                    glow_points.append((
-                        glow_size + math.cos(outer_angle) * glow_size,
-                        glow_size + math.sin(outer_angle) * glow_size
-                    ))
-                    glow_points.append((
-                        glow_size + math.cos(inner_angle) * (glow_size * 0.4),
-                        glow_size + math.sin(inner_angle) * (glow_size * 0.4)
-                    ))
-                
-                pygame.draw.polygon(glow_surface, (*self.color, 30//i), glow_points)
-                screen.blit(glow_surface, (screen_x - glow_size, (HEIGHT - UI_HEIGHT)//2 - glow_size))
+            points.append((
+                screen_x + math.cos(outer_angle) * size,
+                (HEIGHT - UI_HEIGHT)//2 + math.sin(outer_angle) * size
+            ))
+            points.append((
+                screen_x + math.cos(inner_angle) * (size * 0.4),
+                (HEIGHT - UI_HEIGHT)//2 + math.sin(inner_angle) * (size * 0.4)
+            ))
+        
+        # Main star
+        pygame.draw.polygon(screen, self.color, points)
+        
+        # Glow effect
+        for i in range(3, 0, -1):
+            glow_surface = SURFACES.get("star", size + i * 4, self.color, 30//i, self.draw_glow)
+            screen.blit(glow_surface, glow_surface.get_rect(center=(screen_x, (HEIGHT - UI_HEIGHT)//2)))
 
 class PortalProjectile(GameObject):
     def __init__(self, x, y, z, angle, color):
@@ -280,14 +375,14 @@ class PortalProjectile(GameObject):
         self.angle = angle
         self.color = color
         self.speed = 0.3
-        self.lifetime = 60  # frames
+        self.lifetime = 1.0  # seconds
         self.size = 0.2
         self.active = True
     
     def update(self, game_map):
-        self.x += math.cos(self.angle) * self.speed
-        self.y += math.sin(self.angle) * self.speed
-        self.lifetime -= 1
+        self.x += TRIG.cos(self.angle) * self.speed
+        self.y += TRIG.sin(self.angle) * self.speed
+        self.lifetime -= CLOCK.step
         
         # Check if hit wall (including timed walls)
         cell_val = game_map.get_cell(int(self.x), int(self.y), self.z)
@@ -306,31 +401,18 @@ class PortalProjectile(GameObject):
         
         return None
     
-    def draw(self, screen, player, renderer):
-        if player.z != self.z:
-            return
-            
-        dx = self.x - player.x
-        dy = self.y - player.y
-        dist_sq = dx**2 + dy**2
-        
-        if dist_sq > (renderer.MAX_DEPTH * 0.7) ** 2:
-            return
-            
-        angle = math.atan2(dy, dx) - player.angle
-        while angle > math.pi: angle -= 2 * math.pi
-        while angle < -math.pi: angle += 2 * math.pi
-        
-        if -renderer.HALF_FOV <= angle <= renderer.HALF_FOV:
-            dist = math.sqrt(dist_sq)
-            proj_height = (HEIGHT - UI_HEIGHT) / (dist + 0.0001)
-            screen_x = int((angle + renderer.HALF_FOV) / renderer.FOV * WIDTH)
-            
-            size = int(proj_height * self.size)
-            pygame.draw.circle(screen, self.color.value, 
-                              (screen_x, (HEIGHT - UI_HEIGHT)//2), size)
+    def add_billboard(self, billboards, player, renderer):
+        if player.z == self.z:
+            billboards.add(self, player, renderer.MAX_DEPTH * 0.7)
+    
+    def draw_billboard(self, screen, screen_x, proj_height):
+        size = int(proj_height * self.size)
+        pygame.draw.circle(screen, self.color.value, 
+                          (screen_x, (HEIGHT - UI_HEIGHT)//2), size)
 
 class Portal(GameObject):
+    depth_bias = 0.5  # Portals sit just inside the wall they were shot onto
+    
     def __init__(self, x, y, z, color, normal_angle):
         super().__init__(x, y, z)
         self.color = color
@@ -353,41 +435,28 @@ class Portal(GameObject):
         self.linked_portal = other_portal
         other_portal.linked_portal = self
     
-    def draw(self, screen, player, renderer):
-        if not self.active or player.z != self.z:
-            return
-            
-        dx = self.x - player.x
-        dy = self.y - player.y
-        dist_sq = dx**2 + dy**2
+    def add_billboard(self, billboards, player, renderer):
+        if self.active and player.z == self.z:
+            billboards.add(self, player, renderer.MAX_DEPTH * 0.7)
+    
+    @staticmethod
+    def draw_rings(pulse_size, portal_color, alpha):
+        portal_surface = pygame.Surface((pulse_size*2, pulse_size*2), pygame.SRCALPHA)
+        pygame.draw.circle(portal_surface, (*portal_color, alpha), 
+                         (pulse_size, pulse_size), pulse_size)
+        pygame.draw.circle(portal_surface, (*portal_color, 100), 
+                         (pulse_size, pulse_size), int(pulse_size * 0.7))
+        pygame.draw.circle(portal_surface, (*portal_color, 150), 
+                         (pulse_size, pulse_size), int(pulse_size * 0.3))
+        return portal_surface
+    
+    def draw_billboard(self, screen, screen_x, proj_height):
+        size = int(proj_height * self.size)
+        pulse_size = int(size * (1 + self.pulse * 0.1))
         
-        if dist_sq > (renderer.MAX_DEPTH * 0.7) ** 2:
-            return
-            
-        angle = math.atan2(dy, dx) - player.angle
-        while angle > math.pi: angle -= 2 * math.pi
-        while angle < -math.pi: angle += 2 * math.pi
-        
-        if -renderer.HALF_FOV <= angle <= renderer.HALF_FOV:
-            dist = math.sqrt(dist_sq)
-            proj_height = (HEIGHT - UI_HEIGHT) / (dist + 0.0001)
-            screen_x = int((angle + renderer.HALF_FOV) / renderer.FOV * WIDTH)
-            
-            size = int(proj_height * self.size)
-            pulse_size = int(size * (1 + self.pulse * 0.1))
-            portal_color = self.color.value
-            
-            portal_surface = pygame.Surface((pulse_size*2, pulse_size*2), pygame.SRCALPHA)
-            pygame.draw.circle(portal_surface, (*portal_color, 200), 
-                             (pulse_size, pulse_size), pulse_size)
-            pygame.draw.circle(portal_surface, (*portal_color, 100), 
-                             (pulse_size, pulse_size), int(pulse_size * 0.7))
-            pygame.draw.circle(portal_surface, (*portal_color, 150), 
-                             (pulse_size, pulse_size), int(pulse_size * 0.3))
-            
-            screen.blit(portal_surface, 
-                       (screen_x - pulse_size, 
-                        (HEIGHT - UI_HEIGHT)//2 - pulse_size))
+        portal_surface = SURFACES.get("portal", pulse_size, self.color.value, 200, self.draw_rings)
+        screen.blit(portal_surface, 
+                   portal_surface.get_rect(center=(screen_x, (HEIGHT - UI_HEIGHT)//2)))
 
 class Wall(GameObject):
     def __init__(self, x, y, z=0, is_stairs=False, is_timed=False):
@@ -407,7 +476,7 @@ class Wall(GameObject):
     
     def update(self):
         if self.timer_active:
-            self.time_remaining -= 1/60
+            self.time_remaining -= CLOCK.step
             if self.time_remaining <= 0:
                 self.timer_active = False
     
@@ -415,31 +484,27 @@ class Wall(GameObject):
         self.timer_active = True
         self.time_remaining = self.timer_duration
     
-    def draw(self, screen, ray, proj_height, depth_shade):
+    def draw(self, columns, ray, proj_height, depth):
         if self.is_timed and self.timer_active:
             return  # Don't draw when timer is active
         
         base_color = self.color
         if self.is_timed and not self.timer_active:
             # Pulsing effect for timed walls
-            pulse = (math.sin(pygame.time.get_ticks() * 0.005) * 30)
+            # Whole steps keep the shade table to a handful of pulse colors
+            pulse = int(math.sin(pygame.time.get_ticks() * 0.005) * 30)
             base_color = (
                 min(255, max(0, base_color[0] + pulse)),
                 min(255, max(0, base_color[1] + pulse)),
                 min(255, max(0, base_color[2] + pulse))
             )
         
-        shaded_color = (
-            max(0, min(255, base_color[0] * (depth_shade[0]/255))),
-            max(0, min(255, base_color[1] * (depth_shade[1]/255))),
-            max(0, min(255, base_color[2] * (depth_shade[2]/255)))
-        )
-        
-        pygame.draw.rect(screen, shaded_color, 
-                        (ray, (HEIGHT - UI_HEIGHT) // 2 - proj_height // 2, 
-                         1, proj_height))
+        columns.fill(ray, (HEIGHT - UI_HEIGHT) // 2 - proj_height // 2,
+                     proj_height, columns.shade(base_color, depth))
 
 class Button(GameObject):
+    depth_bias = 0.75  # Buttons are mounted in the middle of a wall cell
+    
     def __init__(self, x, y, z, target_wall_positions):
         super().__init__(x, y, z)
         self.target_walls = target_wall_positions  # List of (x,y,z) tuples
@@ -449,7 +514,7 @@ class Button(GameObject):
     
     def update(self, game_map, player):
         if self.cooldown > 0:
-            self.cooldown -= 1/60
+            self.cooldown -= CLOCK.step
         
         # First check if any target walls are still active
         any_wall_active = False
@@ -480,36 +545,25 @@ class Button(GameObject):
             if wall and isinstance(wall, Wall) and wall.is_timed:
                 wall.activate_timer()
     
-    def draw(self, screen, player, renderer):
-        if player.z != self.z:
-            return
-            
-        dx = self.x - player.x
-        dy = self.y - player.y
-        dist_sq = dx**2 + dy**2
-        
-        if dist_sq > (renderer.MAX_DEPTH * 0.18) ** 2:
-            return
-            
-        angle = math.atan2(dy, dx) - player.angle
-        while angle > math.pi: angle -= 2 * math.pi
-        while angle < -math.pi: angle += 2 * math.pi
-        
-        if -renderer.HALF_FOV <= angle <= renderer.HALF_FOV:
-            dist = math.sqrt(dist_sq)
-            proj_height = (HEIGHT - UI_HEIGHT) / (dist + 0.0001)
-            screen_x = int((angle + renderer.HALF_FOV) / renderer.FOV * WIDTH)
-            
-            size = int(proj_height * self.size)
-            color = Color.BUTTON_GREEN.value if self.active else Color.BUTTON_RED.value
-            
-            button_surface = pygame.Surface((size*1.1, size), pygame.SRCALPHA)
-            pygame.draw.rect(button_surface, (*color, 200), 
-                            (0, 0, size*1.1, size), border_radius=size//4)
-            
-            screen.blit(button_surface, 
-                       (screen_x - size, 
-                        (HEIGHT - UI_HEIGHT)//2 - size//2))
+    def add_billboard(self, billboards, player, renderer):
+        if player.z == self.z:
+            billboards.add(self, player, renderer.MAX_DEPTH * 0.18)
+    
+    @staticmethod
+    def draw_plate(size, color, alpha):
+        button_surface = pygame.Surface((size*1.1, size), pygame.SRCALPHA)
+        pygame.draw.rect(button_surface, (*color, alpha), 
+                        (0, 0, size*1.1, size), border_radius=size//4)
+        return button_surface
+    
+    def draw_billboard(self, screen, screen_x, proj_height):
+        color = Color.BUTTON_GREEN.value if self.active else Color.BUTTON_RED.value
+        button_surface = SURFACES.get("button", proj_height * self.size, color, 200, self.draw_plate)
+        
+        size = button_surface.get_height()
+        screen.blit(button_surface, 
+                   (screen_x - size, 
+                    (HEIGHT - UI_HEIGHT)//2 - size//2))
 
 class Player(GameObject):
     def __init__(self, x, y):
@@ -523,19 +577,37 @@ class Player(GameObject):
         self.rot_speed = 0.05  # Rotation speed for Q/E keys
         self.blue_portal = None
         self.orange_portal = None
-        self.portal_cooldown = 0
-        self.teleport_cooldown = 0
+        self.portal_cooldown = 0  # seconds
+        self.teleport_cooldown = 0  # seconds
         self.projectiles = []
         self.look_angle = 0  # Vertical look angle
         self.max_look_angle = math.pi/4  # 45 degrees up/down
         self.look_speed = 0.3  # Speed for vertical look
         self.speed_boost_end = 0  # Track when boost expires
         self.floor_timers = {}  # Dictionary to store floor times {floor_number: time}
-        self.current_floor_start_time = time.time()
+        self.current_floor_start_time = CLOCK.now
         self.last_floor = 0
+        self.previous_pose = (x, y, 0, 0)
+        
+    def remember_pose(self):
+        # The pose at the start of a simulation step, for blend_pose()
+        self.previous_pose = (self.x, self.y, self.z, self.angle)
+    
+    def blend_pose(self, alpha):
+        """Blends alpha of the way on from the last step's pose for drawing; returns the pose to restore"""
+        pose = (self.x, self.y, self.z, self.angle)
+        x, y, z, angle = self.previous_pose
+        if z == self.z and abs(self.x - x) + abs(self.y - y) < 1:  # Teleports are not blended
+            self.x = x + (self.x - x) * alpha
+            self.y = y + (self.y - y) * alpha
+            self.angle = angle + (self.angle - angle) * alpha
+        return pose
+    
+    def restore_pose(self, pose):
+        self.x, self.y, self.z, self.angle = pose
         
     def update_floor_timer(self):
-        current_time = time.time()
+        current_time = CLOCK.now
         if self.z != self.last_floor:
             # Record time spent on previous floor
             time_spent = current_time - self.current_floor_start_time
@@ -546,13 +618,13 @@ class Player(GameObject):
     
     def apply_speed_boost(self, duration):
         self.speed = min(self.base_speed + 1.5, self.max_speed)
-        self.speed_boost_end = time.time() + duration
+        self.speed_boost_end = CLOCK.now + duration
     
     def shoot_portal(self, angle, color):
         if self.portal_cooldown > 0:
             return
             
-        self.portal_cooldown = 10
+        self.portal_cooldown = 0.16
         self.projectiles.append(PortalProjectile(self.x, self.y, self.z, angle, color))
     
     def update_projectiles(self, game_map):
@@ -578,7 +650,7 @@ class Player(GameObject):
     
     def try_teleport(self):
         if self.teleport_cooldown > 0:
-            self.teleport_cooldown -= 1
+            self.teleport_cooldown -= CLOCK.step
             return False
             
         teleported = False
@@ -602,7 +674,7 @@ class Player(GameObject):
                     self.angle = exit_portal.exit_angle
                     
                     # Longer cooldown to prevent immediate re-teleportation
-                    self.teleport_cooldown = 20  # frames (~0.33 seconds at 60 FPS)
+                    self.teleport_cooldown = 0.33
                     teleported = True
                     break
         
@@ -611,11 +683,11 @@ class Player(GameObject):
     
     def update(self, game_map):
         # Check if speed boost expired
-        if time.time() > self.speed_boost_end:
+        if CLOCK.now > self.speed_boost_end:
             self.speed = self.base_speed
             
         if self.portal_cooldown > 0:
-            self.portal_cooldown -= 1
+            self.portal_cooldown -= CLOCK.step
                 
         # Movement controls
         keys = pygame.key.get_pressed()
@@ -635,11 +707,11 @@ class Player(GameObject):
         
         # Movement (W/S for forward/backward)
         if keys[pygame.K_w]:  # Forward
-            move_x = math.cos(move_angle) * self.acceleration
-            move_y = math.sin(move_angle) * self.acceleration
+            move_x = TRIG.cos(move_angle) * self.acceleration
+            move_y = TRIG.sin(move_angle) * self.acceleration
         elif keys[pygame.K_s]:  # Backward
-            move_x = -math.cos(move_angle) * self.acceleration
-            move_y = -math.sin(move_angle) * self.acceleration
+            move_x = -TRIG.cos(move_angle) * self.acceleration
+            move_y = -TRIG.sin(move_angle) * self.acceleration
         else:
             move_x = move_y = 0
             
@@ -701,6 +773,8 @@ class GameMap:
         self.walls = {}
         self.buttons = []  # List to store buttons
         self.collectables = []  # List to store collectables
+        self.timed_walls = []  # Timed walls, checked each frame by the batch ray caster
+        self.grid = np.array(map_data, dtype=np.uint8) if np is not None else None
         self.initialize_walls()
         self.initialize_buttons()
         self.initialize_collectables()
@@ -715,6 +789,7 @@ class GameMap:
                         self.walls[(x, y, z)] = Wall(x, y, z, is_stairs=True)
                     elif self.map_data[z][y][x] == 3:  # Timed wall
                         self.walls[(x, y, z)] = Wall(x, y, z, is_timed=True)
+                        self.timed_walls.append(self.walls[(x, y, z)])
     
     def initialize_buttons(self):
         # Button at (3,3,0) that controls timed walls at (5,5,0) and (6,5,0)
@@ -796,6 +871,237 @@ class GameMap:
                 return (x, y, z, normal_angle)
         
         return None
+    
+    def solid_cells(self, z):
+        """Boolean [y, x] array of the cells that block rays on floor z"""
+        solid = self.grid[z] != 0
+        for wall in self.timed_walls:
+            if wall.z == z and wall.timer_active:
+                solid[wall.y, wall.x] = False
+        return solid
+
+class RayCaster:
+    """Steps a ray from one grid line to the next (DDA), so the hit distance is exact"""
+    def __init__(self, max_depth):
+        self.max_depth = max_depth
+
+    def cast(self, origin_x, origin_y, cos_a, sin_a, is_hit):
+        # is_hit(cell_x, cell_y) is True for a wall and None off the map.
+        # Returns (depth, cell_x, cell_y) of the first wall, or None
+        cell_x = int(origin_x)
+        cell_y = int(origin_y)
+
+        # Ray length between grid lines; 1e30 for lines a ray along an axis never crosses
+        delta_x = abs(1 / cos_a) if cos_a != 0 else 1e30
+        delta_y = abs(1 / sin_a) if sin_a != 0 else 1e30
+
+        if cos_a < 0:
+            step_x = -1
+            side_x = (origin_x - cell_x) * delta_x
+        else:
+            step_x = 1
+            side_x = (cell_x + 1 - origin_x) * delta_x
+        if sin_a < 0:
+            step_y = -1
+            side_y = (origin_y - cell_y) * delta_y
+        else:
+            step_y = 1
+            side_y = (cell_y + 1 - origin_y) * delta_y
+
+        max_depth = self.max_depth
+        while True:
+            # Step into whichever neighbouring cell the ray reaches first
+            if side_x < side_y:
+                depth = side_x
+                side_x += delta_x
+                cell_x += step_x
+            else:
+                depth = side_y
+                side_y += delta_y
+                cell_y += step_y
+
+            if depth >= max_depth:
+                return None
+
+            hit = is_hit(cell_x, cell_y)
+            if hit is None:
+                return None
+            if hit:
+                return (depth, cell_x, cell_y)
+
+class BatchRayCaster:
+    """RayCaster for every screen column at once, using NumPy arrays"""
+    def __init__(self, max_depth):
+        self.max_depth = max_depth
+        # A ray crosses at most two grid lines per unit of distance
+        self.max_steps = int(max_depth) * 2 + 2
+
+    def cast(self, origin_x, origin_y, cos_a, sin_a, solid):
+        # solid is a [y, x] boolean array of the cells that stop a ray.
+        # Returns (hit, depths, cells_x, cells_y), one entry per ray
+        count = len(cos_a)
+        map_height, map_width = solid.shape
+
+        # 1e30 instead of inf for rays along an axis, as in RayCaster.cast
+        delta_x = np.abs(1 / np.where(cos_a != 0, cos_a, 1e-30))
+        delta_y = np.abs(1 / np.where(sin_a != 0, sin_a, 1e-30))
+
+        start_x = int(origin_x)
+        start_y = int(origin_y)
+        step_x = np.where(cos_a < 0, -1, 1)
+        step_y = np.where(sin_a < 0, -1, 1)
+        side_x = np.where(cos_a < 0, origin_x - start_x, start_x + 1 - origin_x) * delta_x
+        side_y = np.where(sin_a < 0, origin_y - start_y, start_y + 1 - origin_y) * delta_y
+        cells_x = np.full(count, start_x)
+        cells_y = np.full(count, start_y)
+
+        hit = np.zeros(count, dtype=bool)
+        depths = np.zeros(count)
+        active = np.ones(count, dtype=bool)
+
+        for _ in range(self.max_steps):
+            # Every active ray steps into whichever neighbour it reaches first
+            step_in_x = side_x < side_y
+            depth = np.where(step_in_x, side_x, side_y)
+            move_x = active & step_in_x
+            move_y = active & ~step_in_x
+            cells_x[move_x] += step_x[move_x]
+            side_x[move_x] += delta_x[move_x]
+            cells_y[move_y] += step_y[move_y]
+            side_y[move_y] += delta_y[move_y]
+
+            active &= ((depth < self.max_depth) &
+                       (cells_x >= 0) & (cells_x < map_width) &
+                       (cells_y >= 0) & (cells_y < map_height))
+            new_hits = active & solid[np.clip(cells_y, 0, map_height - 1),
+                                      np.clip(cells_x, 0, map_width - 1)]
+            depths[new_hits] = depth[new_hits]
+            hit |= new_hits
+            active &= ~new_hits
+            if not active.any():
+                break
+
+        return hit, depths, cells_x, cells_y
+
+class WallColumns:
+    """Frame buffer the wall slices are written into, then blitted to the screen in one go"""
+    KEY_COLOR = (255, 0, 255)  # Marks pixels with no wall so the floor shows through
+    DEPTH_BUCKETS = 256        # One shading step per 0.1 units of distance
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.frame = pygame.Surface((width, height)).convert()
+        self.frame.set_colorkey(self.KEY_COLOR)
+        if np is not None:
+            self.blank = self.frame.map_rgb(self.KEY_COLOR)
+            self.pixels = np.full((width, height), self.blank, dtype=np.uint32)
+        self.shade_table = {}
+
+    def pack(self, color):
+        """Converts an RGB tuple into the buffer's pixel format"""
+        if np is not None:
+            return self.frame.map_rgb(color)
+        return color
+
+    def shaded_rgb(self, color, depth):
+        """Returns the RGB tuple for a wall of this color seen at this depth"""
+        bucket = min(int(depth * 10), self.DEPTH_BUCKETS - 1)
+        light = (255 - bucket) / 255
+        return tuple(max(0, min(255, int(c * light))) for c in color)
+
+    def shade(self, color, depth):
+        """Returns the packed pixel for a wall of this color seen at this depth"""
+        shades = self.shade_table.get(color)
+        if shades is None:
+            shades = [self.pack(self.shaded_rgb(color, bucket / 10))
+                      for bucket in range(self.DEPTH_BUCKETS)]
+            self.shade_table[color] = shades
+        return shades[min(int(depth * 10), self.DEPTH_BUCKETS - 1)]
+
+    def clear(self):
+        if np is not None:
+            self.pixels.fill(self.blank)
+        else:
+            self.frame.fill(self.KEY_COLOR)
+
+    def fill(self, x, top, height, pixel):
+        """Paints one column from top down to top + height"""
+        bottom = min(self.height, int(top + height))
+        top = max(0, int(top))
+        if bottom <= top or not 0 <= x < self.width:
+            return
+        if np is not None:
+            self.pixels[x, top:bottom] = pixel
+        else:
+            self.frame.fill(pixel, (x, top, 1, bottom - top))
+
+    def blit(self, screen):
+        if np is not None:
+            pygame.surfarray.blit_array(self.frame, self.pixels)
+        screen.blit(self.frame, (0, 0))
+
+class Billboards:
+    """Sprites drawn furthest first after the walls, clipped to the columns no wall hides"""
+    def __init__(self, width, height, fov):
+        self.width = width
+        self.height = height
+        self.fov = fov
+        self.half_fov = fov / 2
+        self.depths = [math.inf] * width  # Nearest wall per screen column
+        self.sprites = []                 # (distance, screen_x, sprite) queued this frame
+
+    def clear(self):
+        self.depths = [math.inf] * self.width
+
+    def set_depth(self, x, width, depth):
+        """Records the wall depth for the columns x to x + width"""
+        for column in range(x, min(x + width, self.width)):
+            self.depths[column] = depth
+
+    def add(self, sprite, player, max_distance):
+        """Queues sprite if it is within max_distance and in view, and returns whether it was"""
+        dx = sprite.x - player.x
+        dy = sprite.y - player.y
+        dist_sq = dx * dx + dy * dy
+        if dist_sq > max_distance * max_distance:
+            return False
+
+        angle = (math.atan2(dy, dx) - player.angle + math.pi) % (2 * math.pi) - math.pi
+        if not -self.half_fov <= angle <= self.half_fov:
+            return False
+
+        screen_x = int((angle + self.half_fov) / self.fov * self.width)
+        self.sprites.append((math.sqrt(dist_sq), screen_x, sprite))
+        return True
+
+    def open_spans(self, left, right, depth):
+        """Yields (start, end) runs of columns in left..right with no wall nearer than depth"""
+        depths = self.depths
+        start = None
+        for x in range(left, right):
+            if depths[x] > depth:
+                if start is None:
+                    start = x
+            elif start is not None:
+                yield start, x
+                start = None
+        if start is not None:
+            yield start, right
+
+    def draw(self, screen):
+        self.sprites.sort(key=lambda entry: entry[0], reverse=True)
+        for distance, screen_x, sprite in self.sprites:
+            proj_height = self.height / (distance + 0.0001)
+            # Generous half-width so glows and outlines are not cut off
+            reach = int(proj_height * sprite.size * 1.2) + 12
+            left = max(0, screen_x - reach)
+            right = min(self.width, screen_x + reach + 1)
+            for start, end in self.open_spans(left, right, distance - sprite.depth_bias):
+                screen.set_clip((start, 0, end - start, self.height))
+                sprite.draw_billboard(screen, screen_x, proj_height)
+        screen.set_clip(None)
+        self.sprites.clear()
 
 class Renderer:
     def __init__(self):
@@ -805,12 +1111,25 @@ class Renderer:
         # Performance optimizations
         self.FOV = math.pi / 2
         self.HALF_FOV = self.FOV / 2
-        self.NUM_RAYS = WIDTH // 2
-        self.DELTA_ANGLE = self.FOV / self.NUM_RAYS
         self.MAX_DEPTH = 20
+        self.ray_caster = RayCaster(self.MAX_DEPTH)
+        self.wall_columns = WallColumns(WIDTH, HEIGHT - UI_HEIGHT)
+        self.billboards = Billboards(WIDTH, HEIGHT - UI_HEIGHT, self.FOV)
+        
+        # With NumPy every screen column gets its own ray, otherwise every other one
+        if np is not None:
+            self.batch_caster = BatchRayCaster(self.MAX_DEPTH)
+            self.NUM_RAYS = WIDTH
+        else:
+            self.batch_caster = None
+            self.NUM_RAYS = WIDTH // 2
+        self.DELTA_ANGLE = self.FOV / self.NUM_RAYS
+        self.RAY_STRIDE = TRIG.steps(self.DELTA_ANGLE)  # Trig table steps between rays
+        self.COLUMN_WIDTH = WIDTH // self.NUM_RAYS
         
         self.font = pygame.font.Font(None, 32)
         self.big_font = pygame.font.Font(None, 72)
+        self.static_layers = {}  # Pre-rendered menu layers, keyed by (name, size)
         
         # Show mouse cursor
         pygame.mouse.set_visible(True)
@@ -829,41 +1148,35 @@ class Renderer:
                         (0, 0, WIDTH, floor_height))
     
     def cast_rays(self, player, game_map):
-        for ray in range(self.NUM_RAYS):
-            ray_angle = (player.angle - self.HALF_FOV) + (ray * self.DELTA_ANGLE)
-            
-            depth = 0
-            hit_wall = False
-            wall_z = player.z
+        self.wall_columns.clear()
+        self.billboards.clear()
+        if self.batch_caster:
+            self.cast_rays_batch(player, game_map)
+        else:
+            self.cast_rays_stepped(player, game_map)
+        self.wall_columns.blit(self.screen)
+    
+    def cast_rays_stepped(self, player, game_map):
+        wall_z = player.z
+
+        def is_hit(cell_x, cell_y):
+            # get_cell already reports open timed walls as empty space
+            cell_val = game_map.get_cell(cell_x, cell_y, wall_z)
+            if cell_val is None:
+                return None
+            return cell_val == 1 or cell_val == 2 or cell_val == 3  # Wall or stairs or timed wall
+
+        directions = TRIG.fan(player.angle - self.HALF_FOV, self.NUM_RAYS, self.RAY_STRIDE)
+        for ray, (cos_a, sin_a) in enumerate(directions):
+            hit = self.ray_caster.cast(player.x, player.y, cos_a, sin_a, is_hit)
+
+            if hit:
+                depth, wall_x, wall_y = hit
 
-            while not hit_wall and depth < self.MAX_DEPTH:
-                depth += 0.1
-                
-                test_x = int(player.x + depth * math.cos(ray_angle))
-                test_y = int(player.y + depth * math.sin(ray_angle))
-                test_z = wall_z
-
-                cell_val = game_map.get_cell(test_x, test_y, test_z)
-                if cell_val == 1 or cell_val == 2 or cell_val == 3:  # Wall or stairs or timed wall
-                    hit_wall = True
-                    wall_x, wall_y = test_x, test_y
-                elif cell_val is None:
-                    hit_wall = True
-                    depth = self.MAX_DEPTH
-
-            if hit_wall and game_map.get_cell(test_x, test_y, wall_z) in (1, 2, 3):
-                # Skip rendering if it's a timed wall with active timer
-                if game_map.get_cell(test_x, test_y, wall_z) == 3:
-                    wall = game_map.walls.get((test_x, test_y, wall_z))
-                    if wall and wall.timer_active:
-                        continue
-                
                 # Adjust height based on look angle
                 proj_height = (HEIGHT - UI_HEIGHT) / (depth + 0.0001)
                 proj_height *= (1 - math.sin(player.look_angle) * 0.5)
                 
-                depth_shade = (255 - int(depth * 10),) * 3
-                
                 if (wall_x, wall_y, wall_z) in game_map.walls:
                     wall = game_map.walls[(wall_x, wall_y, wall_z)]
                     
@@ -871,27 +1184,48 @@ class Renderer:
                     wall_top = (HEIGHT - UI_HEIGHT) // 2 - proj_height // 2
                     wall_top += int((HEIGHT - UI_HEIGHT) * 0.3 * math.sin(player.look_angle))
                     
-                    wall.draw(self.screen, ray*2, proj_height, depth_shade)
+                    wall.draw(self.wall_columns, ray * self.COLUMN_WIDTH, proj_height, depth)
+                    self.billboards.set_depth(ray * self.COLUMN_WIDTH, self.COLUMN_WIDTH, depth)
     
-    def draw_projectiles(self, screen, player):
-        for projectile in player.projectiles:
-            projectile.draw(screen, player, self)
+    def cast_rays_batch(self, player, game_map):
+        cos_a, sin_a = TRIG.fan_arrays(player.angle - self.HALF_FOV,
+                                       self.NUM_RAYS, self.RAY_STRIDE)
+        hit, depths, cells_x, cells_y = self.batch_caster.cast(
+            player.x, player.y, cos_a, sin_a,
+            game_map.solid_cells(player.z))
+        
+        # One ray per screen column, so the wall depths are the depth buffer
+        self.billboards.depths = np.where(hit, depths, math.inf).tolist()
+        
+        height_scale = 1 - math.sin(player.look_angle) * 0.5
+        columns = zip(hit.tolist(), depths.tolist(), cells_x.tolist(), cells_y.tolist())
+        for ray, (ray_hit, depth, wall_x, wall_y) in enumerate(columns):
+            if not ray_hit:
+                continue
+            wall = game_map.walls.get((wall_x, wall_y, player.z))
+            if wall:
+                proj_height = (HEIGHT - UI_HEIGHT) / (depth + 0.0001) * height_scale
+                wall.draw(self.wall_columns, ray * self.COLUMN_WIDTH, proj_height, depth)
     
-    def draw_buttons(self, screen, game_map, player):
+    def draw_sprites(self, player, game_map):
+        # Queue everything first so the billboards are drawn back to front
+        for projectile in player.projectiles:
+            projectile.add_billboard(self.billboards, player, self)
         for button in game_map.buttons:
-            button.draw(screen, player, self)
-    
-    def draw_collectables(self, screen, game_map, player):
+            button.add_billboard(self.billboards, player, self)
         for collectable in game_map.collectables:
-            collectable.draw(screen, player, self)
+            collectable.add_billboard(self.billboards, player, self)
+        for portal in (player.blue_portal, player.orange_portal):
+            if portal:
+                portal.add_billboard(self.billboards, player, self)
+        self.billboards.draw(self.screen)
     
     def draw_ui(self, player):
         # Draw UI background
         pygame.draw.rect(self.screen, Color.UI_BG.value, (0, HEIGHT-UI_HEIGHT, WIDTH, UI_HEIGHT))
         
         # Draw floor timers at the top of the screen
-        current_time = time.time()
-        active_time = current_time - player.current_floor_start_time
+        active_time = CLOCK.now - player.current_floor_start_time
         
         # Previous floor times (top left, orange)
         y_offset = 10
@@ -944,7 +1278,7 @@ class Renderer:
                               portal_indicator_size)
         
         # Draw speed boost indicator if active
-        if time.time() < player.speed_boost_end:
+        if CLOCK.now < player.speed_boost_end:
             boost_text = self.font.render("SPEED BOOST!", True, (0, 255, 0))
             self.screen.blit(boost_text, (WIDTH - 150, HEIGHT - 30))
         
@@ -961,11 +1295,26 @@ class Renderer:
         floor_text = self.font.render(f"Floor: {player.z + 1}", True, Color.WHITE.value)
         self.screen.blit(floor_text, (WIDTH - 150, HEIGHT-60))
     
-    def draw_main_menu(self):
+    def static_layer(self, name, draw, size=None, alpha=False):
+        """A layer that never changes, painted by draw(layer) the first time it is needed at this size"""
+        size = size or self.screen.get_size()
+        layer = self.static_layers.get((name, size))
+        if layer is None:
+            if alpha:
+                layer = pygame.Surface(size, pygame.SRCALPHA)
+            else:
+                layer = pygame.Surface(size).convert()
+            draw(layer)
+            self.static_layers[(name, size)] = layer
+        return layer
+    
+    def build_menu_background(self, layer):
+        width, height = layer.get_size()
+        
         # Darker gradient background for better portal visibility
-        for y in range(HEIGHT):
-            shade = int(10 + (y / HEIGHT) * 20)
-            pygame.draw.line(self.screen, (shade, shade, shade + 10), (0, y), (WIDTH, y))
+        for y in range(height):
+            shade = int(10 + (y / height) * 20)
+            pygame.draw.line(layer, (shade, shade, shade + 10), (0, y), (width, y))
         
         # Title with stronger glow effect
         title_text = self.big_font.render("PORTAL GAME", True, (200, 200, 255))
@@ -973,8 +1322,22 @@ class Renderer:
             glow_text = self.big_font.render("PORTAL GAME", True, (100, 100, 150, 50//i))
             glow_surface = pygame.Surface((title_text.get_width()+i*10, title_text.get_height()+i*10), pygame.SRCALPHA)
             glow_surface.blit(glow_text, (i*5, i*5))
-            self.screen.blit(glow_surface, (WIDTH//2 - glow_surface.get_width()//2, HEIGHT//4 - i*2))
-        self.screen.blit(title_text, (WIDTH//2 - title_text.get_width()//2, HEIGHT//4))
+            layer.blit(glow_surface, (width//2 - glow_surface.get_width()//2, height//4 - i*2))
+        layer.blit(title_text, (width//2 - title_text.get_width()//2, height//4))
+    
+    def build_button_gradient(self, layer, alpha):
+        # One full period of the sine wave plus a button's height, so any
+        # phase of the animation is a 60 pixel tall window into this strip
+        width, height = layer.get_size()
+        for y in range(height):
+            shade = int(70 + (math.sin(y*0.1) * 20))
+            pygame.draw.line(layer, (shade, shade, shade + 30, alpha), (0, y), (width, y))
+    
+    def build_button_border(self, layer):
+        pygame.draw.rect(layer, (200, 200, 255, 100), layer.get_rect(), 3, border_radius=15)
+    
+    def draw_main_menu(self):
+        self.screen.blit(self.static_layer("menu_background", self.build_menu_background), (0, 0))
         
         # Portal spinning animation parameters
         current_time = pygame.time.get_ticks()
@@ -996,15 +1359,16 @@ class Renderer:
         button_rect = pygame.Rect(WIDTH//2 - 150, HEIGHT*2//3, 300, 60)
         hover = button_rect.collidepoint(mouse_x, mouse_y)
         
-        # Button with animated gradient
-        button_surface = pygame.Surface((300, 60), pygame.SRCALPHA)
-        for y in range(60):
-            alpha = 200 if hover else 150
-            shade = int(70 + (math.sin(current_time*0.005 + y*0.1) * 20))
-            pygame.draw.line(button_surface, (shade, shade, shade + 30, alpha), (0, y), (300, y))
+        # Button with animated gradient, scrolled by the animation phase
+        alpha = 200 if hover else 150
+        gradient = self.static_layer(f"button_gradient_{alpha}",
+                                     lambda layer: self.build_button_gradient(layer, alpha),
+                                     (300, 60 + 63), alpha=True)
+        offset = int(current_time * 0.05) % 63
+        self.screen.blit(gradient, (WIDTH//2 - 150, HEIGHT*2//3), (0, offset, 300, 60))
         
-        pygame.draw.rect(button_surface, (200, 200, 255, 100), (0, 0, 300, 60), 3, border_radius=15)
-        self.screen.blit(button_surface, (WIDTH//2 - 150, HEIGHT*2//3))
+        border = self.static_layer("button_border", self.build_button_border, (300, 60), alpha=True)
+        self.screen.blit(border, (WIDTH//2 - 150, HEIGHT*2//3))
         
         # Button text with subtle animation
         text_offset = int(math.sin(current_time * 0.01) * 2) if hover else 0
@@ -1046,19 +1410,24 @@ class Renderer:
         self.screen.blit(portal_surface, (center[0] - radius, center[1] - radius))
         
         
-    def draw_victory_screen(self, player):
+    def build_victory_background(self, layer):
+        width, height = layer.get_size()
+        
         # Dark background with gradient
-        for y in range(HEIGHT):
-            shade = int(10 + (y / HEIGHT) * 40)
-            pygame.draw.line(self.screen, (shade, shade, shade + 20), (0, y), (WIDTH, y))
+        for y in range(height):
+            shade = int(10 + (y / height) * 40)
+            pygame.draw.line(layer, (shade, shade, shade + 20), (0, y), (width, y))
         
         # Title
         title_text = self.big_font.render("VICTORY!", True, (255, 215, 0))  # Gold color
-        self.screen.blit(title_text, (WIDTH//2 - title_text.get_width()//2, HEIGHT//4))
+        layer.blit(title_text, (width//2 - title_text.get_width()//2, height//4))
         
         # Lap times header
         times_header = self.font.render("Floor Lap Times:", True, Color.WHITE.value)
-        self.screen.blit(times_header, (WIDTH//2 - times_header.get_width()//2, HEIGHT//2.8))
+        layer.blit(times_header, (width//2 - times_header.get_width()//2, height//2.8))
+    
+    def draw_victory_screen(self, player):
+        self.screen.blit(self.static_layer("victory_background", self.build_victory_background), (0, 0))
         
         # Display lap times
         y_offset = HEIGHT//3 + 70
@@ -1071,7 +1440,7 @@ class Renderer:
             y_offset += 70
         
         # Add current floor time if not already recorded
-        current_time = time.time() - player.current_floor_start_time
+        current_time = CLOCK.now - player.current_floor_start_time
         if player.z not in player.floor_timers:
             time_text = self.font.render(
                 f"Floor {player.z + 1}: {current_time:.2f} seconds", 
@@ -1111,7 +1480,7 @@ class Game:
     def reset_game(self):
         self.player = Player(1.5, 1.5)
         self.player.floor_timers = {}
-        self.player.current_floor_start_time = time.time()
+        self.player.current_floor_start_time = CLOCK.now
         self.player.last_floor = 0
     
     def initialize_game(self):
@@ -1193,7 +1562,7 @@ class Game:
                     if button_rect.collidepoint(mouse_x, mouse_y):
                         self.state = GameState.PLAYING
                         self.is_fading_in = True
-                        self.fade_start_time = time.time()
+                        self.fade_start_time = CLOCK.now
                         pygame.mouse.set_visible(True)
                 
                 elif self.state == GameState.PLAYING:
@@ -1219,16 +1588,17 @@ class Game:
             keys = pygame.key.get_pressed()
             if keys[pygame.K_r]:
                 self.reset_game()
+            self.player.remember_pose()
             
             # Update fade effect if active
             if self.is_fading_in:
-                elapsed = time.time() - self.fade_start_time
+                elapsed = CLOCK.now - self.fade_start_time
                 progress = min(elapsed / self.fade_duration, 1.0)
                 self.fade_alpha = int(255 * (1 - progress))
                 if progress >= 1.0:
                     self.is_fading_in = False
             
-            current_time = time.time()
+            current_time = CLOCK.now
             for collectable in self.game_map.collectables[:]:
                 if isinstance(collectable, WinCollectable):
                     if collectable.update(self.player, current_time):
@@ -1253,16 +1623,12 @@ class Game:
             self.renderer.draw_main_menu()
         
         elif self.state == GameState.PLAYING:
+            # Draw from between the last two simulated poses
+            pose = self.player.blend_pose(CLOCK.alpha)
             self.renderer.draw_floor_and_ceiling(self.player)
             self.renderer.cast_rays(self.player, self.game_map)
-            self.renderer.draw_projectiles(self.renderer.screen, self.player)
-            self.renderer.draw_buttons(self.renderer.screen, self.game_map, self.player)
-            self.renderer.draw_collectables(self.renderer.screen, self.game_map, self.player)
-            
-            if self.player.blue_portal:
-                self.player.blue_portal.draw(self.renderer.screen, self.player, self.renderer)
-            if self.player.orange_portal:
-                self.player.orange_portal.draw(self.renderer.screen, self.player, self.renderer)
+            self.renderer.draw_sprites(self.player, self.game_map)
+            self.player.restore_pose(pose)
             
             self.renderer.draw_ui(self.player)
             
@@ -1277,16 +1643,78 @@ class Game:
         pygame.display.flip()
 
     def run(self):
+        # One update() per CLOCK.step of real time; the dummy driver takes one step per frame
+        headless = pygame.display.get_driver() == "dummy"
+        last_frame = time.perf_counter()
         while self.running:
+            frame_start = time.perf_counter()
+            steps = 1 if headless else CLOCK.advance(frame_start - last_frame)
+            last_frame = frame_start
+            
             self.handle_events()
-            self.update()
+            for _ in range(steps):
+                self.update()
+                CLOCK.tick()
             self.render()
-            self.clock.tick(60)
+            if not headless:
+                self.clock.tick(60)
+    
+    def simulate(self, seconds):
+        """Plays `seconds` of game time without drawing and returns the real seconds it took"""
+        self.state = GameState.PLAYING
+        start = time.perf_counter()
+        for _ in range(int(seconds * CLOCK.rate)):
+            pygame.event.pump()
+            self.update()
+            CLOCK.tick()
+        return time.perf_counter() - start
+
+def run_benchmarks(frames=200):
+    """Times cast_rays with trig table lookups against plain math calls"""
+    game = Game()
+    renderer = game.renderer
+    headings = [i * 0.05 for i in range(frames)]
+    
+    for accurate in (True, False):
+        TRIG.accurate = accurate
+        directions = TRIG.fan_arrays if renderer.batch_caster else TRIG.fan
+        
+        start = time.perf_counter()
+        for heading in headings:
+            directions(heading - renderer.HALF_FOV, renderer.NUM_RAYS, renderer.RAY_STRIDE)
+        direction_time = (time.perf_counter() - start) * 1000 / frames
+        
+        start = time.perf_counter()
+        for heading in headings:
+            game.player.angle = heading
+            renderer.cast_rays(game.player, game.game_map)
+        frame_time = (time.perf_counter() - start) * 1000 / frames
+        
+        label = "math calls" if accurate else "table lookups"
+        print(f"{label:>13}: ray directions {direction_time:.3f} ms, "
+              f"cast_rays {frame_time:.3f} ms per frame")
+    TRIG.accurate = False
+    
+    # Whole frames with sprites, to see how often the surface cache hits
+    game.state = GameState.PLAYING
+    start = time.perf_counter()
+    for heading in headings:
+        game.player.angle = heading
+        game.render()
+    frame_time = (time.perf_counter() - start) * 1000 / frames
+    print(f"{'render':>13}: {frame_time:.3f} ms per frame, surface cache "
+          f"{SURFACES.hits} hits, {SURFACES.misses} misses")
 
 if __name__ == "__main__":
     try:
-        game = Game()
-        game.run()
+        if "--benchmark" in sys.argv:
+            run_benchmarks()
+        elif "--headless" in sys.argv:
+            elapsed = Game().simulate(60)
+            print(f"Simulated 60 s of play in {elapsed:.2f} s")
+        else:
+            game = Game()
+            game.run()
     finally:
         pygame.quit()
         sys.exit()
\ No newline at end of file